@@ -0,0 +1,182 @@
+# mechanics/dashboard.py
+"""
+📊 Data loader behind ``mechanic_dashboard``.
+
+Each section of the page is one ``cached_property`` holding a list, so every
+section costs exactly one query however often the template touches it, and
+rows come with the related objects the template reads (``order.product``,
+``order.customer``, ``req.user``, ``feedback.customer``). The order tabs are
+split in Python from a single order query, and the status counts come from
+one conditional aggregate. The query count is therefore fixed, whatever
+the number of orders, requests or reviews (see ``DashboardQueryBudgetTests``).
+
+🧊 The template caches each section as a fragment keyed on a per-mechanic
+version token for that section (``section_versions``). Writes call ``bump``
+for the mechanics and sections they touch (``mechanics.signals`` and the
+bulk paths in ``services``), which starts a new token; the old fragments
+are simply never read again. The context values are lazy, so a section
+whose fragment is cached costs no query at all.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils.functional import SimpleLazyObject, cached_property
+
+from services.models import DispatchOffer, Notification, ServiceRequest
+from users.models import Feedback
+from .models import MechanicProfile, Order, Product
+
+ORDER_STATUSES = ["Paid", "Accepted", "Processing", "Delivered", "Cancelled"]
+RECENT_NOTIFICATIONS = 5
+
+SECTIONS = ("notifications", "requests", "chats", "orders", "products", "feedback")
+# Broadcast offers lapse by the clock (read-time expiry) with no write to
+# hook, so the request list is never served from cache for longer than this.
+REQUESTS_FRAGMENT_TIMEOUT = 60
+
+
+# 🧊 Fragment versions
+def _version_key(mechanic_id, section):
+    return f"dashboard:{mechanic_id}:{section}"
+
+
+def section_versions(mechanic_id):
+    """``{section: token}`` for one mechanic; one cache round trip when warm."""
+    keys = {section: _version_key(mechanic_id, section) for section in SECTIONS}
+    cached = cache.get_many(keys.values())
+    versions, missing = {}, {}
+    for section, key in keys.items():
+        versions[section] = cached.get(key) or missing.setdefault(key, uuid.uuid4().hex)
+    if missing:
+        cache.set_many(missing, None)
+    return versions
+
+
+def fragment_timeouts():
+    timeout = getattr(settings, "DASHBOARD_FRAGMENT_TIMEOUT", 600)
+    timeouts = dict.fromkeys(SECTIONS, timeout)
+    timeouts["requests"] = min(timeout, REQUESTS_FRAGMENT_TIMEOUT)
+    return timeouts
+
+
+def bump(mechanic_ids, *sections):
+    """Invalidate ``sections`` of these mechanics' dashboards once the transaction commits."""
+    keys = [_version_key(mechanic_id, section) for mechanic_id in set(mechanic_ids) if mechanic_id for section in sections]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def requests_changed(request_ids):
+    """Bump everyone who sees these requests: the assigned mechanic and every mechanic offered them."""
+    mechanic_ids = set(
+        ServiceRequest.objects.filter(id__in=request_ids, mechanic__isnull=False).values_list("mechanic_id", flat=True)
+    )
+    mechanic_ids.update(
+        DispatchOffer.objects.filter(service_request_id__in=request_ids).values_list("mechanic_id", flat=True)
+    )
+    bump(mechanic_ids, "requests", "chats")
+
+
+class MechanicDashboard:
+    def __init__(self, mechanic):
+        self.mechanic = mechanic
+
+    @cached_property
+    def profile(self):
+        return MechanicProfile.objects.filter(user=self.mechanic).first()
+
+    @cached_property
+    def service_requests(self):
+        return list(
+            ServiceRequest.objects.for_mechanic(self.mechanic)
+            .with_effective_status()
+            .select_related("user")
+            .order_by("-created_at")
+        )
+
+    @cached_property
+    def notifications(self):
+        return list(Notification.objects.filter(recipient=self.mechanic).order_by("-created_at")[:RECENT_NOTIFICATIONS])
+
+    @cached_property
+    def products(self):
+        return list(Product.objects.filter(mechanic=self.profile)) if self.profile else []
+
+    # 🧾 Orders: one list for every tab, one aggregate for the counts
+    @cached_property
+    def orders(self):
+        if self.profile is None:
+            return []
+        return list(
+            Order.objects.filter(product__mechanic=self.profile)
+            .select_related("product", "customer")
+            .order_by("-ordered_at")
+        )
+
+    @cached_property
+    def orders_by_status(self):
+        tabs = {status: [] for status in ORDER_STATUSES}
+        for order in self.orders:
+            if order.status in tabs:
+                tabs[order.status].append(order)
+        return tabs
+
+    @cached_property
+    def order_counts(self):
+        """``{"all": n, "paid": n, ...}`` from one conditional aggregate."""
+        if self.profile is None:
+            return dict.fromkeys(["all"] + [status.lower() for status in ORDER_STATUSES], 0)
+        return Order.objects.filter(product__mechanic=self.profile).aggregate(
+            all=Count("id"),
+            **{status.lower(): Count("id", filter=Q(status=status)) for status in ORDER_STATUSES},
+        )
+
+    @cached_property
+    def feedbacks(self):
+        return list(Feedback.objects.filter(mechanic=self.mechanic).select_related("customer").order_by("-created_at"))
+
+    @cached_property
+    def active_chats(self):
+        """Open conversations, summarised in one query (see ``with_chat_summary``)."""
+        return list(
+            ServiceRequest.objects.filter(mechanic=self.mechanic, status__in=["accepted", "in_progress"])
+            .with_chat_summary(self.mechanic)
+            .order_by("-last_activity", "-id")
+        )
+
+    # ⭐ Rating totals are kept on the profile (see MechanicProfile.record_rating): no query
+    @property
+    def rating_breakdown(self):
+        if self.profile is None:
+            return {i: 0 for i in range(5, 0, -1)}
+        return self.profile.rating_breakdown
+
+    @property
+    def average_rating(self):
+        return round(self.profile.average_rating, 1) if self.profile else 0
+
+    def context(self):
+        """Template context; every value loads on first use, i.e. only for fragments not in the cache."""
+        return {
+            "mechanic_profile": SimpleLazyObject(lambda: self.profile),
+            "service_requests": SimpleLazyObject(lambda: self.service_requests),
+            "notifications": SimpleLazyObject(lambda: self.notifications),
+            "products": SimpleLazyObject(lambda: self.products),
+            "all_orders": SimpleLazyObject(lambda: self.orders),
+            "paid_orders": SimpleLazyObject(lambda: self.orders_by_status["Paid"]),
+            "accepted_orders": SimpleLazyObject(lambda: self.orders_by_status["Accepted"]),
+            "processing_orders": SimpleLazyObject(lambda: self.orders_by_status["Processing"]),
+            "delivered_orders": SimpleLazyObject(lambda: self.orders_by_status["Delivered"]),
+            "cancelled_orders": SimpleLazyObject(lambda: self.orders_by_status["Cancelled"]),
+            "order_counts": SimpleLazyObject(lambda: self.order_counts),
+            "feedbacks": SimpleLazyObject(lambda: self.feedbacks),
+            "active_chats": SimpleLazyObject(lambda: self.active_chats),
+            "average_rating": SimpleLazyObject(lambda: self.average_rating),
+            "rating_breakdown": SimpleLazyObject(lambda: self.rating_breakdown),
+            "total_ratings": SimpleLazyObject(lambda: sum(self.rating_breakdown.values())),
+            "versions": section_versions(self.mechanic.id),
+            "fragment_timeouts": fragment_timeouts(),
+        }
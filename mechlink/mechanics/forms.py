@@ -10,11 +10,7 @@ from django import forms
 from .models import MechanicProfile
 
 class MechanicProfileForm(forms.ModelForm):
-    MECHANIC_TYPE_CHOICES = [
-        ('two_wheeler', 'Two-Wheeler Mechanic'),
-        ('automotive', 'Automotive Mechanic'),
-        ('heavy_vehicle', 'Heavy Vehicle Mechanic'),
-    ]
+    MECHANIC_TYPE_CHOICES = MechanicProfile.MECHANIC_TYPE_CHOICES
 
     mechanic_types = forms.MultipleChoiceField(
         choices=MECHANIC_TYPE_CHOICES,
@@ -26,6 +22,14 @@ class MechanicProfileForm(forms.ModelForm):
         model = MechanicProfile
         fields = [
             'shop_name', 'phone', 'address', 'location',
-            'pincode', 'latitude', 'longitude', 'mechanic_types'
+            'pincode', 'latitude', 'longitude'
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['mechanic_types'].initial = self.instance.mechanic_types
+
+    def save(self, commit=True):
+        # ✅ Selected mechanic types → bitmask
+        self.instance.mechanic_type_mask = MechanicProfile.type_mask(self.cleaned_data['mechanic_types'])
+        return super().save(commit=commit)
@@ -0,0 +1,107 @@
+# mechanics/geo.py
+"""
+📍 Geo helpers for the nearby-mechanic search.
+
+Workshops are bucketed into a fixed-size lat/lon grid. The location index
+(``mechanics.location_index``) keys its in-memory snapshot by cell, so a
+search only has to read the handful of cells that overlap the search circle
+instead of every workshop. The exact haversine check then runs on that small
+set.
+"""
+from math import radians, sin, cos, sqrt, atan2, floor, ceil, pi
+
+EARTH_RADIUS_KM = 6371
+# Same sphere as haversine_km, so cell spans never undershoot its distances
+KM_PER_DEG_LAT = EARTH_RADIUS_KM * pi / 180
+
+# ≈ 5.5 km per cell north-south; a 10 km search reads a 5 × 5 block of cells.
+GRID_CELL_DEG = 0.05
+GRID_COLS = round(360 / GRID_CELL_DEG)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points, in kilometres."""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+    a = min(a, 1.0)  # rounding can push near-antipodal points just past 1
+    return EARTH_RADIUS_KM * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+
+def _wrap_col(col):
+    # Keep column indexes continuous across the ±180° meridian.
+    return (col + GRID_COLS // 2) % GRID_COLS - GRID_COLS // 2
+
+
+def cell_index(lat, lon):
+    """(row, col) of the grid cell containing the point."""
+    return floor(lat / GRID_CELL_DEG), _wrap_col(floor(lon / GRID_CELL_DEG))
+
+
+def cell_key(row, col):
+    return f"{row}:{col}"
+
+
+def grid_cell(lat, lon):
+    """Cell key of a point in the location index ("" when not geo-enabled)."""
+    if lat is None or lon is None:
+        return ""
+    return cell_key(*cell_index(lat, lon))
+
+
+def cell_span(lat, radius_km):
+    """How many rows / columns either side of a point a radius can reach."""
+    rows = ceil(radius_km / (KM_PER_DEG_LAT * GRID_CELL_DEG))
+    # Longitude degrees shrink towards the poles, so size the columns for the
+    # circle's most poleward edge. A circle that comes within a degree of a
+    # pole (or over it) can reach any longitude, so read every column.
+    edge_lat = abs(lat) + radius_km / KM_PER_DEG_LAT
+    if edge_lat >= 89.0:
+        return rows, GRID_COLS // 2
+    km_per_deg_lon = KM_PER_DEG_LAT * cos(radians(edge_lat))
+    cols = min(ceil(radius_km / (km_per_deg_lon * GRID_CELL_DEG)), GRID_COLS // 2)
+    return rows, cols
+
+
+def cells_within(lat, lon, radius_km):
+    """Keys of every grid cell that can contain a point within ``radius_km``."""
+    row, col = cell_index(lat, lon)
+    rows, cols = cell_span(lat, radius_km)
+    return sorted({
+        cell_key(r, _wrap_col(c))
+        for r in range(row - rows, row + rows + 1)
+        for c in range(col - cols, col + cols + 1)
+    })
+
+
+def ring_cells(row, col, ring):
+    """Keys of the cells exactly ``ring`` steps (Chebyshev) from (row, col)."""
+    if ring == 0:
+        return [cell_key(row, col)]
+    keys = set()
+    for c in range(col - ring, col + ring + 1):
+        keys.add(cell_key(row - ring, _wrap_col(c)))
+        keys.add(cell_key(row + ring, _wrap_col(c)))
+    for r in range(row - ring + 1, row + ring):
+        keys.add(cell_key(r, _wrap_col(col - ring)))
+        keys.add(cell_key(r, _wrap_col(col + ring)))
+    return sorted(keys)
+
+
+def covered_km(lat, lon, ring):
+    """
+    Radius around the point that is fully covered once rings 0..``ring`` have
+    been read: anything outside those cells is at least this far away.
+    """
+    row, col = cell_index(lat, lon)
+    south = row - ring
+    north = row + ring + 1
+    lat_km = min(lat - south * GRID_CELL_DEG, north * GRID_CELL_DEG - lat) * KM_PER_DEG_LAT
+
+    # Column widths narrow towards the poles; measure at the block's poleward edge.
+    edge_lat = min(max(abs(south * GRID_CELL_DEG), abs(north * GRID_CELL_DEG)), 89.0)
+    km_per_deg_lon = KM_PER_DEG_LAT * max(cos(radians(edge_lat)), 0.01)
+    col_offset = lon / GRID_CELL_DEG - floor(lon / GRID_CELL_DEG)
+    lon_deg = min(col_offset + ring, ring + 1 - col_offset) * GRID_CELL_DEG
+    return min(lat_km, lon_deg * km_per_deg_lon)
@@ -0,0 +1,202 @@
+# mechanics/location_index.py
+"""
+🗺️ Process-local snapshot of every geo-enabled workshop.
+
+The snapshot keeps (user id, lat, lon, type bitmask, active flag) in flat
+arrays plus a grid-cell → positions map, so nearby searches never touch the
+database for the candidate scan. It is built lazily once per worker and kept
+fresh by the signals in ``mechanics.signals``; rows that cannot be patched in
+place (a brand-new workshop) simply drop the snapshot so the next search
+rebuilds it. Signals only reach the worker that made the write, so other
+workers also rebuild after ``MECHANIC_LOCATION_INDEX_TTL`` seconds.
+"""
+import heapq
+import threading
+import time
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+
+from . import matching
+from .geo import GRID_COLS, cell_index, cells_within, covered_km, grid_cell, ring_cells
+from .models import MechanicProfile
+
+
+class MechanicLocationIndex:
+    def __init__(self, rows=()):
+        self.user_ids = array("q")
+        self.lats = array("d")
+        self.lons = array("d")
+        self.type_masks = array("B")
+        self.active = array("b")
+        self.cell_keys = []
+        self.positions = {}
+        self.cells = defaultdict(list)
+        for row in rows:
+            self._append(*row)
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls):
+        rows = (
+            MechanicProfile.objects
+            .filter(latitude__isnull=False, longitude__isnull=False)
+            .values_list("user_id", "latitude", "longitude", "mechanic_type_mask", "user__is_active", "user__role")
+        )
+        return cls(
+            (user_id, lat, lon, type_mask, is_active and role == "mechanic")
+            for user_id, lat, lon, type_mask, is_active, role in rows.iterator(chunk_size=5000)
+        )
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def _append(self, user_id, lat, lon, type_mask, active):
+        position = len(self.user_ids)
+        self.user_ids.append(user_id)
+        self.lats.append(lat)
+        self.lons.append(lon)
+        self.type_masks.append(type_mask)
+        self.active.append(bool(active))
+        cell = grid_cell(lat, lon)
+        self.cell_keys.append(cell)
+        self.cells[cell].append(position)
+        self.positions[user_id] = position
+
+    # 🔧 In-place patches (return False when the row is not in the snapshot)
+    def patch(self, user_id, lat, lon, type_mask, active):
+        position = self.positions.get(user_id)
+        if position is None:
+            return False
+        if lat is None or lon is None:
+            self.active[position] = False
+            return True
+
+        cell = grid_cell(lat, lon)
+        if cell != self.cell_keys[position]:
+            self.cells[self.cell_keys[position]].remove(position)
+            self.cells[cell].append(position)
+            self.cell_keys[position] = cell
+        self.lats[position] = lat
+        self.lons[position] = lon
+        self.type_masks[position] = type_mask
+        self.active[position] = bool(active)
+        return True
+
+    def set_active(self, user_id, active):
+        position = self.positions.get(user_id)
+        if position is None:
+            return False
+        self.active[position] = bool(active)
+        return True
+
+    # 🔍 Search
+    def _candidates(self, cells, bit):
+        return [
+            p
+            for cell in cells
+            for p in self.cells.get(cell, ())
+            if self.active[p] and self.type_masks[p] & bit
+        ]
+
+    def _score(self, lat, lon, positions, k=None, max_km=None):
+        if matching.np is not None:
+            np = matching.np
+            lats = np.frombuffer(self.lats, dtype=np.float64)[positions]
+            lons = np.frombuffer(self.lons, dtype=np.float64)[positions]
+        else:
+            lats = [self.lats[p] for p in positions]
+            lons = [self.lons[p] for p in positions]
+
+        return [
+            (self.user_ids[positions[i]], distance)
+            for i, distance in matching.nearest(lat, lon, lats, lons, k=k, max_km=max_km)
+        ]
+
+    def search(self, lat, lon, mechanic_type, max_km, k=None):
+        """``[(user_id, distance_km), ...]`` of matching workshops, nearest first."""
+        bit = MechanicProfile.TYPE_BITS.get(mechanic_type, 0)
+        positions = self._candidates(cells_within(lat, lon, max_km), bit)
+        if not positions:
+            return []
+        return self._score(lat, lon, positions, k=k, max_km=max_km)
+
+    def nearest(self, lat, lon, mechanic_type, k, max_km):
+        """
+        The ``k`` nearest matching workshops within ``max_km``, found by reading
+        grid rings outwards from the point. Stops as soon as the k-th best
+        distance is closer than anything the next ring could hold, so the work
+        grows with ``k`` rather than with the number of workshops in ``max_km``.
+        """
+        bit = MechanicProfile.TYPE_BITS.get(mechanic_type, 0)
+        row, col = cell_index(lat, lon)
+        best = []  # max-heap of (-distance, user_id), at most k long
+        ring = 0
+        while True:
+            positions = self._candidates(ring_cells(row, col, ring), bit)
+            if positions:
+                for user_id, distance in self._score(lat, lon, positions, k=k, max_km=max_km):
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, user_id))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, user_id))
+
+            covered = covered_km(lat, lon, ring)
+            if len(best) == k and -best[0][0] <= covered:
+                break
+            if covered >= max_km or 2 * ring + 1 >= GRID_COLS:
+                break
+            ring += 1
+
+        return sorted(((user_id, -neg) for neg, user_id in best), key=lambda item: item[1])
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """The current worker's snapshot, (re)built on first use or once stale."""
+    global _index
+    ttl = getattr(settings, "MECHANIC_LOCATION_INDEX_TTL", 300)
+    index = _index
+    if index is None or (ttl and time.monotonic() - index.built_at > ttl):
+        with _lock:
+            if _index is index:
+                _index = MechanicLocationIndex.build()
+            index = _index
+    return index
+
+
+def invalidate():
+    global _index
+    _index = None
+
+
+def profile_changed(profile):
+    index = _index
+    if index is None:
+        return
+    user = profile.user
+    patched = index.patch(
+        profile.user_id,
+        profile.latitude,
+        profile.longitude,
+        profile.mechanic_type_mask,
+        user.is_active and user.role == "mechanic",
+    )
+    if not patched and profile.latitude is not None and profile.longitude is not None:
+        invalidate()
+
+
+def profile_deleted(user_id):
+    index = _index
+    if index is not None:
+        index.set_active(user_id, False)
+
+
+def user_changed(user):
+    index = _index
+    if index is not None:
+        index.set_active(user.id, user.is_active and user.role == "mechanic")
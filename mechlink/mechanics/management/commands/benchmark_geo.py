@@ -0,0 +1,253 @@
+# mechanics/management/commands/benchmark_geo.py
+"""
+Benchmark the nearby-mechanic search as the mechanic table grows.
+
+Builds a synthetic city (clustered workshops with a realistic type mix and
+ratings, plus customer accounts living in the same city), then signs in as
+each customer in turn and drives a real raise_request search from their
+home location through the test client. Query counts, latency percentiles
+and peak memory are reported for each size as JSON. Everything runs inside a transaction that is
+rolled back at the end, so the database is left untouched.
+
+    python manage.py benchmark_geo --sizes 1000 10000 --output bench.json
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from mechanics import location_index, matching
+from mechanics.models import MechanicProfile
+from users.models import CustomUser
+
+# (type mask, weight): two-wheeler shops dominate, heavy-vehicle ones are rare.
+TYPE_MIX = [(1, 45), (2, 30), (3, 15), (4, 4), (6, 4), (7, 2)]
+BATCH_SIZE = 5000
+
+
+class Rollback(Exception):
+    pass
+
+
+class SyntheticCity:
+    """Workshops clustered around a few dozen hubs, like a real metro."""
+
+    def __init__(self, rng, center=(9.9312, 76.2673), hubs=40, spread_deg=0.35):
+        self.rng = rng
+        self.hubs = [
+            (center[0] + rng.gauss(0, spread_deg / 2), center[1] + rng.gauss(0, spread_deg / 2), rng.uniform(0.005, 0.04))
+            for _ in range(hubs)
+        ]
+        self.center = center
+        self.spread_deg = spread_deg
+        self.masks, self.weights = zip(*TYPE_MIX)
+
+    def point(self):
+        if self.rng.random() < 0.8:
+            lat, lon, sigma = self.rng.choice(self.hubs)
+            return lat + self.rng.gauss(0, sigma), lon + self.rng.gauss(0, sigma)
+        # The rest is scattered sparsely across the outskirts.
+        return (
+            self.center[0] + self.rng.uniform(-self.spread_deg, self.spread_deg),
+            self.center[1] + self.rng.uniform(-self.spread_deg, self.spread_deg),
+        )
+
+    def ratings(self):
+        count = int(self.rng.expovariate(1 / 8))
+        stars = [0] * 6
+        for _ in range(count):
+            stars[min(5, max(1, round(self.rng.gauss(4, 1))))] += 1
+        return stars
+
+    def add_customers(self, count):
+        customers = []
+        for offset in range(0, count, BATCH_SIZE):
+            batch = []
+            for i in range(offset, min(offset + BATCH_SIZE, count)):
+                lat, lon = self.point()
+                batch.append(CustomUser(
+                    username=f"bench_customer_{i}", password="!", role="customer", latitude=lat, longitude=lon
+                ))
+            customers += CustomUser.objects.bulk_create(batch)
+        return customers
+
+    def add_mechanics(self, start, count):
+        for offset in range(0, count, BATCH_SIZE):
+            batch = range(start + offset, start + min(offset + BATCH_SIZE, count))
+            users = CustomUser.objects.bulk_create([
+                CustomUser(username=f"bench_mech_{i}", password="!", role="mechanic") for i in batch
+            ])
+            profiles = []
+            for user in users:
+                lat, lon = self.point()
+                stars = self.ratings()
+                profiles.append(MechanicProfile(
+                    user=user,
+                    shop_name=f"Bench Garage {user.username[11:]}",
+                    latitude=lat,
+                    longitude=lon,
+                    mechanic_type_mask=self.rng.choices(self.masks, self.weights)[0],
+                    rating_sum=sum(star * n for star, n in enumerate(stars)),
+                    rating_count=sum(stars),
+                    rating_1_count=stars[1],
+                    rating_2_count=stars[2],
+                    rating_3_count=stars[3],
+                    rating_4_count=stars[4],
+                    rating_5_count=stars[5],
+                ))
+            MechanicProfile.objects.bulk_create(profiles)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Benchmark nearby-mechanic search on a synthetic city (rolled back afterwards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=positive_int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+        parser.add_argument(
+            "--customers", type=positive_int, default=200,
+            help="Customer accounts generated; each times one search from its home location per size.",
+        )
+        parser.add_argument("--mode", choices=["radius", "nearest"], default="radius")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        city = SyntheticCity(rng)
+        report = {
+            "benchmark": "geo_nearby_search",
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": matching.np is not None,
+            "database": connection.vendor,
+            "mode": options["mode"],
+            "customers": options["customers"],
+            "seed": options["seed"],
+            "results": [],
+        }
+
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                customers = city.add_customers(options["customers"])
+                client = Client()
+
+                mechanics = 0
+                for size in sorted(options["sizes"]):
+                    started = time.perf_counter()
+                    city.add_mechanics(mechanics, size - mechanics)
+                    mechanics = size
+                    self.stderr.write(f"{size} mechanics generated in {time.perf_counter() - started:.1f}s")
+                    report["results"].append(self.measure(client, customers, size, options["mode"], rng))
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            teardown_test_environment()
+            location_index.invalidate()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(output + "\n")
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def measure(self, client, customers, size, mode, rng):
+        # Cold start: one worker building its location index from scratch.
+        location_index.invalidate()
+        tracemalloc.start()
+        started = time.perf_counter()
+        location_index.get_index()
+        build_ms = (time.perf_counter() - started) * 1000
+        _, index_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        url = reverse("raise_request")
+        latencies, query_counts, found = [], [], []
+        for customer in customers:
+            client.force_login(customer)  # outside the timed part
+            mechanic_type = rng.choice(["two_wheeler", "automotive", "heavy_vehicle"])
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.post(url, {
+                    "issue": "Benchmark breakdown",
+                    "mechanic_type": mechanic_type,
+                    "latitude": f"{customer.latitude:.6f}",
+                    "longitude": f"{customer.longitude:.6f}",
+                    "search_mode": mode,
+                })
+                latencies.append((time.perf_counter() - started) * 1000)
+            query_counts.append(len(queries))
+            mechanics = response.context["mechanics"] if response.context else None
+            found.append(len(mechanics or []))
+
+        # Memory for a single search on a warm index, measured separately so
+        # tracing overhead does not skew the latencies above.
+        customer = customers[0]
+        client.force_login(customer)
+        tracemalloc.start()
+        client.post(url, {
+            "issue": "Benchmark breakdown", "mechanic_type": "two_wheeler",
+            "latitude": f"{customer.latitude:.6f}", "longitude": f"{customer.longitude:.6f}", "search_mode": mode,
+        })
+        _, search_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies.sort()
+        result = {
+            "mechanics": size,
+            "index_build_ms": round(build_ms, 2),
+            "index_peak_bytes": index_peak,
+            "search_peak_bytes": search_peak,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50), 3),
+                "p90": round(percentile(latencies, 90), 3),
+                "p99": round(percentile(latencies, 99), 3),
+                "max": round(latencies[-1], 3),
+            },
+            "queries": {"min": min(query_counts), "max": max(query_counts),
+                        "mean": round(sum(query_counts) / len(query_counts), 2)},
+            "mechanics_found_mean": round(sum(found) / len(found), 2),
+        }
+        self.stderr.write(
+            f"  p50 {result['latency_ms']['p50']} ms · p99 {result['latency_ms']['p99']} ms · "
+            f"{result['queries']['max']} queries max · index {index_peak / 1e6:.1f} MB"
+        )
+        return result
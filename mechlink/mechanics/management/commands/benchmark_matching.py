@@ -0,0 +1,70 @@
+# mechanics/management/commands/benchmark_matching.py
+import random
+import time
+from math import radians, sin, cos, sqrt, atan2
+
+from django.core.management.base import BaseCommand
+
+from mechanics import matching
+
+
+def legacy_loop(lat, lon, lats, lons, max_km):
+    """The original per-row loop from raise_request, kept as the baseline."""
+    lat1 = radians(lat)
+    lon1 = radians(lon)
+    nearby = []
+    for i, (plat, plon) in enumerate(zip(lats, lons)):
+        lat2 = radians(plat)
+        lon2 = radians(plon)
+        dlon = lon2 - lon1
+        dlat = lat2 - lat1
+        a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+        c = 2 * atan2(sqrt(a), sqrt(1 - a))
+        distance = 6371 * c
+        if distance <= max_km:
+            nearby.append((i, round(distance, 2)))
+    return sorted(nearby, key=lambda item: item[1])
+
+
+class Command(BaseCommand):
+    help = "Compare the per-mechanic distance loop with the batch matching engine."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--k", type=int, default=20, help="Top-K to return from the batch engine.")
+        parser.add_argument("--radius", type=float, default=10, help="Search radius in km.")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        # Around Kochi, roughly where the map in raise_request opens.
+        center_lat, center_lon = 9.9312, 76.2673
+
+        backend = "numpy" if matching.np is not None else "pure python"
+        self.stdout.write(f"Batch engine backend: {backend}")
+        self.stdout.write(f"{'mechanics':>10} {'loop ms':>10} {'batch ms':>10} {'speed-up':>9}")
+
+        for size in options["sizes"]:
+            lats = [center_lat + rng.uniform(-0.5, 0.5) for _ in range(size)]
+            lons = [center_lon + rng.uniform(-0.5, 0.5) for _ in range(size)]
+            batch_lats, batch_lons = lats, lons
+            if matching.np is not None:
+                # Arrays are built once per snapshot in production, not per search.
+                batch_lats, batch_lons = matching.np.array(lats), matching.np.array(lons)
+
+            loop_ms = self._best_of(options["repeat"], legacy_loop, center_lat, center_lon, lats, lons, options["radius"])
+            batch_ms = self._best_of(
+                options["repeat"], matching.nearest, center_lat, center_lon, batch_lats, batch_lons,
+                k=options["k"], max_km=options["radius"],
+            )
+            self.stdout.write(f"{size:>10} {loop_ms:>10.2f} {batch_ms:>10.2f} {loop_ms / batch_ms:>8.1f}x")
+
+    @staticmethod
+    def _best_of(repeat, func, *args, **kwargs):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(*args, **kwargs)
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
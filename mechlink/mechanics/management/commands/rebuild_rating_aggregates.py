@@ -0,0 +1,16 @@
+# mechanics/management/commands/rebuild_rating_aggregates.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mechanics.models import MechanicProfile
+from mechanics.ratings import rebuild_rating_aggregates
+from services.models import MechanicRating
+
+
+class Command(BaseCommand):
+    help = "Recompute the rating totals stored on every MechanicProfile from scratch."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rated = rebuild_rating_aggregates(MechanicProfile, MechanicRating)
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt rating totals ({rated} rated mechanics)."))
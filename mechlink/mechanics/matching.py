@@ -0,0 +1,68 @@
+# mechanics/matching.py
+"""
+📏 Batch distance scoring for mechanic matching.
+
+Candidate coordinates are packed into contiguous arrays and every haversine
+distance is computed in one vectorized pass; ``argpartition`` then picks the
+top-K nearest without sorting the whole set. NumPy is optional — without it
+the same API falls back to a plain Python loop.
+"""
+import heapq
+from math import radians, sin, cos, sqrt, atan2
+
+from .geo import EARTH_RADIUS_KM
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is an optional speed-up
+    np = None
+
+
+def haversine_many(lat, lon, lats, lons):
+    """Distances (km) from one point to every (lats[i], lons[i])."""
+    if np is None:
+        return _haversine_loop(lat, lon, lats, lons)
+
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lons, dtype=np.float64))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    a = np.minimum(a, 1.0)  # rounding can push near-antipodal points just past 1
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _haversine_loop(lat, lon, lats, lons):
+    lat1, lon1 = radians(lat), radians(lon)
+    cos_lat1 = cos(lat1)
+    distances = []
+    for lat2, lon2 in zip(lats, lons):
+        lat2, lon2 = radians(lat2), radians(lon2)
+        a = min(sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos(lat2) * sin((lon2 - lon1) / 2) ** 2, 1.0)
+        distances.append(EARTH_RADIUS_KM * 2 * atan2(sqrt(a), sqrt(1 - a)))
+    return distances
+
+
+def nearest(lat, lon, lats, lons, k=None, max_km=None):
+    """
+    Indexes and distances of the ``k`` nearest points (all when ``k`` is None),
+    optionally limited to ``max_km``, sorted nearest first: ``[(i, km), ...]``.
+    """
+    if len(lats) == 0:
+        return []
+
+    distances = haversine_many(lat, lon, lats, lons)
+
+    if np is None:
+        ranked = [(i, d) for i, d in enumerate(distances) if max_km is None or d <= max_km]
+        if k is not None:
+            return heapq.nsmallest(k, ranked, key=lambda item: item[1])
+        return sorted(ranked, key=lambda item: item[1])
+
+    candidates = np.arange(len(distances))
+    if max_km is not None:
+        candidates = candidates[distances <= max_km]
+    if k is not None and k < len(candidates):
+        top = np.argpartition(distances[candidates], k - 1)[:k]
+        candidates = candidates[top]
+    order = candidates[np.argsort(distances[candidates], kind="stable")]
+    return [(int(i), float(distances[i])) for i in order]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:53
+
+from django.db import migrations, models
+
+from mechanics.geo import grid_cell
+
+
+def fill_geo_cells(apps, schema_editor):
+    MechanicProfile = apps.get_model('mechanics', 'MechanicProfile')
+    profiles = list(MechanicProfile.objects.filter(latitude__isnull=False, longitude__isnull=False))
+    for profile in profiles:
+        profile.geo_cell = grid_cell(profile.latitude, profile.longitude)
+    MechanicProfile.objects.bulk_update(profiles, ['geo_cell'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mechanics', '0009_alter_mechanicprofile_mechanic_types'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mechanicprofile',
+            name='geo_cell',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=32),
+        ),
+        migrations.RunPython(fill_geo_cells, migrations.RunPython.noop),
+    ]
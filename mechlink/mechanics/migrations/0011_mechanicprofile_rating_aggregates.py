@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:55
+
+from django.db import migrations, models
+
+from mechanics.ratings import rebuild_rating_aggregates
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    rebuild_rating_aggregates(
+        apps.get_model('mechanics', 'MechanicProfile'),
+        apps.get_model('services', 'MechanicRating'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mechanics', '0010_mechanicprofile_geo_cell'),
+        ('services', '0011_alter_servicerequest_status'),
+        ('users', '0005_customuser_latitude_customuser_longitude'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mechanicprofile',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mechanicprofile',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mechanicprofile',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mechanicprofile',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mechanicprofile',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mechanicprofile',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mechanicprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:57
+
+import json
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of MechanicProfile.TYPE_BITS at the time of this migration.
+TYPE_BITS = {'two_wheeler': 1, 'automotive': 2, 'heavy_vehicle': 4}
+
+
+def stored_types(value):
+    """Type values from the old column: "a,b", or a list as the profile form saved it ('["a", "b"]')."""
+    value = value.strip()
+    if value.startswith('['):
+        try:
+            return json.loads(value.replace("'", '"'))
+        except ValueError:
+            return []
+    return value.split(',')
+
+
+def types_to_mask(apps, schema_editor):
+    MechanicProfile = apps.get_model('mechanics', 'MechanicProfile')
+    profiles = list(MechanicProfile.objects.exclude(mechanic_types=''))
+    for profile in profiles:
+        profile.mechanic_type_mask = 0
+        for value in stored_types(profile.mechanic_types):
+            profile.mechanic_type_mask |= TYPE_BITS.get(str(value).strip(), 0)
+    MechanicProfile.objects.bulk_update(profiles, ['mechanic_type_mask'], batch_size=500)
+
+
+def mask_to_types(apps, schema_editor):
+    MechanicProfile = apps.get_model('mechanics', 'MechanicProfile')
+    profiles = list(MechanicProfile.objects.exclude(mechanic_type_mask=0))
+    for profile in profiles:
+        profile.mechanic_types = ','.join(
+            value for value, bit in TYPE_BITS.items() if profile.mechanic_type_mask & bit
+        )
+    MechanicProfile.objects.bulk_update(profiles, ['mechanic_types'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mechanics', '0011_mechanicprofile_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mechanicprofile',
+            name='mechanic_type_mask',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(types_to_mask, mask_to_types),
+        migrations.RemoveField(
+            model_name='mechanicprofile',
+            name='mechanic_types',
+        ),
+        migrations.AlterField(
+            model_name='mechanicprofile',
+            name='geo_cell',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='mechanicprofile',
+            index=models.Index(fields=['geo_cell', 'mechanic_type_mask'], name='mech_geo_cell_type_idx'),
+        ),
+    ]
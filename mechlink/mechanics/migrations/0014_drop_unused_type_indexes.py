@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mechanics', '0013_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='mechanicprofile',
+            name='mech_geo_cell_type_idx',
+        ),
+        migrations.AlterField(
+            model_name='mechanicprofile',
+            name='mechanic_type_mask',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
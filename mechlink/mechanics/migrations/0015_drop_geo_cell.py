@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:08
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mechanics', '0014_drop_unused_type_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='mechanicprofile',
+            name='geo_cell',
+        ),
+    ]
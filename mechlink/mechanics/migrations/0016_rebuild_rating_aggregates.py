@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:40
+
+from django.db import migrations
+
+from mechanics.ratings import rebuild_rating_aggregates
+
+
+def refill_rating_aggregates(apps, schema_editor):
+    # 0011 also counted Feedback rows; recompute from MechanicRating only
+    rebuild_rating_aggregates(
+        apps.get_model('mechanics', 'MechanicProfile'),
+        apps.get_model('services', 'MechanicRating'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mechanics', '0015_drop_geo_cell'),
+        ('services', '0018_outbox_claimed_by'),
+    ]
+
+    operations = [
+        migrations.RunPython(refill_rating_aggregates, migrations.RunPython.noop),
+    ]
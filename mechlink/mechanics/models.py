@@ -1,8 +1,10 @@
 from django.db import models
+from django.db.models import F
 from django.conf import settings
 
 User = settings.AUTH_USER_MODEL
 
+
 class MechanicProfile(models.Model):
     MECHANIC_TYPE_CHOICES = [
         ('two_wheeler', 'Two-Wheeler Mechanic'),
@@ -10,6 +12,9 @@ class MechanicProfile(models.Model):
         ('heavy_vehicle', 'Heavy Vehicle Mechanic'),
     ]
 
+    # 🔢 One bit per mechanic type, so "can fix X" is a single AND
+    TYPE_BITS = {value: 1 << i for i, (value, _label) in enumerate(MECHANIC_TYPE_CHOICES)}
+
     user = models.OneToOneField(
         'users.CustomUser',
         on_delete=models.CASCADE,
@@ -24,9 +29,73 @@ class MechanicProfile(models.Model):
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
 
-    # 👇 NEW FIELD
-    mechanic_types = models.CharField(max_length=255, blank=True)
-
+    # 🔢 Mechanic types as a bitmask of TYPE_BITS (see the mechanic_types property).
+    # Type and grid-cell filtering happen in mechanics.location_index, which
+    # loads every row once per worker, so neither needs a database index.
+    mechanic_type_mask = models.PositiveSmallIntegerField(default=0)
+
+    # ⭐ Running rating totals over MechanicRating, kept in step by
+    # record_rating() and rebuilt by `manage.py rebuild_rating_aggregates`
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def type_mask(cls, types):
+        """Bitmask for a list of type values (or a comma-separated string)."""
+        if isinstance(types, str):
+            types = types.split(",")
+        mask = 0
+        for value in types:
+            mask |= cls.TYPE_BITS.get(value.strip(), 0)
+        return mask
+
+    @property
+    def mechanic_types(self):
+        """Selected type values, e.g. ``["two_wheeler", "automotive"]``."""
+        return [value for value, bit in self.TYPE_BITS.items() if self.mechanic_type_mask & bit]
+
+    @mechanic_types.setter
+    def mechanic_types(self, types):
+        self.mechanic_type_mask = self.type_mask(types)
+
+    @property
+    def average_rating(self):
+        return round(self.rating_sum / self.rating_count, 1) if self.rating_count else 0
+
+    @property
+    def rating_breakdown(self):
+        """Star → number of ratings, 5 stars first."""
+        return {i: getattr(self, f"rating_{i}_count") for i in range(5, 0, -1)}
+
+    @classmethod
+    def record_rating(cls, mechanic, rating, previous=None):
+        """
+        Add a rating to the mechanic's running totals. Pass ``previous`` when an
+        existing rating is being changed so it is swapped out instead of added.
+        Call it inside the transaction that writes the rating row.
+        """
+        profile, _ = cls.objects.get_or_create(user=mechanic)
+        updates = {}
+
+        def bump(field, delta):
+            updates[field] = updates.get(field, F(field)) + delta
+
+        if previous is None:
+            bump("rating_count", 1)
+        else:
+            bump("rating_sum", -previous)
+            if 1 <= previous <= 5:
+                bump(f"rating_{previous}_count", -1)
+        bump("rating_sum", rating)
+        if 1 <= rating <= 5:
+            bump(f"rating_{rating}_count", 1)
+
+        cls.objects.filter(pk=profile.pk).update(**updates)
 
     def __str__(self):
         return self.shop_name or self.user.username
@@ -66,6 +135,12 @@ class Order(models.Model):
     def __str__(self):
         return f"Order #{self.id} - {self.customer.username}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', '-ordered_at'], name='order_customer_ordered_idx'),
+            models.Index(fields=['product', 'status'], name='order_product_status_idx'),
+        ]
+
 
 
 class CartItem(models.Model):
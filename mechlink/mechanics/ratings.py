@@ -0,0 +1,48 @@
+# mechanics/ratings.py
+"""
+⭐ Full rebuild of the rating totals stored on MechanicProfile.
+
+Day to day the totals are maintained by ``MechanicProfile.record_rating``;
+this recomputes them from the MechanicRating rows, the same ratings the
+average has always been taken over (free-text Feedback is shown alongside
+but not averaged). The model classes are passed in so the same code serves
+the management command and the data migrations (which must use historical
+models).
+"""
+from collections import defaultdict
+
+from django.db.models import Count
+
+RATING_FIELDS = ["rating_sum", "rating_count"] + [f"rating_{i}_count" for i in range(1, 6)]
+
+
+def rebuild_rating_aggregates(MechanicProfile, MechanicRating):
+    """Recompute every mechanic's rating totals; returns the number of rated mechanics."""
+    totals = defaultdict(lambda: dict.fromkeys(RATING_FIELDS, 0))
+
+    rows = (
+        MechanicRating.objects.order_by()
+        .values("mechanic_id", "rating")
+        .annotate(n=Count("id"))
+        .values_list("mechanic_id", "rating", "n")
+    )
+    for mechanic_id, rating, n in rows:
+        mechanic_totals = totals[mechanic_id]
+        mechanic_totals["rating_sum"] += rating * n
+        mechanic_totals["rating_count"] += n
+        if 1 <= rating <= 5:
+            mechanic_totals[f"rating_{rating}_count"] += n
+
+    # Rated mechanics who never filled in their workshop profile still need a row.
+    existing = set(MechanicProfile.objects.filter(user_id__in=totals).values_list("user_id", flat=True))
+    MechanicProfile.objects.bulk_create(
+        [MechanicProfile(user_id=user_id) for user_id in totals if user_id not in existing]
+    )
+
+    zeros = dict.fromkeys(RATING_FIELDS, 0)
+    profiles = list(MechanicProfile.objects.only("id", "user_id", *RATING_FIELDS))
+    for profile in profiles:
+        for field, value in totals.get(profile.user_id, zeros).items():
+            setattr(profile, field, value)
+    MechanicProfile.objects.bulk_update(profiles, RATING_FIELDS, batch_size=500)
+    return len(totals)
@@ -0,0 +1,76 @@
+# mechanics/signals.py
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from services.models import ChatMessage, ServiceRequest
+from services.notifications import register_channel
+from users.models import Feedback
+from . import dashboard, location_index
+from .models import MechanicProfile, Order, Product
+
+
+# 🗺️ Keep the in-memory location index in step with workshop edits
+# (edit_mechanic_profile) and suspensions (suspend_mechanic / activate_mechanic).
+@receiver(post_save, sender=MechanicProfile)
+def mechanic_profile_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: location_index.profile_changed(instance))
+
+
+@receiver(post_delete, sender=MechanicProfile)
+def mechanic_profile_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: location_index.profile_deleted(instance.user_id))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def mechanic_user_saved(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: location_index.user_changed(instance))
+
+
+# 🧊 Invalidate the cached dashboard sections a write shows up in.
+# Queryset .update()/bulk paths call mechanics.dashboard.bump themselves.
+def _mechanic_user_id(profile_id):
+    return MechanicProfile.objects.filter(pk=profile_id).values_list("user_id", flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Order)
+def order_changed(sender, instance, **kwargs):
+    owner = Product.objects.filter(pk=instance.product_id).values_list("mechanic__user_id", flat=True).first()
+    dashboard.bump([owner], "orders")
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, **kwargs):
+    # Order cards show the product name
+    dashboard.bump([_mechanic_user_id(instance.mechanic_id)], "products", "orders")
+
+
+@receiver([post_save, post_delete], sender=Feedback)
+def feedback_changed(sender, instance, **kwargs):
+    dashboard.bump([instance.mechanic_id], "feedback")
+
+
+@receiver(post_save, sender=ServiceRequest)
+def service_request_saved(sender, instance, created, **kwargs):
+    if created:
+        dashboard.bump([instance.mechanic_id], "requests", "chats")  # offers, if any, come later
+    else:
+        dashboard.requests_changed([instance.id])
+
+
+@receiver(post_delete, sender=ServiceRequest)
+def service_request_deleted(sender, instance, **kwargs):
+    dashboard.bump([instance.mechanic_id], "requests", "chats")
+
+
+@receiver(post_save, sender=ChatMessage)
+def chat_message_saved(sender, instance, created, **kwargs):
+    if created:
+        dashboard.bump([instance.sender_id, instance.receiver_id], "chats")
+
+
+@register_channel("dashboard")
+def notifications_delivered(notifications):
+    dashboard.bump([notification.recipient_id for notification in notifications], "notifications")
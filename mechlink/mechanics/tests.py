@@ -1,3 +1,610 @@
-from django.test import TestCase
+import math
+import random
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from services.models import ChatMessage, MechanicRating, Notification, ServiceRequest
+from services.tests import QueryPlanMixin
+from users.models import CustomUser, Feedback
+from . import geo, location_index, matching
+from .dashboard import ORDER_STATUSES
+from .geo import GRID_CELL_DEG, cell_index, covered_km, haversine_km, ring_cells
+from .location_index import MechanicLocationIndex
+from .models import MechanicProfile, Order, Product
+from .ratings import RATING_FIELDS, rebuild_rating_aggregates
+
+
+# 📈 Order listings must stay on an index
+class OrderIndexTests(QueryPlanMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+        cls.profile = MechanicProfile.objects.create(user=mechanic)
+
+    def test_customer_orders_newest_first(self):
+        self.assertUsesIndex(
+            Order.objects.filter(customer=self.customer).order_by("-ordered_at"),
+            "order_customer_ordered_idx",
+        )
+
+    def test_mechanic_orders_by_status(self):
+        self.assertUsesIndex(
+            Order.objects.filter(product__mechanic=self.profile, status="Paid").order_by("-ordered_at"),
+            "order_product_status_idx",
+        )
+
+
+# 📊 The dashboard costs the same number of queries however busy the mechanic is
+class DashboardQueryBudgetTests(TestCase):
+    # session, user, one per section (profile, requests, notifications,
+    # products, order counts, orders, feedback, open chats) and the two
+    # unread badge counts, which a cold cache reads from the database
+    QUERY_BUDGET = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+        cls.profile = MechanicProfile.objects.create(user=cls.mechanic)
+        cls.product = Product.objects.create(mechanic=cls.profile, name="Brake pads", price=500, stock=10)
+
+    def setUp(self):
+        cache.clear()  # unread badges come from the cache when it is warm
+        self.client.force_login(self.mechanic)
+        self.customers = 0
+
+    def add_activity(self, n):
+        for _ in range(n):
+            self.customers += 1
+            customer = CustomUser.objects.create_user(f"customer{self.customers}", password="x", role="customer")
+            for status in ORDER_STATUSES:
+                Order.objects.create(customer=customer, product=self.product, total_price=500, status=status)
+            request = ServiceRequest.objects.create(
+                user=customer, mechanic=self.mechanic, issue_description="Flat tyre", status="accepted"
+            )
+            ChatMessage.objects.create(service_request=request, sender=customer, receiver=self.mechanic, message="Hi")
+            Feedback.objects.create(mechanic=self.mechanic, customer=customer, rating=4, comment="Quick")
+            Notification.objects.create(recipient=self.mechanic, sender=customer, message="New order")
+
+    def assertDashboardWithinBudget(self):
+        cache.clear()
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(reverse("mechanic_dashboard"))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_budget_does_not_grow_with_activity(self):
+        self.add_activity(1)
+        self.assertDashboardWithinBudget()
+        self.add_activity(10)
+        response = self.assertDashboardWithinBudget()
+
+        self.assertEqual(response.context["order_counts"]["all"], 55)
+        self.assertEqual(response.context["order_counts"]["paid"], 11)
+        self.assertEqual(len(response.context["paid_orders"]), 11)
+        self.assertEqual(len(response.context["active_chats"]), 11)
+        self.assertContains(response, "customer11")
+
+
+# 🧊 Cached sections are reused until a write touches them
+class DashboardFragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        profile = MechanicProfile.objects.create(user=cls.mechanic)
+        cls.product = Product.objects.create(mechanic=profile, name="Brake pads", price=500, stock=10)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.mechanic)
+        self.client.get(reverse("mechanic_dashboard"))  # warm every section
+
+    def test_unchanged_dashboard_is_served_from_cache(self):
+        with self.assertNumQueries(2):  # session and user only
+            self.client.get(reverse("mechanic_dashboard"))
+
+    def test_new_order_reloads_only_the_order_sections(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(customer=self.customer, product=self.product, total_price=500, status="Paid")
+        with self.assertNumQueries(5):  # session, user, profile, order counts, orders
+            response = self.client.get(reverse("mechanic_dashboard"))
+        self.assertContains(response, "Paid (1)")
+
+    def test_feedback_reloads_the_feedback_section(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Feedback.objects.create(mechanic=self.mechanic, customer=self.customer, rating=5, comment="Spotless work")
+        self.assertContains(self.client.get(reverse("mechanic_dashboard")), "Spotless work")
+
+
+# 🔢 The bitmask backfill reads both formats the old column held
+class MechanicTypeMaskMigrationTests(TransactionTestCase):
+    before = [("mechanics", "0011_mechanicprofile_rating_aggregates")]
+    after = [("mechanics", "0012_mechanic_type_mask")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_comma_separated_and_json_lists_are_converted(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model("users", "CustomUser")
+        Profile = apps.get_model("mechanics", "MechanicProfile")
+        stored = {
+            "comma": "two_wheeler, automotive",
+            "json": '["automotive"]',
+            "json_pair": '["two_wheeler", "heavy_vehicle"]',
+            "empty_list": "[]",
+        }
+        for username, types in stored.items():
+            Profile.objects.create(user=User.objects.create(username=username, role="mechanic"), mechanic_types=types)
+
+        apps = self.migrate(self.after)
+        masks = dict(
+            apps.get_model("mechanics", "MechanicProfile").objects.values_list("user__username", "mechanic_type_mask")
+        )
+        self.assertEqual(masks, {"comma": 1 | 2, "json": 2, "json_pair": 1 | 4, "empty_list": 0})
+
+
+def brute_force(rows, lat, lon, mechanic_type, max_km, k=None):
+    """Reference answer: every matching active row within ``max_km``, nearest first."""
+    bit = MechanicProfile.TYPE_BITS[mechanic_type]
+    found = sorted(
+        (haversine_km(lat, lon, row_lat, row_lon), user_id)
+        for user_id, row_lat, row_lon, mask, active in rows
+        if active and mask & bit
+    )
+    found = [(user_id, distance) for distance, user_id in found if distance <= max_km]
+    return found if k is None else found[:k]
+
+
+class BruteForceMixin:
+    def assertMatchesBruteForce(self, found, rows, lat, lon, mechanic_type, max_km, k=None):
+        """Same distances in the same order; rows tied on distance may come in either order."""
+        expected = brute_force(rows, lat, lon, mechanic_type, max_km, k)
+        self.assertEqual(len(found), len(expected))
+        reference = dict(brute_force(rows, lat, lon, mechanic_type, max_km))
+        self.assertEqual(len({user_id for user_id, _ in found}), len(found))
+        for (user_id, distance), (_, expected_distance) in zip(found, expected):
+            self.assertAlmostEqual(distance, expected_distance, places=6)
+            self.assertAlmostEqual(reference[user_id], distance, places=6)
+
+
+def random_city(rng, count, center=(9.93, 76.27), spread=0.3):
+    masks = [1, 2, 3, 4, 7]
+    return [
+        (i, center[0] + rng.uniform(-spread, spread), center[1] + rng.uniform(-spread, spread),
+         rng.choice(masks), rng.random() > 0.1)
+        for i in range(1, count + 1)
+    ]
+
+
+# 🎯 k-nearest search reads rings outwards and matches a brute-force scan
+class NearestSearchTests(BruteForceMixin, SimpleTestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(6)
+        rows = random_city(rng, 400)
+        index = MechanicLocationIndex(rows)
+        for _ in range(150):
+            lat, lon = 9.93 + rng.uniform(-0.4, 0.4), 76.27 + rng.uniform(-0.4, 0.4)
+            mechanic_type = rng.choice(list(MechanicProfile.TYPE_BITS))
+            k, max_km = rng.choice([1, 5, 20]), rng.choice([2, 10, 60])
+            with self.subTest(lat=lat, lon=lon, type=mechanic_type, k=k, max_km=max_km):
+                self.assertMatchesBruteForce(
+                    index.nearest(lat, lon, mechanic_type, k, max_km), rows, lat, lon, mechanic_type, max_km, k
+                )
+
+    def test_fewer_than_k_in_range(self):
+        rows = [(1, 10.0, 76.0, 1, True), (2, 10.01, 76.0, 1, True), (3, 10.5, 76.0, 1, True)]
+        found = MechanicLocationIndex(rows).nearest(10.0, 76.0, "two_wheeler", 10, 5)
+        self.assertEqual([user_id for user_id, _ in found], [1, 2])
+
+    def test_ties_at_the_kth_place(self):
+        # Mirror images east and west of the point are exactly as far away
+        rows = [(1, 10.0, 76.0, 1, True), (2, 10.0, 76.02, 1, True), (3, 10.0, 75.98, 1, True),
+                (4, 10.0, 76.2, 1, True)]
+        found = MechanicLocationIndex(rows).nearest(10.0, 76.0, "two_wheeler", 2, 50)
+        self.assertEqual(found[0][0], 1)
+        self.assertIn(found[1][0], {2, 3})
+        self.assertMatchesBruteForce(found, rows, 10.0, 76.0, "two_wheeler", 50, 2)
+
+    def test_type_mask_and_inactive_rows_filter(self):
+        rows = [(1, 10.0, 76.001, 2, True), (2, 10.0, 76.002, 1 | 4, True), (3, 10.0, 76.003, 4, False),
+                (4, 10.0, 76.004, 6, True)]
+        index = MechanicLocationIndex(rows)
+        self.assertEqual([u for u, _ in index.nearest(10.0, 76.0, "heavy_vehicle", 5, 10)], [2, 4])
+        self.assertEqual([u for u, _ in index.nearest(10.0, 76.0, "automotive", 5, 10)], [1, 4])
+
+    def test_nothing_beyond_max_km(self):
+        rows = [(1, 10.0, 76.08, 1, True)]  # ≈ 8.8 km east
+        index = MechanicLocationIndex(rows)
+        self.assertEqual(index.nearest(10.0, 76.0, "two_wheeler", 3, 5), [])
+        self.assertEqual([u for u, _ in index.nearest(10.0, 76.0, "two_wheeler", 3, 10)], [1])
+
+    def test_stops_once_the_kth_distance_is_covered(self):
+        rows = random_city(random.Random(7), 300, spread=0.02)
+        index = MechanicLocationIndex(rows)
+        with mock.patch("mechanics.location_index.ring_cells", wraps=ring_cells) as rings:
+            index.nearest(9.93, 76.27, "two_wheeler", 1, 500)
+        self.assertLessEqual(rings.call_count, 3)
+
+    def test_max_km_bounds_the_rings_read(self):
+        index = MechanicLocationIndex([])
+        with mock.patch("mechanics.location_index.ring_cells", wraps=ring_cells) as rings:
+            self.assertEqual(index.nearest(9.93, 76.27, "two_wheeler", 1, 20), [])
+        cell_km = GRID_CELL_DEG * geo.KM_PER_DEG_LAT
+        self.assertLessEqual(rings.call_count, 20 / cell_km + 3)
+
+
+# 🧮 Rings and the radius they are guaranteed to cover
+class RingTests(SimpleTestCase):
+    def test_rings_tile_the_block_without_overlap(self):
+        row, col = cell_index(9.93, 76.27)
+        seen = []
+        for ring in range(4):
+            cells = ring_cells(row, col, ring)
+            self.assertEqual(len(cells), max(1, 8 * ring))
+            seen += cells
+        block = {f"{r}:{c}" for r in range(row - 3, row + 4) for c in range(col - 3, col + 4)}
+        self.assertEqual(sorted(seen), sorted(block))
+
+    def test_rings_wrap_across_the_antimeridian(self):
+        row, col = cell_index(0.0, 179.99)
+        east = set(ring_cells(row, col, 1))
+        self.assertIn(geo.grid_cell(0.0, -179.99), east)
+
+    def test_nothing_outside_the_rings_is_closer_than_covered_km(self):
+        rng = random.Random(8)
+        for lat, lon in [(9.93, 76.27), (59.9, 10.7), (-33.9, 151.2), (0.01, 179.98)]:
+            row, col = cell_index(lat, lon)
+            for ring in range(4):
+                radius = covered_km(lat, lon, ring)
+                for _ in range(200):
+                    point = lat + rng.uniform(-0.5, 0.5), lon + rng.uniform(-0.5, 0.5)
+                    point_row, point_col = cell_index(*point)
+                    col_steps = min(abs(point_col - col), geo.GRID_COLS - abs(point_col - col))
+                    if max(abs(point_row - row), col_steps) > ring:
+                        self.assertGreaterEqual(haversine_km(lat, lon, *point), radius - 1e-9)
+
+
+# 📍 Radius search over grid cells matches a brute-force scan, also where the
+# grid is awkward: on cell edges, across the antimeridian and near the poles
+class RadiusSearchTests(BruteForceMixin, SimpleTestCase):
+    CENTERS = [
+        (10.0, 76.0),  # a cell corner
+        (9.93, 76.27),
+        (0.0, 179.99),
+        (-16.5, -179.98),
+        (84.9, 30.0),
+        (-84.9, -150.0),
+    ]
+
+    @staticmethod
+    def wrap(lon):
+        return (lon + 180) % 360 - 180
+
+    def test_cells_within_holds_every_point_in_range(self):
+        rng = random.Random(1)
+        for lat, lon in self.CENTERS:
+            for max_km in (1, 5.5597, 10, 11.1195, 37):
+                cells = set(geo.cells_within(lat, lon, max_km))
+                for _ in range(200):
+                    # Aim at the rim, where a missing row or column would show
+                    bearing, reach = rng.uniform(0, 360), max_km * rng.uniform(0.9, 1.0)
+                    dlat = reach / geo.KM_PER_DEG_LAT * math.cos(math.radians(bearing))
+                    dlon = reach / (geo.KM_PER_DEG_LAT * math.cos(math.radians(lat))) * math.sin(math.radians(bearing))
+                    point = (lat + dlat, self.wrap(lon + dlon))
+                    if haversine_km(lat, lon, *point) <= max_km:
+                        self.assertIn(geo.grid_cell(*point), cells, (lat, lon, max_km, point))
+
+    def test_search_matches_brute_force(self):
+        rng = random.Random(2)
+        for center in self.CENTERS:
+            rows = [
+                (user_id, lat, self.wrap(lon), mask, active)
+                for user_id, lat, lon, mask, active in random_city(rng, 300, center=center, spread=0.4)
+            ]
+            index = MechanicLocationIndex(rows)
+            for _ in range(25):
+                lat = center[0] + rng.uniform(-0.3, 0.3)
+                lon = self.wrap(center[1] + rng.uniform(-0.3, 0.3))
+                mechanic_type = rng.choice(list(MechanicProfile.TYPE_BITS))
+                max_km = rng.choice([2, 10, 25])
+                with self.subTest(center=center, lat=lat, lon=lon, type=mechanic_type, max_km=max_km):
+                    self.assertMatchesBruteForce(
+                        index.search(lat, lon, mechanic_type, max_km), rows, lat, lon, mechanic_type, max_km
+                    )
+
+    def test_points_on_cell_edges(self):
+        # Workshops sitting exactly on row and column boundaries around the point
+        edge = GRID_CELL_DEG
+        rows = [
+            (i, 10.0 + dr * edge, 76.0 + dc * edge, 1, True)
+            for i, (dr, dc) in enumerate(((dr, dc) for dr in range(-2, 3) for dc in range(-2, 3)), start=1)
+        ]
+        index = MechanicLocationIndex(rows)
+        for lat, lon in ((10.0, 76.0), (10.0 - 1e-9, 76.0 - 1e-9), (10.025, 76.025)):
+            for max_km in (5.5, 5.6, 11.2):
+                self.assertMatchesBruteForce(
+                    index.search(lat, lon, "two_wheeler", max_km), rows, lat, lon, "two_wheeler", max_km
+                )
+
+    def test_row_span_uses_the_same_earth_as_haversine(self):
+        # Due south of a row's lower edge, at just under two cells' worth of km
+        max_km = 11.13
+        point = (10.0 - math.degrees(max_km / geo.EARTH_RADIUS_KM) + 1e-7, 76.01)
+        self.assertLessEqual(haversine_km(10.0, 76.01, *point), max_km)
+        self.assertIn(geo.grid_cell(*point), geo.cells_within(10.0, 76.01, max_km))
+
+    def test_across_the_antimeridian(self):
+        rows = [(1, 0.0, 179.98, 1, True), (2, 0.0, -179.98, 1, True), (3, 0.0, 179.5, 1, True)]
+        found = MechanicLocationIndex(rows).search(0.0, -179.999, "two_wheeler", 5)
+        self.assertEqual(sorted(user_id for user_id, _ in found), [1, 2])
+
+    def test_across_the_pole(self):
+        # Half a world apart in longitude, a few kilometres apart over the pole
+        rows = [(1, 89.98, 0.0, 1, True), (2, 89.98, 180.0 - 1e-9, 1, True), (3, 89.98, 90.0, 1, True),
+                (4, 89.5, 180.0 - 1e-9, 1, True)]
+        index = MechanicLocationIndex(rows)
+        self.assertMatchesBruteForce(index.search(89.98, 0.0, "two_wheeler", 5), rows, 89.98, 0.0, "two_wheeler", 5)
+        self.assertEqual(len(index.search(89.98, 0.0, "two_wheeler", 5)), 3)
+
+
+# 🔍 raise_request's radius mode lists exactly the workshops in range
+class RaiseRequestRadiusTests(BruteForceMixin, TestCase):
+    def setUp(self):
+        location_index.invalidate()
+        self.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        self.client.force_login(self.customer)
+
+    def tearDown(self):
+        location_index.invalidate()
+
+    def test_radius_mode_lists_what_a_brute_force_scan_finds(self):
+        # A workshop cluster straddling the antimeridian
+        rng = random.Random(3)
+        rows = []
+        for user_id, lat, lon, mask, active in random_city(rng, 40, center=(-16.5, 179.98), spread=0.12):
+            lon = (lon + 180) % 360 - 180
+            user = CustomUser.objects.create(username=f"mechanic{user_id}", role="mechanic", is_active=active)
+            MechanicProfile.objects.create(user=user, latitude=lat, longitude=lon, mechanic_type_mask=mask)
+            rows.append((user.id, lat, lon, mask, active))
+
+        response = self.client.post(reverse("raise_request"), {
+            "issue": "Flat tyre", "mechanic_type": "automotive", "search_mode": "radius",
+            "latitude": "-16.5", "longitude": "-179.99",
+        })
+        self.assertEqual(response.status_code, 200)
+        found = [(m.id, m.distance) for m in response.context["mechanics"]]
+        expected = brute_force(rows, -16.5, -179.99, "automotive", 10)
+        self.assertTrue(expected)
+        self.assertEqual(len(found), len(expected))
+        for (user_id, distance), (_, expected_distance) in zip(found, expected):
+            self.assertAlmostEqual(distance, round(expected_distance, 2), places=2)
+
+
+# 📏 Batch scoring agrees with haversine_km, with and without NumPy
+class MatchingTests(SimpleTestCase):
+    def scorers(self):
+        """Run the block once per code path; only the loop when NumPy is missing."""
+        for numpy in {matching.np, None}:
+            with self.subTest(numpy=numpy is not None), mock.patch.object(matching, "np", numpy):
+                yield
+
+    def random_points(self, rng, count):
+        points = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(count)]
+        # Seams of the coordinate system: the antimeridian, the poles, antipodes
+        points += [(0.0, 180.0), (0.0, -179.999), (12.5, 179.99), (89.999, 45.0), (90.0, 0.0),
+                   (-90.0, 120.0), (-89.99, -179.99)]
+        return points
+
+    def test_haversine_many_matches_haversine_km(self):
+        rng = random.Random(2)
+        points = self.random_points(rng, 300)
+        lats, lons = [p[0] for p in points], [p[1] for p in points]
+        origins = [(0.0, 179.999), (89.99, 0.0), (-45.0, 10.0), (-89.9, -150.0)]
+        origins += [(-lat, lon - 180 if lon > 0 else lon + 180) for lat, lon in points[:20]]  # antipodes
+        for _ in self.scorers():
+            for lat, lon in origins:
+                distances = list(matching.haversine_many(lat, lon, lats, lons))
+                self.assertEqual(len(distances), len(points))
+                for distance, point in zip(distances, points):
+                    self.assertAlmostEqual(distance, haversine_km(lat, lon, *point), places=6)
+
+    def test_nearest_matches_a_full_sort(self):
+        rng = random.Random(3)
+        for _ in self.scorers():
+            for origin in ((0.0, 179.99), (89.95, 20.0), (9.93, 76.27)):
+                points = self.random_points(rng, 100)
+                points += [(origin[0] + rng.uniform(-0.5, 0.5), origin[1] + rng.uniform(-0.5, 0.5)) for _ in range(100)]
+                points = [(max(-90, min(90, lat)), (lon + 180) % 360 - 180) for lat, lon in points]
+                lats, lons = [p[0] for p in points], [p[1] for p in points]
+                reference = sorted(haversine_km(*origin, *point) for point in points)
+                for k in (None, 0, 1, 7, len(points), len(points) + 5):
+                    for max_km in (None, 5, 60, 20000):
+                        expected = [d for d in reference if max_km is None or d <= max_km]
+                        expected = expected if k is None else expected[:k]
+                        found = matching.nearest(*origin, lats, lons, k=k, max_km=max_km)
+                        self.assertEqual(len(found), len(expected), (origin, k, max_km))
+                        for (i, distance), expected_distance in zip(found, expected):
+                            self.assertAlmostEqual(distance, expected_distance, places=6)
+                            self.assertAlmostEqual(haversine_km(*origin, *points[i]), distance, places=6)
+                        self.assertEqual(len({i for i, _ in found}), len(found))
+
+    def test_ties_keep_one_of_the_tied_points(self):
+        lats, lons = [10.0, 10.0, 10.0], [76.1, 75.9, 76.3]  # first two mirror each other
+        for _ in self.scorers():
+            found = matching.nearest(10.0, 76.0, lats, lons, k=1)
+            self.assertEqual(len(found), 1)
+            self.assertIn(found[0][0], {0, 1})
+
+    def test_no_points(self):
+        for _ in self.scorers():
+            self.assertEqual(matching.nearest(10.0, 76.0, [], [], k=3), [])
+
+
+# 🗺️ Profile and user writes patch this worker's location index straight away
+class LocationIndexInvalidationTests(TestCase):
+    def setUp(self):
+        location_index.invalidate()
+        self.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+        self.profile = MechanicProfile.objects.create(
+            user=self.mechanic, latitude=10.0, longitude=76.0, mechanic_type_mask=MechanicProfile.TYPE_BITS["two_wheeler"]
+        )
+        self.assertTrue(self.found())  # builds the snapshot the writes below must patch
+
+    def tearDown(self):
+        location_index.invalidate()
+
+    def found(self, lat=10.0, lon=76.0, mechanic_type="two_wheeler"):
+        return self.mechanic.id in dict(location_index.get_index().search(lat, lon, mechanic_type, 5))
+
+    def save(self, instance):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    def test_moving_a_workshop(self):
+        index = location_index.get_index()
+        self.profile.latitude, self.profile.longitude = 10.5, 76.5
+        self.save(self.profile)
+        self.assertIs(location_index.get_index(), index)  # patched in place, not rebuilt
+        self.assertFalse(self.found())
+        self.assertTrue(self.found(10.5, 76.5))
+
+    def test_changing_types(self):
+        self.profile.mechanic_types = ["automotive"]
+        self.save(self.profile)
+        self.assertFalse(self.found())
+        self.assertTrue(self.found(mechanic_type="automotive"))
+
+    def test_suspending_and_reactivating(self):
+        self.mechanic.is_active = False
+        self.save(self.mechanic)
+        self.assertFalse(self.found())
+        self.mechanic.is_active = True
+        self.save(self.mechanic)
+        self.assertTrue(self.found())
+
+    def test_role_change(self):
+        self.mechanic.role = "customer"
+        self.save(self.mechanic)
+        self.assertFalse(self.found())
+
+    def test_deleting_the_profile(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.delete()
+        self.assertFalse(self.found())
+
+    def test_new_workshop_rebuilds_the_snapshot(self):
+        newcomer = CustomUser.objects.create_user("newcomer", password="x", role="mechanic")
+        with self.captureOnCommitCallbacks(execute=True):
+            MechanicProfile.objects.create(user=newcomer, latitude=10.01, longitude=76.0, mechanic_type_mask=1)
+        self.assertIn(newcomer.id, dict(location_index.get_index().search(10.0, 76.0, "two_wheeler", 5)))
+
+    @override_settings(MECHANIC_LOCATION_INDEX_TTL=60)
+    def test_writes_from_other_workers_show_up_after_the_ttl(self):
+        # .update() sends no signal, like a write made by another process
+        MechanicProfile.objects.filter(pk=self.profile.pk).update(latitude=10.5)
+        self.assertTrue(self.found())
+        location_index.get_index().built_at -= 61
+        self.assertFalse(self.found())
+        self.assertTrue(self.found(10.5, 76.0))
+
+
+# ⭐ Running rating totals stay equal to a full recount of MechanicRating
+class RatingAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+        cls.profile = MechanicProfile.objects.create(user=cls.mechanic)
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.customer)
+
+    def new_request(self, status="completed"):
+        return ServiceRequest.objects.create(
+            user=self.customer, mechanic=self.mechanic, issue_description="Flat tyre", status=status
+        )
+
+    def rate(self, service_request, rating):
+        response = self.client.post(reverse("rate_mechanic", args=[service_request.id]), {"rating": rating})
+        self.assertEqual(response.status_code, 302)
+
+    def totals(self):
+        profile = MechanicProfile.objects.get(pk=self.profile.pk)
+        return {field: getattr(profile, field) for field in RATING_FIELDS}
+
+    def test_record_rating_increments_in_the_database(self):
+        MechanicProfile.record_rating(self.mechanic, 4)
+        MechanicProfile.record_rating(self.mechanic, 2)
+
+        self.assertEqual(self.profile.rating_count, 0)  # F() updates leave loaded rows stale
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.rating_count, 2)
+        self.assertEqual(self.profile.rating_sum, 6)
+        self.assertEqual((self.profile.rating_2_count, self.profile.rating_4_count), (1, 1))
+        self.assertEqual(self.profile.average_rating, 3)
+
+    def test_rerating_swaps_the_old_rating_out(self):
+        service_request = self.new_request()
+        self.rate(service_request, 2)
+        self.rate(service_request, 5)
+
+        totals = self.totals()
+        self.assertEqual(totals["rating_count"], 1)
+        self.assertEqual(totals["rating_sum"], 5)
+        self.assertEqual(totals["rating_2_count"], 0)
+        self.assertEqual(totals["rating_5_count"], 1)
+        self.assertEqual(MechanicRating.objects.count(), 1)
+
+    def test_feedback_is_not_counted_as_a_rating(self):
+        service_request = self.new_request()
+        self.rate(service_request, 5)
+        response = self.client.post(
+            reverse("submit_feedback", args=[service_request.id]), {"rating": 1, "comment": "Slow"}
+        )
+        self.assertEqual(response.status_code, 302)
+
+        self.assertEqual(Feedback.objects.count(), 1)
+        self.assertEqual(self.totals()["rating_count"], 1)
+        self.assertEqual(self.totals()["rating_sum"], 5)
+
+    def test_running_totals_match_a_full_rebuild(self):
+        for rating in (5, 3, 3, 1):
+            self.rate(self.new_request(), rating)
+        self.rate(ServiceRequest.objects.earliest("id"), 4)
+        running = self.totals()
+
+        MechanicProfile.objects.update(**dict.fromkeys(RATING_FIELDS, 0))
+        self.assertEqual(rebuild_rating_aggregates(MechanicProfile, MechanicRating), 1)
+        self.assertEqual(self.totals(), running)
+        self.assertEqual(running["rating_sum"], 11)
+        self.assertEqual(running["rating_count"], 4)
+
+    def test_rebuild_creates_missing_profiles(self):
+        newcomer = CustomUser.objects.create_user("newcomer", password="x", role="mechanic")
+        MechanicRating.objects.create(
+            service_request=ServiceRequest.objects.create(
+                user=self.customer, mechanic=newcomer, issue_description="Chain", status="completed"
+            ),
+            mechanic=newcomer,
+            customer=self.customer,
+            rating=4,
+        )
+
+        rebuild_rating_aggregates(MechanicProfile, MechanicRating)
+        profile = MechanicProfile.objects.get(user=newcomer)
+        self.assertEqual((profile.rating_count, profile.rating_sum, profile.rating_4_count), (1, 4, 1))
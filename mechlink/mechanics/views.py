@@ -4,15 +4,20 @@ from django.contrib import messages
 from django.core.mail import send_mail
 from django.conf import settings
 from django.urls import reverse
-from django.db.models import Avg, Q
+from django.db import transaction
+from django.db.models import Q
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
-from django.views.decorators.csrf import csrf_protect
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from .models import Product, Order, CartItem, MechanicProfile
-from services.models import ServiceRequest, Notification, ChatMessage, MechanicRating
-from users.models import Feedback
+from . import dashboard
+from .dashboard import MechanicDashboard
+from services.models import ServiceRequest, ChatMessage
+from services.dispatch import claim_request
+from services.notifications import enqueue, status_key
 from math import radians, sin, cos, sqrt, atan2
 import json
+import razorpay
 
 
 # 🧰 Mechanic Dashboard (Main)
@@ -21,43 +26,8 @@ def mechanic_dashboard(request):
     if request.user.role != "mechanic":
         return redirect("home")
 
-    mechanic = request.user
-    mechanic_profile = MechanicProfile.objects.filter(user=mechanic).first()
-
-    service_requests = ServiceRequest.objects.filter(mechanic=mechanic).order_by("-created_at")
-    notifications = Notification.objects.filter(recipient=mechanic).order_by("-created_at")[:5]
-    products = Product.objects.filter(mechanic=mechanic_profile)
-    all_orders = Order.objects.filter(product__mechanic=mechanic_profile).order_by("-ordered_at")
-
-    # 🧩 Split by status for tabs
-    paid_orders = all_orders.filter(status="Paid")
-    accepted_orders = all_orders.filter(status="Accepted")
-    processing_orders = all_orders.filter(status="Processing")
-    delivered_orders = all_orders.filter(status="Delivered")
-    cancelled_orders = all_orders.filter(status="Cancelled")
-
-    feedbacks = Feedback.objects.filter(mechanic=mechanic).order_by("-created_at")
-    ratings = MechanicRating.objects.filter(mechanic=mechanic)
-    average_rating = ratings.aggregate(Avg("rating"))["rating__avg"] or 0
-    rating_breakdown = {i: ratings.filter(rating=i).count() for i in range(5, 0, -1)}
-    total_ratings = sum(rating_breakdown.values())
-
-    context = {
-        "mechanic_profile": mechanic_profile,
-        "service_requests": service_requests,
-        "notifications": notifications,
-        "products": products,
-        "all_orders": all_orders,
-        "paid_orders": paid_orders,
-        "accepted_orders": accepted_orders,
-        "processing_orders": processing_orders,
-        "delivered_orders": delivered_orders,
-        "cancelled_orders": cancelled_orders,
-        "feedbacks": feedbacks,
-        "average_rating": round(average_rating, 1),
-        "rating_breakdown": rating_breakdown,
-        "total_ratings": total_ratings,
-    }
+    # 📊 One query per section; see mechanics.dashboard
+    context = MechanicDashboard(request.user).context()
     return render(request, "mechanics/mechanic_dashboard.html", context)
 
 
@@ -79,36 +49,45 @@ def update_service_request(request, request_id, action):
         return redirect("mechanic_dashboard")
 
     if action == "accept":
-        req.status = "accepted"
-        req.mechanic = request.user
-        Notification.objects.create(
-            recipient=req.user,
-            sender=request.user,
-            message=f"🧰 Your service request has been accepted by {request.user.username}.",
-            link=reverse("chat_view", args=[req.id]),
-        )
+        with transaction.atomic():
+            # 📣 Unassigned (broadcast) requests go to whoever claims them first
+            if req.mechanic_id is None:
+                claimed = claim_request(req, request.user)
+            else:
+                claimed = bool(
+                    ServiceRequest.objects.live_pending().filter(id=req.id, mechanic=request.user)
+                    .update(status="accepted")
+                )
+                if claimed:
+                    dashboard.requests_changed([req.id])
+            if not claimed:
+                messages.warning(request, "⚠️ This request is no longer available.")
+                return redirect("mechanic_dashboard")
+
+            enqueue(
+                req.user,
+                f"🧰 Your service request has been accepted by {request.user.username}.",
+                sender=request.user,
+                link=reverse("chat_view", args=[req.id]),
+                key=status_key(req.id),
+            )
         messages.success(request, "✅ Service request accepted.")
+        return redirect("mechanic_dashboard")
     elif action == "reject":
         req.status = "rejected"
-        Notification.objects.create(
-            recipient=req.user,
-            sender=request.user,
-            message=f"❌ Your service request has been rejected by {request.user.username}.",
-        )
+        message = f"❌ Your service request has been rejected by {request.user.username}."
         messages.warning(request, "❌ Service request rejected.")
     elif action == "complete":
         req.status = "completed"
-        Notification.objects.create(
-            recipient=req.user,
-            sender=request.user,
-            message=f"✅ Your service request #{req.id} has been completed by {request.user.username}.",
-        )
+        message = f"✅ Your service request #{req.id} has been completed by {request.user.username}."
         messages.success(request, "✅ Service marked as completed.")
     else:
         messages.error(request, "Invalid action.")
         return redirect("mechanic_dashboard")
 
-    req.save()
+    with transaction.atomic():
+        req.save()
+        enqueue(req.user, message, sender=request.user, key=status_key(req.id))
     return redirect("mechanic_dashboard")
 
 
@@ -136,19 +115,15 @@ def edit_mechanic_profile(request):
 
     profile, created = MechanicProfile.objects.get_or_create(user=request.user)
 
-    MECHANIC_TYPE_CHOICES = [
-        ('two_wheeler', 'Two-Wheeler Mechanic'),
-        ('automotive', 'Automotive Mechanic'),
-        ('heavy_vehicle', 'Heavy Vehicle Mechanic'),
-    ]
+    MECHANIC_TYPE_CHOICES = MechanicProfile.MECHANIC_TYPE_CHOICES
 
     if request.method == "POST":
         profile.shop_name = request.POST.get("shop_name", "").strip()
         profile.phone = request.POST.get("phone", "").strip()
 
-        # ✅ Fix: Convert mechanic types list → comma-separated string
+        # ✅ Selected mechanic types → bitmask
         selected_types = request.POST.getlist("mechanic_types")
-        profile.mechanic_types = ",".join(selected_types)
+        profile.mechanic_type_mask = MechanicProfile.type_mask(selected_types)
 
         # 🗺 Coordinates
         lat = request.POST.get("latitude")
@@ -256,7 +231,7 @@ def add_to_cart(request, product_id):
 
 @login_required
 def cart(request):
-    cart_items = CartItem.objects.filter(user=request.user)
+    cart_items = list(CartItem.objects.filter(user=request.user).select_related("product__mechanic__user"))
     total_price = sum(item.total_price() for item in cart_items)
     return render(request, "mechanics/cart.html", {"cart_items": cart_items, "total_price": total_price})
 
@@ -269,26 +244,6 @@ def remove_from_cart(request, cart_item_id):
     return redirect("cart")
 
 
-import razorpay
-from django.conf import settings
-from django.views.decorators.csrf import csrf_exempt
-from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib import messages
-from django.http import JsonResponse
-from django.contrib.auth.decorators import login_required
-from .models import Product, CartItem, Order  # adjust model imports
-
-import razorpay
-from django.views.decorators.csrf import csrf_exempt
-from django.conf import settings
-
-import razorpay
-from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib import messages
-from django.conf import settings
-from django.contrib.auth.decorators import login_required
-from .models import Product, Order
-
 @login_required
 def checkout(request, product_id):
     """Checkout page — Razorpay integrated for Buy Now only"""
@@ -459,10 +414,6 @@ def customer_update_order_status(request, order_id, action):
 
     return redirect("my_orders")
 
-from django.contrib.auth.decorators import login_required
-from django.shortcuts import get_object_or_404, redirect
-from django.contrib import messages
-from .models import Product  # adjust import to your Product model path
 
 @login_required
 def delete_product(request, pk):
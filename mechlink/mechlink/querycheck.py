@@ -0,0 +1,147 @@
+# mechlink/querycheck.py
+"""
+🔎 Query counting and N+1 detection.
+
+``QueryLog`` is a database execute wrapper that keeps every statement a
+block of code runs, together with the template tag and the project source
+line that triggered it. Statements are grouped by *shape*: the SQL text with
+its parameters left out (Django keeps them apart already) and ``IN`` lists
+collapsed, so ``SELECT ... WHERE id = %s`` run once per row of a loop shows
+up as one shape repeated N times, the classic N+1.
+
+* ``QueryCheckMiddleware`` (development only, ``DEBUG``) records each request
+  and logs a warning on ``mechlink.queries`` for every shape repeated
+  ``QUERY_CHECK_REPEATS`` times or more, naming the template line behind it.
+  Responses carry an ``X-Query-Count`` header.
+* ``QueryBudgetMixin`` pins a query budget per URL name in tests, and fails
+  on repeated shapes too, so a regression breaks CI rather than production.
+"""
+import logging
+import re
+import sys
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import TokenType
+from django.urls import reverse
+
+logger = logging.getLogger("mechlink.queries")
+
+IN_LIST = re.compile(r"\((?:%s, )+%s\)")
+PROJECT_DIR = str(Path(settings.BASE_DIR).resolve())
+THIS_FILE = str(Path(__file__).resolve())
+
+
+def query_shape(sql):
+    """The statement without its parameters; ``IN (%s, %s, ...)`` of any length is one shape."""
+    return IN_LIST.sub("(%s, ...)", sql)
+
+
+def repeats_threshold():
+    return getattr(settings, "QUERY_CHECK_REPEATS", 3)
+
+
+@dataclass(frozen=True)
+class QueryRecord:
+    sql: str
+    shape: str
+    template_line: str   # "shop.html:42 {{ product.mechanic }}", "" outside templates
+    code_line: str       # innermost project source line, "" when none
+
+
+def _origin():
+    """(template line, project source line) of the code running the current query."""
+    template_line = code_line = ""
+    frame = sys._getframe(2)
+    while frame is not None and not (template_line and code_line):
+        filename = frame.f_code.co_filename
+        if not template_line and frame.f_code.co_name == "render_annotated":
+            node = frame.f_locals.get("self")
+            token = getattr(node, "token", None)
+            if token is not None:
+                name = getattr(getattr(node, "origin", None), "template_name", None) or "?"
+                tag = "{{ %s }}" if token.token_type == TokenType.VAR else "{%% %s %%}"
+                template_line = f"{name}:{token.lineno} " + tag % token.contents
+        if not code_line and filename.startswith(PROJECT_DIR) and filename != THIS_FILE:
+            code_line = f"{Path(filename).relative_to(PROJECT_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return template_line, code_line
+
+
+class QueryLog:
+    """Execute wrapper collecting ``QueryRecord``s; see ``record_queries``."""
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.records.append(QueryRecord(sql, query_shape(sql), *_origin()))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.records)
+
+    def repeated(self, threshold=None):
+        """``{shape: [records]}`` for every shape run at least ``threshold`` times."""
+        threshold = repeats_threshold() if threshold is None else threshold
+        by_shape = defaultdict(list)
+        for record in self.records:
+            by_shape[record.shape].append(record)
+        return {shape: records for shape, records in by_shape.items() if len(records) >= threshold}
+
+    def report(self, threshold=None):
+        """Human-readable summary of the repeated shapes and where they come from."""
+        lines = []
+        for shape, records in self.repeated(threshold).items():
+            lines.append(f"{len(records)}× {shape}")
+            sources = {(record.template_line, record.code_line) for record in records}
+            for template_line, code_line in sorted(sources):
+                lines.append(f"    ← {template_line or '(no template)'}  [{code_line or 'outside the project'}]")
+        return "\n".join(lines)
+
+
+@contextmanager
+def record_queries(log=None):
+    """Record every query run on any connection inside the block; yields the ``QueryLog``."""
+    log = QueryLog() if log is None else log
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(log))
+        yield log
+
+
+# 🧪 Development middleware
+class QueryCheckMiddleware:
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as log:
+            response = self.get_response(request)
+        response["X-Query-Count"] = str(len(log))
+        if log.repeated():
+            logger.warning("N+1 on %s %s (%d queries):\n%s", request.method, request.path, len(log), log.report())
+        return response
+
+
+# ✅ Test helper
+class QueryBudgetMixin:
+    """``assertQueryBudget`` for ``TestCase``s: a GET of a named URL within a fixed number of queries."""
+
+    def assertQueryBudget(self, url_name, budget, args=(), kwargs=None, data=None):
+        with record_queries() as log:
+            response = self.client.get(reverse(url_name, args=args, kwargs=kwargs), data)
+        repeated = log.repeated()
+        if repeated:
+            self.fail(f"{url_name}: the same query runs once per row\n{log.report()}")
+        if len(log) > budget:
+            statements = "\n".join(f"  {record.shape}" for record in log.records)
+            self.fail(f"{url_name}: {len(log)} queries, budget is {budget}\n{statements}")
+        return response
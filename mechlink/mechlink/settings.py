@@ -43,6 +43,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+
+    # 🔎 Logs repeated (N+1) queries with the template line behind them; DEBUG only
+    'mechlink.querycheck.QueryCheckMiddleware',
 ]
 
 # -------------------------------------------
@@ -68,6 +71,9 @@ TEMPLATES = [
 
                 # ✅ required for media files to display in templates
                 'django.template.context_processors.media',
+
+                # 🔴 unread notification / chat badge counts
+                'services.context_processors.unread_counts',
             ],
         },
     },
@@ -134,4 +140,71 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 RAZORPAY_KEY_ID = "rzp_test_ReHFbUdp0dFWeS"
 
-RAZORPAY_KEY_SECRET = "I02E6H0OhOfDfg6JYl7VoQ46"
\ No newline at end of file
+RAZORPAY_KEY_SECRET = "I02E6H0OhOfDfg6JYl7VoQ46"
+
+# -------------------------------------------
+# MECHANIC MATCHING
+# -------------------------------------------
+# Seconds before a worker rebuilds its in-memory mechanic location index
+# (edits made through other workers become visible within this window).
+MECHANIC_LOCATION_INDEX_TTL = 300
+
+# -------------------------------------------
+# SERVICE REQUESTS
+# -------------------------------------------
+# Minutes a request may stay pending (per mechanic type) before it reads as
+# expired. Rows are only rewritten to 'expired' by `manage.py expire_requests`.
+SERVICE_REQUEST_TTL_MINUTES = {
+    'default': 5,
+    'two_wheeler': 5,
+    'automotive': 5,
+    'heavy_vehicle': 5,
+}
+
+# Deliver queued notifications right after each commit instead of waiting
+# for `manage.py process_outbox` (handy in development, no worker needed).
+NOTIFICATION_OUTBOX_EAGER = DEBUG
+
+# -------------------------------------------
+# REALTIME (services.realtime)
+# -------------------------------------------
+# Pub/sub hub for the live notification stream and chat sockets. The local
+# hub only reaches streams served by the same process.
+REALTIME_BACKEND = 'services.realtime.LocalBackend'
+
+# -------------------------------------------
+# CACHE
+# -------------------------------------------
+# Unread badge counters (services.unread, 2 keys per user) and the mechanic
+# dashboard fragments (mechanics.dashboard, ~20 keys per mechanic) live here.
+# LocMemCache is per process and holds only 300 keys by default, far fewer
+# than that working set: culled counters and fragment versions are simply
+# recomputed, so the cache stops saving queries. MAX_ENTRIES is sized for a
+# few thousand active users; in production, and always with several
+# workers, use a shared backend (Redis or Memcached) instead.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    }
+}
+
+# Seconds before a cached unread counter is recounted from the database.
+UNREAD_COUNTER_TIMEOUT = 300
+
+# Upper bound on how long a mechanic dashboard section stays cached
+# (mechanics.dashboard); writes invalidate sections as they happen.
+DASHBOARD_FRAGMENT_TIMEOUT = 600
+
+# Chats of closed requests move to compressed transcripts (archive_chats)
+# once they have been quiet this long.
+CHAT_ARCHIVE_AFTER_DAYS = 30
+
+# -------------------------------------------
+# QUERY CHECKS (mechlink.querycheck)
+# -------------------------------------------
+# Under DEBUG, a request running the same query shape this many times is
+# logged on 'mechlink.queries' as an N+1, with the template line behind it.
+QUERY_CHECK_REPEATS = 3
@@ -0,0 +1,185 @@
+# services/archive.py
+"""
+🗄️ Cold storage for the chats of closed requests.
+
+Once a request is completed, rejected or expired its conversation can only
+be read, yet every row would stay in ``ChatMessage`` and in the
+``(service_request, timestamp)`` index forever. ``archive_closed_chats``
+packs each such transcript into one ``ChatTranscript`` row (zlib-compressed
+JSON) and deletes the individual messages in the same transaction.
+
+Reads stay transparent: ``conversation_page`` pages a transcript with the
+same cursors and ``(messages, has_more)`` result as
+``chat_history.history_page``, and its entries carry the attributes the
+chat template and ``message_payload`` use.
+"""
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import unread
+from .chat_history import PAGE_SIZE, decode_cursor, history_page
+from .models import ChatMessage, ChatTranscript, ServiceRequest, stale_pending_q
+
+CLOSED_STATUSES = ("completed", "rejected", "expired")
+DELETE_CHUNK = 500  # ids per DELETE, well under SQLite's parameter limit
+
+
+def archive_after():
+    """How long a closed chat stays in the hot table (``CHAT_ARCHIVE_AFTER_DAYS``)."""
+    return timedelta(days=getattr(settings, "CHAT_ARCHIVE_AFTER_DAYS", 30))
+
+
+# 📦 Packing
+FIELDS = ("id", "sender_id", "receiver_id", "message", "timestamp", "is_read")
+
+
+def pack(entries):
+    """Compressed blob and its uncompressed size for a list of message rows (dicts)."""
+    raw = json.dumps(
+        [[entry[field].isoformat() if field == "timestamp" else entry[field] for field in FIELDS] for entry in entries],
+        separators=(",", ":"),
+    ).encode()
+    return zlib.compress(raw, 9), len(raw)
+
+
+def unpack(data):
+    entries = []
+    for row in json.loads(zlib.decompress(bytes(data))):
+        entry = dict(zip(FIELDS, row))
+        entry["timestamp"] = datetime.fromisoformat(entry["timestamp"])
+        entries.append(entry)
+    return entries
+
+
+@dataclass
+class ArchiveStats:
+    requests: int = 0
+    messages: int = 0
+    raw_bytes: int = 0      # transcript size before compression
+    stored_bytes: int = 0   # what the transcript rows hold now
+
+    @property
+    def reclaimed_bytes(self):
+        return self.raw_bytes - self.stored_bytes
+
+
+def closed_chats(older_than=None):
+    """Ids of closed requests whose newest message is older than ``older_than``."""
+    cutoff = timezone.now() - (archive_after() if older_than is None else older_than)
+    closed = ServiceRequest.objects.filter(status__in=CLOSED_STATUSES) | ServiceRequest.objects.filter(stale_pending_q())
+    return (
+        closed.annotate(last_message_at=Max("messages__timestamp"))
+        .filter(last_message_at__lt=cutoff)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def _archive_batch(request_ids, stats):
+    with transaction.atomic():
+        rows = list(
+            ChatMessage.objects.filter(service_request_id__in=request_ids)
+            .order_by("service_request_id", "timestamp", "id")
+            .values("service_request_id", *FIELDS)
+        )
+        if not rows:
+            return
+        by_request = {}
+        for row in rows:
+            by_request.setdefault(row.pop("service_request_id"), []).append(row)
+
+        # A request re-opened and closed again already has a transcript: extend it
+        existing = {
+            transcript.service_request_id: transcript
+            for transcript in ChatTranscript.objects.select_for_update().filter(service_request_id__in=by_request)
+        }
+        created, updated = [], []
+        for request_id, entries in by_request.items():
+            transcript = existing.get(request_id)
+            if transcript is not None:
+                stats.stored_bytes -= len(transcript.data)
+                stats.raw_bytes -= transcript.raw_bytes
+                entries = unpack(transcript.data) + entries
+            else:
+                transcript = ChatTranscript(service_request_id=request_id)
+            last = entries[-1]
+            transcript.data, transcript.raw_bytes = pack(entries)
+            transcript.message_count = len(entries)
+            transcript.last_message = last["message"]
+            transcript.last_message_at = last["timestamp"]
+            transcript.last_sender_id = last["sender_id"]
+            transcript.archived_at = timezone.now()
+            stats.raw_bytes += transcript.raw_bytes
+            stats.stored_bytes += len(transcript.data)
+            (updated if transcript.pk else created).append(transcript)
+
+        ChatTranscript.objects.bulk_create(created)
+        ChatTranscript.objects.bulk_update(
+            updated,
+            ["data", "raw_bytes", "message_count", "last_message", "last_message_at", "last_sender", "archived_at"],
+        )
+        ids = [row["id"] for row in rows]
+        for start in range(0, len(ids), DELETE_CHUNK):
+            ChatMessage.objects.filter(id__in=ids[start:start + DELETE_CHUNK]).delete()
+
+        stats.requests += len(by_request)
+        stats.messages += len(rows)
+        # Archived unread messages no longer count towards the chat badge
+        for receiver_id in {row["receiver_id"] for row in rows if not row["is_read"]}:
+            transaction.on_commit(lambda receiver_id=receiver_id: unread.forget(unread.CHATS, receiver_id))
+
+
+def archive_closed_chats(older_than=None, batch_size=100):
+    """Move every closed, quiet conversation into ``ChatTranscript``; returns ArchiveStats."""
+    stats = ArchiveStats()
+    request_ids = list(closed_chats(older_than))
+    for start in range(0, len(request_ids), batch_size):
+        _archive_batch(request_ids[start:start + batch_size], stats)
+    return stats
+
+
+# 📖 Transparent reads
+class ArchivedMessage:
+    """Read-only stand-in for a ChatMessage read back from a transcript."""
+
+    def __init__(self, service_request_id, sender, **fields):
+        self.service_request_id = service_request_id
+        self.sender = sender
+        self.__dict__.update(fields)
+
+
+def _page(entries, before=None, after=None, limit=PAGE_SIZE):
+    """Same keyset semantics as ``history_page``, over entries sorted by (timestamp, id)."""
+    if after is not None:
+        key = decode_cursor(after)
+        rows = [entry for entry in entries if (entry["timestamp"], entry["id"]) > key]
+        return rows[:limit], len(rows) > limit
+    if before is not None:
+        key = decode_cursor(before)
+        entries = [entry for entry in entries if (entry["timestamp"], entry["id"]) < key]
+    return entries[-limit:], len(entries) > limit
+
+
+def conversation_page(service_request, before=None, after=None, limit=PAGE_SIZE):
+    """``history_page`` for a request, reading from its transcript once the chat is archived."""
+    transcript = ChatTranscript.objects.filter(service_request=service_request).first()
+    if transcript is None:
+        return history_page(service_request.messages.all(), before=before, after=after, limit=limit)
+
+    # Rows written after the transcript (a re-opened request) follow it until the next run
+    entries = unpack(transcript.data) + list(service_request.messages.order_by("timestamp", "id").values(*FIELDS))
+    entries, has_more = _page(entries, before=before, after=after, limit=limit)
+    senders = get_user_model().objects.in_bulk({entry["sender_id"] for entry in entries})
+    return [
+        ArchivedMessage(service_request.id, senders[entry["sender_id"]], **entry)
+        for entry in entries
+        if entry["sender_id"] in senders  # deleting a user deletes their messages too
+    ], has_more
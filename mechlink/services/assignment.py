@@ -0,0 +1,198 @@
+# services/assignment.py
+"""
+🧮 Batch assignment of pending requests to mechanics.
+
+Instead of each request grabbing the nearest free mechanic one at a time,
+all unassigned pending requests in a region are matched to the available
+mechanics in one go, minimising total cost (travel distance plus a penalty
+per job the mechanic is already working on) with the Hungarian algorithm.
+Run it periodically through ``manage.py assign_pending_requests``.
+"""
+from collections import defaultdict
+from math import floor
+
+from django.db import transaction
+from django.db.models import Count
+from django.urls import reverse
+
+from mechanics import dashboard
+from mechanics.location_index import get_index as get_location_index
+from .models import NotificationOutbox, ServiceRequest
+from .notifications import enqueue_many, status_key
+
+MAX_DISTANCE_KM = 15      # never send a mechanic further than this
+LOAD_PENALTY_KM = 5       # each active job counts like this many extra km
+MAX_LOAD = 3              # mechanics with this many active jobs are skipped
+ACTIVE_STATUSES = ["accepted", "in_progress"]
+REGION_SIZE_DEG = 1.0     # requests are solved in regions of this size
+
+INFEASIBLE = 1e9
+
+
+def solve_assignment(cost):
+    """
+    Minimum-cost assignment for a rectangular cost matrix (list of rows).
+    Returns ``[(row, col), ...]``; every row (or every column, if there are
+    fewer columns) is matched exactly once. O(n² · m) Hungarian algorithm.
+    """
+    if not cost or not cost[0]:
+        return []
+
+    transposed = len(cost) > len(cost[0])
+    if transposed:
+        cost = [list(column) for column in zip(*cost)]
+    n, m = len(cost), len(cost[0])
+
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match = [0] * (m + 1)   # match[col] = row (1-based), 0 = free
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        min_v = [float("inf")] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            row = cost[i0 - 1]
+            delta = float("inf")
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    reduced = row[j - 1] - u[i0] - v[j]
+                    if reduced < min_v[j]:
+                        min_v[j] = reduced
+                        way[j] = j0
+                    if min_v[j] < delta:
+                        delta = min_v[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_v[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    pairs = [(match[j] - 1, j - 1) for j in range(1, m + 1) if match[j]]
+    if transposed:
+        pairs = [(col, row) for row, col in pairs]
+    return sorted(pairs)
+
+
+def region_key(lat, lon):
+    return floor(lat / REGION_SIZE_DEG), floor(lon / REGION_SIZE_DEG)
+
+
+def unassigned():
+    """Live pending requests nobody holds: no mechanic, and no broadcast offer still open (dispatch owns those)."""
+    return ServiceRequest.objects.live_pending().filter(mechanic__isnull=True).exclude(offers__status="offered")
+
+
+def mechanic_loads(mechanic_ids):
+    """``{mechanic_id: jobs}``: active jobs plus live pending requests already assigned to them."""
+    busy = ServiceRequest.objects.filter(status__in=ACTIVE_STATUSES) | ServiceRequest.objects.live_pending()
+    return dict(
+        busy.filter(mechanic_id__in=mechanic_ids)
+        .order_by()
+        .values("mechanic_id")
+        .annotate(n=Count("id"))
+        .values_list("mechanic_id", "n")
+    )
+
+
+def plan_assignments(max_km=MAX_DISTANCE_KM, load_penalty_km=LOAD_PENALTY_KM, max_load=MAX_LOAD):
+    """
+    Work out the best (request, mechanic) pairs without writing anything.
+    Returns ``[(service_request, mechanic_id, distance_km), ...]``.
+    """
+    pending = list(
+        unassigned().filter(latitude__isnull=False, longitude__isnull=False).order_by("created_at")
+    )
+    if not pending:
+        return []
+
+    index = get_location_index()
+    candidates = {
+        req.id: dict(index.search(req.latitude, req.longitude, req.mechanic_type, max_km))
+        for req in pending
+    }
+    mechanic_ids = {mech_id for options in candidates.values() for mech_id in options}
+    loads = mechanic_loads(mechanic_ids)
+
+    regions = defaultdict(list)
+    for req in pending:
+        regions[region_key(req.latitude, req.longitude)].append(req)
+
+    plan = []
+    taken = set()  # a mechanic near a region border must not be used twice
+    for requests in regions.values():
+        mechanics = sorted({
+            mech_id
+            for req in requests
+            for mech_id in candidates[req.id]
+            if mech_id not in taken and loads.get(mech_id, 0) < max_load
+        })
+        if not mechanics:
+            continue
+
+        cost = [
+            [
+                candidates[req.id][mech_id] + load_penalty_km * loads.get(mech_id, 0)
+                if mech_id in candidates[req.id] else INFEASIBLE
+                for mech_id in mechanics
+            ]
+            for req in requests
+        ]
+        for row, col in solve_assignment(cost):
+            if cost[row][col] >= INFEASIBLE:
+                continue
+            req, mech_id = requests[row], mechanics[col]
+            plan.append((req, mech_id, candidates[req.id][mech_id]))
+            taken.add(mech_id)
+    return plan
+
+
+def apply_assignments(plan):
+    """Write a plan with bulk operations; returns how many requests were assigned."""
+    if not plan:
+        return 0
+
+    with transaction.atomic():
+        # Skip anything claimed, broadcast or expired since the plan was made.
+        still_open = set(
+            unassigned().select_for_update()
+            .filter(id__in=[req.id for req, _, _ in plan])
+            .values_list("id", flat=True)
+        )
+        plan = [item for item in plan if item[0].id in still_open]
+
+        for req, mech_id, _distance in plan:
+            req.mechanic_id = mech_id
+        ServiceRequest.objects.bulk_update([req for req, _, _ in plan], ["mechanic"], batch_size=500)
+
+        dashboard.requests_changed(still_open)
+
+        link = reverse("mechanic_requests")
+        notifications = []
+        for req, mech_id, distance in plan:
+            notifications.append(NotificationOutbox(
+                recipient_id=mech_id,
+                message=f"🧰 New {req.mechanic_type.replace('_', ' ')} request #{req.id} assigned to you ({distance:.1f} km away).",
+                link=link,
+            ))
+            notifications.append(NotificationOutbox(
+                recipient_id=req.user_id,
+                message=f"🔧 A mechanic {distance:.1f} km away has been assigned to your request #{req.id}.",
+                coalesce_key=status_key(req.id),
+            ))
+        enqueue_many(notifications)
+
+    return len(plan)
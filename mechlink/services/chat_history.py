@@ -0,0 +1,73 @@
+# services/chat_history.py
+"""
+📜 Keyset pagination over a conversation's ChatMessages.
+
+Pages are keyed on ``(timestamp, id)`` rather than OFFSET, so fetching the
+page before the oldest message on screen (scroll-back) or everything after
+the newest one (incremental fetch) costs the same however long the chat is.
+Cursors are opaque strings of the form ``<epoch microseconds>.<id>``.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Q
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(message):
+    delta = message.timestamp - datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{micros}.{message.id}"
+
+
+def decode_cursor(cursor):
+    """``(timestamp, id)`` from a cursor string; raises InvalidCursor."""
+    try:
+        micros, message_id = (int(part) for part in cursor.split("."))
+        timestamp = datetime.fromtimestamp(micros // 1_000_000, tz=dt_timezone.utc).replace(
+            microsecond=micros % 1_000_000
+        )
+    except (AttributeError, ValueError, OverflowError, OSError):
+        raise InvalidCursor(cursor)
+    return timestamp, message_id
+
+
+def message_payload(message):
+    return {
+        "id": message.id,
+        "cursor": encode_cursor(message),
+        "sender_id": message.sender_id,
+        "sender": message.sender.username,
+        "message": message.message,
+        "timestamp": message.timestamp.isoformat(),
+        "is_read": message.is_read,
+    }
+
+
+def history_page(messages, before=None, after=None, limit=PAGE_SIZE):
+    """
+    One page of ``messages`` (a ChatMessage queryset for one conversation),
+    oldest first. With no cursor it is the latest page; ``before`` walks
+    back in time and ``after`` returns what arrived since. Returns
+    ``(messages, has_more)`` where ``has_more`` says whether another page
+    lies further in the direction of travel.
+    """
+    messages = messages.select_related("sender")
+    if after is not None:
+        timestamp, message_id = decode_cursor(after)
+        rows = list(
+            messages.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=message_id))
+            .order_by("timestamp", "id")[:limit + 1]
+        )
+        return rows[:limit], len(rows) > limit
+
+    if before is not None:
+        timestamp, message_id = decode_cursor(before)
+        messages = messages.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=message_id))
+    rows = list(messages.order_by("-timestamp", "-id")[:limit + 1])
+    return rows[:limit][::-1], len(rows) > limit
@@ -0,0 +1,250 @@
+# services/chat_socket.py
+"""
+💬 Live chat over a WebSocket at ``/ws/chat/<request_id>/``.
+
+Plain ASGI, routed from ``mechlink.asgi``. A connection is accepted only for
+the customer or mechanic of a request that is accepted / in progress (the
+same rules as ``chat_view``); the user comes from the normal session cookie.
+Messages are pushed to both participants through the pub/sub hub in
+``services.realtime`` (one ``chat-<id>`` channel per request), so swapping
+``REALTIME_BACKEND`` for a broker-backed hub takes the chat multi-node too.
+
+Incoming messages are not saved one by one: ``ChatWriter`` collects them
+for ``BATCH_WINDOW_SECONDS`` and inserts the batch with one ``bulk_create``
+before broadcasting the saved rows. A message that cannot be saved (its chat
+closed meanwhile, or the batch failed) comes back to its sender as an
+``error`` event carrying the text, so nothing disappears silently. ``{"type": "read"}`` marks the
+conversation read up to a cursor and sends a read receipt to the other side.
+
+Client → server:  {"type": "message", "message": "..."} · {"type": "read", "up_to": <cursor>}
+Server → client:  {"type": "message", …chat_history.message_payload}
+                  {"type": "read", "reader_id"} · {"type": "error", "error"[, "message"]}
+"""
+import asyncio
+import json
+import logging
+import re
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http.cookie import parse_cookie
+
+from mechanics import dashboard
+from . import unread
+from .chat_history import InvalidCursor, decode_cursor, message_payload
+from .models import ChatMessage, ServiceRequest
+from .realtime import get_hub
+
+logger = logging.getLogger(__name__)
+
+CHAT_PATH = re.compile(r"^/ws/chat/(?P<request_id>\d+)/$")
+ACTIVE_STATUSES = ("accepted", "in_progress")
+BATCH_WINDOW_SECONDS = 0.05   # how long the writer waits to fill a batch
+BATCH_MAX = 200               # rows per bulk_create
+MAX_MESSAGE_LENGTH = 2000
+
+
+def database_sync_to_async(func):
+    """
+    ``sync_to_async`` for ORM work outside Django's request cycle: old or
+    broken connections are closed before and after, as the request_started /
+    request_finished signals would do for a view (cf. Channels).
+    """
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=True)
+
+
+def chat_channel(request_id):
+    return f"chat-{request_id}"
+
+
+# 🔐 Who is connecting, and may they chat here?
+def _header(scope, name):
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _same_origin(scope):
+    # Browsers always send Origin on WebSocket handshakes; refuse other sites'
+    # pages riding on the user's session cookie.
+    origin = _header(scope, b"origin")
+    return origin is None or urlsplit(origin).netloc == _header(scope, b"host")
+
+
+def _session_user(scope):
+    session_key = parse_cookie(_header(scope, b"cookie") or "").get(settings.SESSION_COOKIE_NAME)
+    if not session_key:
+        return None
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    user = get_user(SimpleNamespace(session=store(session_key)))
+    return user if user.is_authenticated else None
+
+
+def _open_chat(user, request_id):
+    """The ServiceRequest if ``user`` may chat on it right now, else None."""
+    service_request = ServiceRequest.objects.filter(id=request_id).first()
+    if service_request is None or user.id not in (service_request.user_id, service_request.mechanic_id):
+        return None
+    if service_request.status not in ACTIVE_STATUSES:
+        return None
+    return service_request
+
+
+# ✍️ Batched writes
+def _message_event(message):
+    return {"type": "message", **message_payload(message)}
+
+
+def _save_batch(messages):
+    """Insert the messages whose chat is still open at once; returns ``(saved, dropped)``."""
+    open_ids = set(
+        ServiceRequest.objects.filter(
+            id__in={message.service_request_id for message in messages}, status__in=ACTIVE_STATUSES
+        ).values_list("id", flat=True)
+    )
+    saved = ChatMessage.objects.bulk_create(
+        [message for message in messages if message.service_request_id in open_ids]
+    )
+    # bulk_create skips the post_save signals
+    unread.add(unread.CHATS, [message.receiver_id for message in saved])
+    dashboard.bump([user_id for message in saved for user_id in (message.sender_id, message.receiver_id)], "chats")
+    return saved, [message for message in messages if message.service_request_id not in open_ids]
+
+
+class ChatWriter:
+    """One per event loop: gathers outgoing messages and saves them in batches."""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.task = None
+
+    def submit(self, message, reply):
+        """Queue ``message``; ``reply(payload)`` sends an event back to its sender alone."""
+        if self.task is None or self.task.done():
+            self.task = self.loop.create_task(self.run())
+        self.queue.put_nowait((message, reply))
+
+    async def next_batch(self):
+        batch = [await self.queue.get()]
+        deadline = self.loop.time() + BATCH_WINDOW_SECONDS
+        while len(batch) < BATCH_MAX:
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        while True:
+            batch = await self.next_batch()
+            replies = {id(message): reply for message, reply in batch}
+            messages = [message for message, _reply in batch]
+            try:
+                saved, dropped = await database_sync_to_async(_save_batch)(messages)
+            except Exception:
+                logger.exception("Could not save %d chat messages", len(batch))
+                saved, dropped = [], messages
+                error = "Your message could not be sent, please try again."
+            else:
+                error = "This chat has been closed, your message was not sent."
+            hub = get_hub()
+            for message in saved:
+                hub.publish(chat_channel(message.service_request_id), _message_event(message))
+            for message in dropped:
+                await _reply(replies[id(message)], {"type": "error", "error": error, "message": message.message})
+
+
+async def _reply(reply, payload):
+    try:
+        await reply(payload)
+    except Exception:
+        pass  # the sender has disconnected meanwhile
+
+
+_writer = None
+
+
+def get_writer():
+    global _writer
+    if _writer is None or _writer.loop is not asyncio.get_running_loop():
+        _writer = ChatWriter()
+    return _writer
+
+
+# 🔌 Connection
+async def chat_websocket(scope, receive, send):
+    if (await receive())["type"] != "websocket.connect":
+        return
+
+    match = CHAT_PATH.match(scope["path"])
+    user = await database_sync_to_async(_session_user)(scope) if match and _same_origin(scope) else None
+    service_request = await database_sync_to_async(_open_chat)(user, int(match["request_id"])) if user else None
+    if service_request is None:
+        await send({"type": "websocket.close", "code": 4403})
+        return
+
+    receiver_id = service_request.mechanic_id if user.id == service_request.user_id else service_request.user_id
+    channel = chat_channel(service_request.id)
+    await send({"type": "websocket.accept"})
+
+    async def send_json(payload):
+        await send({"type": "websocket.send", "text": json.dumps(payload)})
+
+    async with get_hub().subscribe(channel) as queue:
+        async def forward():
+            while True:
+                await send_json(await queue.get())
+
+        forwarder = asyncio.create_task(forward())
+        try:
+            while True:
+                event = await receive()
+                if event["type"] == "websocket.disconnect":
+                    break
+                if event["type"] != "websocket.receive":
+                    continue
+                try:
+                    data = json.loads(event.get("text") or "")
+                except ValueError:
+                    await send_json({"type": "error", "error": "Invalid JSON."})
+                    continue
+
+                if data.get("type") == "message":
+                    text = str(data.get("message", "")).strip()
+                    if not text or receiver_id is None:
+                        continue
+                    if len(text) > MAX_MESSAGE_LENGTH:
+                        await send_json({"type": "error", "error": "Message is too long."})
+                        continue
+                    get_writer().submit(ChatMessage(
+                        service_request_id=service_request.id,
+                        sender=user,
+                        receiver_id=receiver_id,
+                        message=text,
+                    ), reply=send_json)
+                elif data.get("type") == "read":
+                    try:
+                        up_to = decode_cursor(data["up_to"])[1] if data.get("up_to") else None
+                    except InvalidCursor:
+                        await send_json({"type": "error", "error": "Invalid cursor."})
+                        continue
+                    if await database_sync_to_async(unread.mark_chat_read)(user.id, service_request.id, up_to):
+                        get_hub().publish(channel, {"type": "read", "reader_id": user.id})
+        finally:
+            forwarder.cancel()
@@ -0,0 +1,18 @@
+# services/context_processors.py
+from django.core.handlers.asgi import ASGIRequest
+
+from . import unread
+
+
+def unread_counts(request):
+    """Navbar badge counts, served from the cache (see services.unread)."""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {}
+    counts = unread.get_counts(user.id)
+    return {
+        "unread_notifications": counts[unread.NOTIFICATIONS],
+        "unread_chats": counts[unread.CHATS],
+        # Only an ASGI server can hold the notification stream open; WSGI pages poll
+        "live_notifications": isinstance(request, ASGIRequest),
+    }
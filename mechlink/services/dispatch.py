@@ -0,0 +1,91 @@
+# services/dispatch.py
+"""
+📣 Broadcast dispatch: offer one ServiceRequest to several nearby mechanics
+and let the first one to accept claim it.
+
+The claim is a single conditional UPDATE on the request row (still pending,
+still unassigned), so two mechanics accepting at the same moment can never
+both win; the losing offers are then withdrawn in bulk.
+"""
+from django.db import transaction
+from django.urls import reverse
+
+from mechanics import dashboard
+from users.models import CustomUser
+from .models import DispatchOffer, NotificationOutbox, ServiceRequest
+from .notifications import enqueue_many
+
+BROADCAST_N = 5  # how many of the nearest mechanics get the offer
+
+
+def broadcast_request(service_request, nearby, sender=None):
+    """
+    Offer an unassigned request to every mechanic in ``nearby``
+    (``[(user_id, distance_km), ...]``). Returns how many offers were made.
+    """
+    live_ids = set(
+        CustomUser.objects.filter(id__in=[user_id for user_id, _ in nearby], role="mechanic", is_active=True)
+        .values_list("id", flat=True)
+    )
+    nearby = [(user_id, distance) for user_id, distance in nearby if user_id in live_ids]
+
+    kind = service_request.mechanic_type.replace("_", " ")
+    with transaction.atomic():
+        DispatchOffer.objects.bulk_create([
+            DispatchOffer(service_request=service_request, mechanic_id=user_id, distance_km=round(distance, 2))
+            for user_id, distance in nearby
+        ])
+        enqueue_many([
+            NotificationOutbox(
+                recipient_id=user_id,
+                sender=sender,
+                message=f"📣 New {kind} request #{service_request.id} {distance:.1f} km away — first to accept gets the job.",
+                link=reverse("mechanic_requests"),
+            )
+            for user_id, distance in nearby
+        ])
+        dashboard.bump(live_ids, "requests")
+    return len(nearby)
+
+
+def has_open_offer(service_request, mechanic):
+    return DispatchOffer.objects.filter(
+        service_request=service_request, mechanic=mechanic, status="offered"
+    ).exists()
+
+
+def claim_request(service_request, mechanic):
+    """
+    First accept wins. Returns True when ``mechanic`` claimed the request,
+    False when it was already taken, expired, or never offered to them.
+    """
+    if not has_open_offer(service_request, mechanic):
+        return False
+
+    with transaction.atomic():
+        claimed = ServiceRequest.objects.live_pending().filter(
+            id=service_request.id, mechanic__isnull=True
+        ).update(mechanic=mechanic, status="accepted")
+        if not claimed:
+            return False
+
+        offers = DispatchOffer.objects.filter(service_request=service_request)
+        offers.filter(mechanic=mechanic).update(status="accepted")
+        offers.filter(status="offered").update(status="withdrawn")
+        dashboard.requests_changed([service_request.id])
+
+    service_request.mechanic = mechanic
+    service_request.status = "accepted"
+    return True
+
+
+def decline_offer(service_request, mechanic):
+    """Returns True if an open offer was declined."""
+    declined = bool(
+        DispatchOffer.objects.filter(
+            service_request=service_request, mechanic=mechanic, status="offered"
+        ).update(status="declined")
+    )
+    if declined:
+        dashboard.bump([mechanic.id], "requests")
+    return declined
@@ -0,0 +1,64 @@
+# services/expiry.py
+"""
+⏳ Compaction of expired service requests.
+
+A pending request past its type's TTL already *reads* as expired
+(``ServiceRequest.effective_status`` / ``with_effective_status()``), so
+nothing needs to be written when it goes stale. This occasional pass
+(``manage.py expire_requests``) materializes those rows to ``expired`` with
+one ``UPDATE … RETURNING`` and queues the customer notifications in the
+outbox with a single INSERT; concurrent passes cannot expire (or notify about)
+the same row twice.
+"""
+import sqlite3
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import NotificationOutbox, ServiceRequest, stale_pending_q
+from .notifications import enqueue_many, status_key
+
+
+def _supports_update_returning():
+    if connection.vendor == "postgresql":
+        return True
+    return connection.vendor == "sqlite" and sqlite3.sqlite_version_info >= (3, 35)
+
+
+def _expire_rows(now):
+    """Flip stale pending rows to expired; returns ``[(id, user_id), ...]`` of the rows changed."""
+    stale = ServiceRequest.objects.filter(stale_pending_q(now))
+
+    if _supports_update_returning():
+        query = stale.query
+        where_sql, where_params = query.get_compiler(connection=connection).compile(query.where)
+        qn = connection.ops.quote_name
+        sql = (
+            f"UPDATE {qn(ServiceRequest._meta.db_table)} SET {qn('status')} = %s "
+            f"WHERE {where_sql} RETURNING {qn('id')}, {qn('user_id')}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, ["expired", *where_params])
+            return cursor.fetchall()
+
+    # No UPDATE … RETURNING: lock the rows first, then update exactly those.
+    rows = list(stale.select_for_update().values_list("id", "user_id"))
+    ServiceRequest.objects.filter(id__in=[row_id for row_id, _ in rows]).update(status="expired")
+    return rows
+
+
+def expire_old_requests(now=None):
+    """Materialize every pending request past its TTL as expired; returns how many."""
+    with transaction.atomic():
+        rows = _expire_rows(now or timezone.now())
+
+        # Notify the customers
+        enqueue_many([
+            NotificationOutbox(
+                recipient_id=user_id,
+                message=f"⚠️ Your service request #{request_id} expired (no mechanic accepted in time).",
+                coalesce_key=status_key(request_id),
+            )
+            for request_id, user_id in rows
+        ])
+    return len(rows)
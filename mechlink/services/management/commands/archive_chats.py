@@ -0,0 +1,32 @@
+# services/management/commands/archive_chats.py
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from services.archive import archive_closed_chats
+
+
+class Command(BaseCommand):
+    help = "Pack the chats of closed requests into compressed transcripts and delete the message rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, default=None,
+                            help="Only chats quiet for this long (default: CHAT_ARCHIVE_AFTER_DAYS).")
+        parser.add_argument("--batch-size", type=int, default=100, help="Requests per transaction.")
+        parser.add_argument("--every", type=int, default=0, help="Keep archiving every N seconds.")
+
+    def handle(self, *args, **options):
+        days = options["older_than_days"]
+        older_than = None if days is None else timedelta(days=days)
+        while True:
+            stats = archive_closed_chats(older_than=older_than, batch_size=options["batch_size"])
+            if stats.requests or not options["every"]:
+                self.stdout.write(
+                    f"🗄️ Archived {stats.messages} messages from {stats.requests} chats: "
+                    f"{stats.raw_bytes} bytes of transcript stored in {stats.stored_bytes} "
+                    f"({stats.reclaimed_bytes} bytes reclaimed)."
+                )
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
@@ -0,0 +1,41 @@
+# services/management/commands/assign_pending_requests.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from services import assignment
+
+
+class Command(BaseCommand):
+    help = "Assign all unassigned pending service requests to mechanics in one optimal batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-km", type=float, default=assignment.MAX_DISTANCE_KM)
+        parser.add_argument("--load-penalty-km", type=float, default=assignment.LOAD_PENALTY_KM)
+        parser.add_argument("--max-load", type=int, default=assignment.MAX_LOAD)
+        parser.add_argument("--every", type=int, default=0, help="Keep running, one batch every N seconds.")
+        parser.add_argument("--dry-run", action="store_true", help="Print the plan without writing it.")
+
+    def handle(self, *args, **options):
+        while True:
+            self.run_batch(options)
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
+
+    def run_batch(self, options):
+        plan = assignment.plan_assignments(
+            max_km=options["max_km"],
+            load_penalty_km=options["load_penalty_km"],
+            max_load=options["max_load"],
+        )
+        total_km = sum(distance for _, _, distance in plan)
+
+        if options["dry_run"]:
+            for req, mech_id, distance in plan:
+                self.stdout.write(f"  request #{req.id} → mechanic #{mech_id} ({distance:.1f} km)")
+            self.stdout.write(f"{len(plan)} assignments planned, {total_km:.1f} km in total (dry run).")
+            return
+
+        assigned = assignment.apply_assignments(plan)
+        self.stdout.write(self.style.SUCCESS(f"✅ Assigned {assigned} requests ({total_km:.1f} km planned in total)."))
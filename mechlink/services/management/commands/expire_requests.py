@@ -0,0 +1,22 @@
+# services/management/commands/expire_requests.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from services.expiry import expire_old_requests
+
+
+class Command(BaseCommand):
+    help = "Write out pending service requests that have run past their TTL as expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--every", type=int, default=0, help="Keep sweeping every N seconds.")
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_old_requests()
+            if expired or not options["every"]:
+                self.stdout.write(f"⏳ Expired {expired} pending requests.")
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
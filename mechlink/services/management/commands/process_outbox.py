@@ -0,0 +1,23 @@
+# services/management/commands/process_outbox.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from services.notifications import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued notifications from the outbox (coalesced, in bulk)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--every", type=float, default=0, help="Keep draining every N seconds.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        while True:
+            delivered = drain_outbox(batch_size=options["batch_size"])
+            if delivered or not options["every"]:
+                self.stdout.write(f"📮 Delivered {delivered} notifications.")
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
@@ -0,0 +1,27 @@
+# services/management/commands/update_rollups.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from services.rollups import update_rollups
+
+
+class Command(BaseCommand):
+    help = "Fold new and still-open requests and orders into the daily statistics rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recount every day from scratch first.")
+        parser.add_argument("--every", type=int, default=0, help="Keep updating every N seconds.")
+
+    def handle(self, *args, **options):
+        rebuild = options["rebuild"]
+        while True:
+            recounted = update_rollups(rebuild=rebuild)
+            rebuild = False
+            if any(recounted.values()) or not options["every"]:
+                self.stdout.write(
+                    "📈 Recounted " + ", ".join(f"{days} days of {name}" for name, days in recounted.items()) + "."
+                )
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
@@ -1,8 +1,79 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from users.models import CustomUser
 
 
+def request_ttl(mechanic_type):
+    """How long a request of this type may stay pending before it counts as expired."""
+    ttls = getattr(settings, "SERVICE_REQUEST_TTL_MINUTES", {})
+    return timedelta(minutes=ttls.get(mechanic_type, ttls.get("default", 5)))
+
+
+def stale_pending_q(now=None):
+    """Rows that are still ``pending`` in the table but past their type's TTL."""
+    now = now or timezone.now()
+    types = [value for value, _label in ServiceRequest.MECHANIC_TYPE_CHOICES]
+    condition = models.Q(~models.Q(mechanic_type__in=types), created_at__lt=now - request_ttl("default"))
+    for mechanic_type in types:
+        condition |= models.Q(mechanic_type=mechanic_type, created_at__lt=now - request_ttl(mechanic_type))
+    return models.Q(status='pending') & condition
+
+
+class ServiceRequestQuerySet(models.QuerySet):
+    def with_effective_status(self, now=None):
+        """Annotate ``effective_status``: stale pending rows read as ``expired`` without being written."""
+        return self.annotate(effective_status=models.Case(
+            models.When(stale_pending_q(now), then=models.Value('expired')),
+            default=models.F('status'),
+            output_field=models.CharField(),
+        ))
+
+    def with_effective(self, status, now=None):
+        """Filter on the effective status (see with_effective_status)."""
+        if status == 'pending':
+            return self.live_pending(now)
+        if status == 'expired':
+            return self.filter(models.Q(status='expired') | stale_pending_q(now))
+        return self.filter(status=status)
+
+    def live_pending(self, now=None):
+        """Pending requests that have not run past their TTL."""
+        return self.filter(status='pending').exclude(stale_pending_q(now))
+
+    def with_chat_summary(self, user):
+        """
+        Inbox columns in the same query: customer and mechanic rows joined in,
+        the last message (text, time, sender), how many messages to ``user``
+        are unread, and ``last_activity`` (last message, else creation time).
+        Archived chats take their last message from the transcript.
+        """
+        last = ChatMessage.objects.filter(service_request=models.OuterRef('pk')).order_by('-timestamp', '-id')
+        return self.select_related('user', 'mechanic').annotate(
+            last_message=Coalesce(models.Subquery(last.values('message')[:1]), 'transcript__last_message'),
+            last_message_at=Coalesce(models.Subquery(last.values('timestamp')[:1]), 'transcript__last_message_at'),
+            last_sender_id=Coalesce(
+                models.Subquery(last.values('sender_id')[:1]), 'transcript__last_sender_id',
+                output_field=models.IntegerField(),
+            ),
+            unread_count=models.Count(
+                'messages', filter=models.Q(messages__receiver=user, messages__is_read=False)
+            ),
+            last_activity=Coalesce('last_message_at', 'created_at'),
+        )
+
+    def for_mechanic(self, mechanic):
+        """Requests assigned to the mechanic plus broadcast requests still offered to them."""
+        offered = DispatchOffer.objects.filter(mechanic=mechanic, status='offered').values('service_request_id')
+        return self.filter(
+            models.Q(mechanic=mechanic)
+            | (models.Q(mechanic__isnull=True, status='pending', id__in=offered) & ~stale_pending_q())
+        )
+
+
 # 🧰 Service Request Model
 class ServiceRequest(models.Model):
     STATUS_CHOICES = [
@@ -48,11 +119,33 @@ class ServiceRequest(models.Model):
     rating = models.IntegerField(null=True, blank=True)
     feedback = models.TextField(blank=True, null=True)
 
+    objects = ServiceRequestQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.user.username} - {self.issue_description[:30]}"
 
+    @property
+    def effective_status(self):
+        """``status``, except that pending requests past their TTL read as ``expired``."""
+        if getattr(self, '_effective_status', None) is not None:
+            return self._effective_status
+        if self.status == 'pending' and self.created_at and self.created_at < timezone.now() - request_ttl(self.mechanic_type):
+            return 'expired'
+        return self.status
+
+    @effective_status.setter
+    def effective_status(self, value):
+        # Filled in by ServiceRequestQuerySet.with_effective_status()
+        self._effective_status = value
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['mechanic', 'status'], name='sr_mechanic_status_idx'),
+            models.Index(fields=['user', '-created_at'], name='sr_user_created_idx'),
+            # Expiry and the pending queues only ever look at pending rows
+            models.Index(fields=['created_at'], condition=models.Q(status='pending'), name='sr_pending_created_idx'),
+        ]
 
 # 🔔 Notification Model
 class Notification(models.Model):
@@ -78,6 +171,11 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at'], name='notif_recipient_created_idx'),
+            # Unread counts and "mark read up to id" only touch unread rows
+            models.Index(fields=['recipient', 'id'], condition=models.Q(is_read=False), name='notif_unread_idx'),
+        ]
 
 
 # 💬 Chat Message Model
@@ -106,6 +204,14 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['timestamp']  # ✅ auto order messages
+        indexes = [
+            models.Index(fields=['service_request', 'timestamp'], name='chat_request_ts_idx'),
+            models.Index(
+                fields=['receiver', 'service_request', 'id'],
+                condition=models.Q(is_read=False),
+                name='chat_unread_idx',
+            ),
+        ]
 
 
 # ⭐ Mechanic Rating Model
@@ -136,3 +242,135 @@ class MechanicRating(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+
+
+# 📣 Dispatch Offer Model (broadcast requests)
+class DispatchOffer(models.Model):
+    STATUS_CHOICES = [
+        ('offered', 'Offered'),
+        ('accepted', 'Accepted'),
+        ('declined', 'Declined'),
+        ('withdrawn', 'Withdrawn'),
+    ]
+
+    service_request = models.ForeignKey(
+        ServiceRequest,
+        on_delete=models.CASCADE,
+        related_name='offers'
+    )
+    mechanic = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='dispatch_offers'
+    )
+    distance_km = models.FloatField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='offered')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Request #{self.service_request_id} → {self.mechanic.username} ({self.status})"
+
+    class Meta:
+        ordering = ['distance_km']
+        constraints = [
+            models.UniqueConstraint(fields=['service_request', 'mechanic'], name='unique_offer_per_mechanic'),
+        ]
+
+
+# 📮 Notification Outbox (see services.notifications)
+class NotificationOutbox(models.Model):
+    recipient = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='queued_notifications'
+    )
+    sender = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    message = models.CharField(max_length=255)
+    link = models.CharField(max_length=255, blank=True, null=True)
+    # Entries sharing a key for the same recipient collapse into the newest one
+    coalesce_key = models.CharField(max_length=100, blank=True, default='')
+    # Set by the drain that won the row (conditional UPDATE); the row is
+    # deleted in the same transaction, so committed rows always hold ''
+    claimed_by = models.CharField(max_length=32, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Queued for {self.recipient_id}: {self.message[:40]}"
+
+    class Meta:
+        ordering = ['id']
+
+
+# 🗄️ Archived Chat Transcript (see services.archive)
+class ChatTranscript(models.Model):
+    service_request = models.OneToOneField(
+        ServiceRequest,
+        on_delete=models.CASCADE,
+        related_name='transcript'
+    )
+    # zlib-compressed JSON: [[id, sender_id, receiver_id, message, timestamp, is_read], ...]
+    data = models.BinaryField()
+    message_count = models.PositiveIntegerField(default=0)
+    raw_bytes = models.PositiveIntegerField(default=0)
+    # Kept uncompressed so the inbox can show a preview without unpacking
+    last_message = models.TextField(blank=True, default='')
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_sender = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    archived_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Transcript of request #{self.service_request_id} ({self.message_count} messages)"
+
+
+# 📈 Daily rollups (see services.rollups)
+class RequestDailyStat(models.Model):
+    day = models.DateField()
+    region = models.CharField(max_length=16, blank=True, default='')  # 1° grid cell, "" without coordinates
+    mechanic_type = models.CharField(max_length=50)
+    status = models.CharField(max_length=20)
+    requests = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'region', 'mechanic_type', 'status'], name='request_daily_stat_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.region or '-'} {self.mechanic_type} {self.status}: {self.requests}"
+
+
+class OrderDailyStat(models.Model):
+    day = models.DateField()
+    status = models.CharField(max_length=20)
+    orders = models.PositiveIntegerField(default=0)
+    items = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='order_daily_stat_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.orders}"
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)  # highest source row id already rolled up
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
@@ -0,0 +1,117 @@
+# services/notifications.py
+"""
+📮 Notification outbox.
+
+Views do not write ``Notification`` rows themselves any more: they
+``enqueue()`` an intent into ``NotificationOutbox`` inside the same
+transaction as the state change, which costs one small INSERT. A worker
+(``manage.py process_outbox``) drains the outbox in batches: entries that
+share a ``coalesce_key`` for the same recipient collapse into the newest one
+(so accept → complete in quick succession sends one message), the survivors
+are written with one ``bulk_create`` and then handed to every registered
+channel. With ``NOTIFICATION_OUTBOX_EAGER`` (on under DEBUG) the outbox is
+drained right after each commit, so development needs no worker.
+
+Drains running at the same time (several workers, or eager drains from
+concurrent requests) each claim their batch with one conditional UPDATE
+before delivering it, so a row is delivered exactly once, also on SQLite,
+which has no ``SELECT ... FOR UPDATE SKIP LOCKED``.
+"""
+import logging
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+
+from . import unread
+from .models import Notification, NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+_channels = {}
+
+
+def register_channel(name):
+    """Register ``func(notifications)`` to receive every delivered batch after it is committed."""
+    def decorator(func):
+        _channels[name] = func
+        return func
+    return decorator
+
+
+def status_key(request_id):
+    """Coalesce key for "your request changed status" messages."""
+    return f"request-{request_id}-status"
+
+
+# ✉️ Enqueue
+def enqueue(recipient, message, sender=None, link=None, key=""):
+    entry = NotificationOutbox.objects.create(
+        recipient=recipient, sender=sender, message=message, link=link, coalesce_key=key,
+    )
+    _drain_eagerly()
+    return entry
+
+
+def enqueue_many(entries):
+    """Queue several unsaved ``NotificationOutbox`` entries with one INSERT."""
+    NotificationOutbox.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+    if entries:
+        _drain_eagerly()
+
+
+def _drain_eagerly():
+    if getattr(settings, "NOTIFICATION_OUTBOX_EAGER", False):
+        # The write is already committed: a failed drain is logged and left to the next one
+        transaction.on_commit(drain_outbox, robust=True)
+
+
+# 🚚 Drain
+def coalesce(entries):
+    """Keep only the newest entry per (recipient, coalesce_key); unkeyed entries all survive."""
+    latest = {}
+    for entry in entries:
+        key = (entry.recipient_id, entry.coalesce_key) if entry.coalesce_key else ("id", entry.id)
+        latest[key] = entry
+    return sorted(latest.values(), key=lambda entry: entry.id)
+
+
+def drain_outbox(batch_size=BATCH_SIZE):
+    """Deliver queued notifications until the outbox is empty; returns how many were delivered."""
+    delivered = 0
+    while True:
+        with transaction.atomic():
+            # Claim first: the write lock is taken up front, and a competing
+            # drain's UPDATE finds these rows claimed (or deleted) and skips them
+            token = uuid.uuid4().hex
+            unclaimed = NotificationOutbox.objects.filter(claimed_by="").order_by("id").values("id")[:batch_size]
+            claimed = NotificationOutbox.objects.filter(id__in=unclaimed, claimed_by="").update(claimed_by=token)
+            if not claimed:
+                break
+            entries = list(NotificationOutbox.objects.filter(claimed_by=token).order_by("id"))
+
+            notifications = Notification.objects.bulk_create([
+                Notification(
+                    recipient_id=entry.recipient_id,
+                    sender_id=entry.sender_id,
+                    message=entry.message,
+                    link=entry.link,
+                )
+                for entry in coalesce(entries)
+            ])
+            NotificationOutbox.objects.filter(claimed_by=token).delete()
+            transaction.on_commit(lambda batch=notifications: _fan_out(batch))
+        delivered += len(notifications)
+    return delivered
+
+
+def _fan_out(notifications):
+    unread.add(unread.NOTIFICATIONS, [notification.recipient_id for notification in notifications])
+    # Extra channels are best effort: the in-app rows are already committed.
+    for name, channel in _channels.items():
+        try:
+            channel(notifications)
+        except Exception:
+            logger.exception("Notification channel %r failed", name)
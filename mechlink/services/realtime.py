@@ -0,0 +1,97 @@
+# services/realtime.py
+"""
+📡 Pub/sub hub behind the live notification stream.
+
+Every delivered notification is published on the recipient's channel
+(``user-<id>``) and each open ``notification_stream`` connection subscribes
+to its own user's channel. A subscriber is just an ``asyncio.Queue`` on the
+event loop, so an idle connection costs one suspended task, not a thread.
+
+The backend is chosen with ``REALTIME_BACKEND``. ``LocalBackend`` only
+reaches connections held by the same process, which is enough for a single
+ASGI worker with ``NOTIFICATION_OUTBOX_EAGER``; with several workers (or a
+separate ``process_outbox``) plug in a broker-backed class exposing the same
+``publish(channel, payload)`` / ``subscribe(channel)`` pair.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .notifications import register_channel
+
+
+class LocalBackend:
+    """In-process hub; safe to publish from any thread."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)  # channel -> {(loop, queue), ...}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, payload)
+            except RuntimeError:
+                pass  # that connection's loop has already shut down
+        return len(subscribers)
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        """Yields a queue that receives every payload published on ``channel``."""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[channel].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                channel_subscribers = self._subscribers.get(channel)
+                if channel_subscribers is not None:
+                    channel_subscribers.discard(subscriber)
+                    if not channel_subscribers:
+                        del self._subscribers[channel]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                backend = getattr(settings, "REALTIME_BACKEND", "services.realtime.LocalBackend")
+                _hub = import_string(backend)()
+    return _hub
+
+
+def user_channel(user_id):
+    return f"user-{user_id}"
+
+
+def notification_payload(notification):
+    return {
+        "id": notification.id,
+        "message": notification.message,
+        "link": notification.link or "",
+        "created_at": notification.created_at.isoformat() if notification.created_at else None,
+    }
+
+
+# 🔔 Outbox channel: push each delivered notification to its recipient
+@register_channel("realtime")
+def publish_notifications(notifications):
+    hub = get_hub()
+    for notification in notifications:
+        hub.publish(user_channel(notification.recipient_id), notification_payload(notification))
@@ -0,0 +1,201 @@
+# services/rollups.py
+"""
+📈 Daily rollups of service requests and orders for the admin statistics.
+
+``RequestDailyStat`` counts requests per (day, region, mechanic type,
+status) and ``OrderDailyStat`` counts orders, items and revenue per (day,
+status). ``update_rollups`` (``manage.py update_rollups``) keeps them
+current without rescanning history:
+
+* a watermark per rollup remembers the highest source id already counted,
+  so only rows added since the last run are new work;
+* a row can still change status while it is open (pending, accepted, …),
+  so any day whose buckets still hold open statuses is counted again.
+
+Those two sets of days are re-aggregated from the source table (by
+``created_at`` / ``ordered_at`` range, on the existing indexes) and their
+buckets replaced. Everything older is final and never read again (rows
+deleted later stay counted until ``update_rollups --rebuild``). Statuses are
+the ones users see: a pending request past its TTL counts as expired.
+
+Readers (``totals``, ``daily_series``, ``request_breakdown``) only touch
+the rollup tables, plus for totals the few rows past the watermark.
+"""
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from typing import Callable
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Floor, TruncDate
+from django.utils import timezone
+
+from mechanics.models import Order
+from .models import OrderDailyStat, RequestDailyStat, RollupWatermark, ServiceRequest
+
+REQUEST_OPEN_STATUSES = ("pending", "accepted", "in_progress")
+ORDER_OPEN_STATUSES = ("Pending", "Paid", "Accepted", "Processing")
+NOT_REVENUE = ("Pending", "Cancelled")  # orders that never took (or gave back) money
+
+
+# 🧮 Buckets
+def _request_buckets(requests):
+    rows = (
+        requests.annotate(
+            day=TruncDate("created_at"), region_row=Floor("latitude"), region_col=Floor("longitude")
+        )
+        .values("day", "region_row", "region_col", "mechanic_type", "effective_status")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    buckets = {}
+    for row in rows:
+        region = "" if row["region_row"] is None else f'{int(row["region_row"])}:{int(row["region_col"])}'
+        key = (row["day"], region, row["mechanic_type"], row["effective_status"])
+        buckets[key] = buckets.get(key, 0) + row["n"]
+    return [
+        RequestDailyStat(day=day, region=region, mechanic_type=mechanic_type, status=status, requests=n)
+        for (day, region, mechanic_type, status), n in buckets.items()
+    ]
+
+
+def _order_buckets(orders):
+    rows = (
+        orders.annotate(day=TruncDate("ordered_at"))
+        .values("day", "status")
+        .annotate(n=Count("id"), items=Sum("quantity"), revenue=Sum("total_price"))
+        .order_by()
+    )
+    return [
+        OrderDailyStat(day=row["day"], status=row["status"], orders=row["n"], items=row["items"] or 0,
+                       revenue=row["revenue"] or 0)
+        for row in rows
+    ]
+
+
+@dataclass(frozen=True)
+class Rollup:
+    name: str
+    model: type
+    source: Callable          # queryset of the rows being rolled up
+    date_field: str
+    open_statuses: tuple
+    buckets: Callable         # source queryset -> unsaved bucket rows
+
+
+ROLLUPS = (
+    Rollup("requests", RequestDailyStat, lambda: ServiceRequest.objects.with_effective_status(),
+           "created_at", REQUEST_OPEN_STATUSES, _request_buckets),
+    Rollup("orders", OrderDailyStat, lambda: Order.objects.all(),
+           "ordered_at", ORDER_OPEN_STATUSES, _order_buckets),
+)
+
+
+# 🔁 Incremental refresh
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _on_days(field, days):
+    condition = Q()
+    for day in days:
+        start, end = _day_bounds(day)
+        condition |= Q(**{f"{field}__gte": start, f"{field}__lt": end})
+    return condition
+
+
+def refresh(rollup, rebuild=False):
+    """Bring one rollup up to date; returns how many days were (re)counted."""
+    with transaction.atomic():
+        RollupWatermark.objects.get_or_create(name=rollup.name)
+        watermark = RollupWatermark.objects.select_for_update().get(name=rollup.name)
+        high = rollup.source().aggregate(high=Max("id"))["high"] or 0
+        source = rollup.source().filter(id__lte=high)
+
+        if rebuild:
+            rollup.model.objects.all().delete()
+            buckets = rollup.buckets(source)
+            days = {bucket.day for bucket in buckets}
+        else:
+            days = set(
+                rollup.model.objects.filter(status__in=rollup.open_statuses)
+                .values_list("day", flat=True).distinct()
+            )
+            days.update(
+                source.filter(id__gt=watermark.last_id)
+                .annotate(day=TruncDate(rollup.date_field))
+                .values_list("day", flat=True).distinct()
+            )
+            if not days and high == watermark.last_id:
+                return 0
+            buckets = rollup.buckets(source.filter(_on_days(rollup.date_field, days))) if days else []
+            rollup.model.objects.filter(day__in=days).delete()
+
+        rollup.model.objects.bulk_create(buckets, batch_size=500)
+        watermark.last_id = high
+        watermark.save()
+    return len(days)
+
+
+def update_rollups(rebuild=False):
+    """``{rollup name: days recounted}`` for every rollup."""
+    return {rollup.name: refresh(rollup, rebuild=rebuild) for rollup in ROLLUPS}
+
+
+# 📊 Readers
+def not_rolled_up(name):
+    """Source rows added after the rollup's watermark (cheap: a primary key range)."""
+    rollup = next(rollup for rollup in ROLLUPS if rollup.name == name)
+    last_id = RollupWatermark.objects.filter(name=name).values("last_id")[:1]
+    return rollup.source().filter(id__gt=Coalesce(Subquery(last_id), 0))
+
+
+def totals():
+    """All-time request / order / revenue totals: the rollups plus the rows not yet rolled up."""
+    requests = RequestDailyStat.objects.aggregate(n=Sum("requests"))["n"] or 0
+    orders = OrderDailyStat.objects.aggregate(
+        n=Sum("orders"), revenue=Sum("revenue", filter=~Q(status__in=NOT_REVENUE))
+    )
+    tail_orders = not_rolled_up("orders").aggregate(
+        n=Count("id"), revenue=Sum("total_price", filter=~Q(status__in=NOT_REVENUE))
+    )
+    return {
+        "requests": requests + not_rolled_up("requests").count(),
+        "orders": (orders["n"] or 0) + tail_orders["n"],
+        "revenue": (orders["revenue"] or Decimal(0)) + (tail_orders["revenue"] or Decimal(0)),
+    }
+
+
+def _since(days):
+    return timezone.localdate() - timedelta(days=days - 1)
+
+
+def daily_series(days=14):
+    """``[{"day", "requests", "orders", "revenue"}, ...]`` for the last ``days`` days, oldest first."""
+    since = _since(days)
+    series = {since + timedelta(days=i): {"requests": 0, "orders": 0, "revenue": Decimal(0)} for i in range(days)}
+    requests = (
+        RequestDailyStat.objects.filter(day__gte=since).values("day").annotate(n=Sum("requests")).order_by()
+    )
+    for row in requests:
+        series[row["day"]]["requests"] = row["n"]
+    orders = (
+        OrderDailyStat.objects.filter(day__gte=since).values("day")
+        .annotate(n=Sum("orders"), revenue=Sum("revenue", filter=~Q(status__in=NOT_REVENUE)))
+        .order_by()
+    )
+    for row in orders:
+        series[row["day"]].update(orders=row["n"], revenue=row["revenue"] or Decimal(0))
+    return [{"day": day, **values} for day, values in series.items()]
+
+
+def request_breakdown(by, days=30):
+    """Request counts over the last ``days`` days grouped by ``region``, ``mechanic_type`` or ``status``."""
+    if by not in ("region", "mechanic_type", "status"):
+        raise ValueError(by)
+    return list(
+        RequestDailyStat.objects.filter(day__gte=_since(days))
+        .values(key=F(by)).annotate(requests=Sum("requests")).order_by("-requests")
+    )
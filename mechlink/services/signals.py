@@ -0,0 +1,21 @@
+# services/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import unread
+from .models import ChatMessage, Notification
+
+
+# 🔴 Bump the cached unread counters when something new arrives
+# (bulk_create skips these; services.notifications bumps them itself).
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        transaction.on_commit(lambda: unread.add(unread.NOTIFICATIONS, [instance.recipient_id]))
+
+
+@receiver(post_save, sender=ChatMessage)
+def chat_message_saved(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        transaction.on_commit(lambda: unread.add(unread.CHATS, [instance.receiver_id]))
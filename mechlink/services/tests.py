@@ -1,3 +1,821 @@
-from django.test import TestCase
+import json
+import re
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from mechanics import location_index
+from mechlink.asgi import application
+from mechanics.models import MechanicProfile, Order, Product
+from users.admin_tables import platform_stats
+from users.models import CustomUser
+from .archive import archive_closed_chats, conversation_page
+from .assignment import apply_assignments, plan_assignments
+from . import chat_socket, unread
+from .chat_history import InvalidCursor, decode_cursor, encode_cursor
+from .dispatch import broadcast_request, claim_request
+from .expiry import expire_old_requests
+from .models import (
+    ChatMessage, ChatTranscript, DispatchOffer, Notification, NotificationOutbox, OrderDailyStat, RequestDailyStat,
+    RollupWatermark, ServiceRequest, stale_pending_q,
+)
+from .notifications import drain_outbox, enqueue, status_key
+from .rollups import daily_series, totals, update_rollups
+
+# "SCAN <table>" reads every row; "SCAN <table> USING INDEX <name>" walks a
+# whole index, which is only acceptable when that index is partial.
+SCAN = re.compile(r"\bSCAN (\S+)(?: USING (?:COVERING )?INDEX (\S+))?")
+
+
+class QueryPlanMixin:
+    """EXPLAIN QUERY PLAN helpers for the hot-query index tests."""
+
+    def assertUsesIndex(self, queryset, index_name=None):
+        """Fail if ``queryset`` full-scans its table (or does not use ``index_name``)."""
+        if connection.vendor != "sqlite":
+            self.skipTest("query plan checks are written against SQLite")
+        plan = queryset.explain()
+        meta = queryset.model._meta
+        partial = {index.name for index in meta.indexes if index.condition is not None}
+        for table, index in SCAN.findall(plan):
+            if table == meta.db_table and index not in partial:
+                self.fail(f"full scan of {table}:\n{plan}")
+        if index_name:
+            self.assertIn(index_name, plan)
+
+
+# 📈 The dashboard and background-job filters must stay on an index
+class HotQueryIndexTests(QueryPlanMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        cls.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+
+    def test_mechanic_requests_by_status(self):
+        self.assertUsesIndex(
+            ServiceRequest.objects.filter(mechanic=self.mechanic, status="accepted"),
+            "sr_mechanic_status_idx",
+        )
+
+    def test_customer_requests_newest_first(self):
+        self.assertUsesIndex(
+            ServiceRequest.objects.filter(user=self.customer).order_by("-created_at"),
+            "sr_user_created_idx",
+        )
+
+    def test_stale_pending_requests(self):
+        self.assertUsesIndex(
+            ServiceRequest.objects.filter(stale_pending_q(timezone.now())),
+            "sr_pending_created_idx",
+        )
+
+    def test_recent_notifications(self):
+        self.assertUsesIndex(
+            Notification.objects.filter(recipient=self.customer).order_by("-created_at")[:5],
+            "notif_recipient_created_idx",
+        )
+
+    def test_unread_notifications(self):
+        self.assertUsesIndex(
+            Notification.objects.filter(recipient=self.customer, is_read=False).order_by(),
+            "notif_unread_idx",
+        )
+
+    def test_chat_history(self):
+        request = ServiceRequest.objects.create(user=self.customer, mechanic=self.mechanic, issue_description="x")
+        self.assertUsesIndex(
+            ChatMessage.objects.filter(service_request=request).order_by("timestamp"),
+            "chat_request_ts_idx",
+        )
+
+    def test_mark_notifications_read_up_to(self):
+        self.assertUsesIndex(
+            Notification.objects.filter(recipient=self.customer, is_read=False, id__lte=100).order_by(),
+            "notif_unread_idx",
+        )
+
+    def test_unread_chats_total(self):
+        self.assertUsesIndex(
+            ChatMessage.objects.filter(receiver=self.mechanic, is_read=False).order_by(),
+            "chat_unread_idx",
+        )
+
+
+# 📡 The notification stream must not pin a WSGI worker
+class NotificationStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+
+    def setUp(self):
+        cache.clear()  # unread badges
+        self.client.force_login(self.customer)
+
+    def test_wsgi_request_gets_a_finite_reply(self):
+        seen = Notification.objects.create(recipient=self.customer, message="Seen already")
+        Notification.objects.create(recipient=self.customer, message="Mechanic on the way")
+        response = self.client.get(reverse("notification_stream"), HTTP_LAST_EVENT_ID=str(seen.id))
+        self.assertFalse(response.streaming)
+        body = response.content.decode()
+        self.assertTrue(body.startswith("retry: "))
+        self.assertIn("Mechanic on the way", body)
+        self.assertNotIn("Seen already", body)
+
+    def test_wsgi_pages_poll_instead_of_streaming(self):
+        response = self.client.get(reverse("notifications"))
+        self.assertNotContains(response, "new EventSource")
+        self.assertContains(response, reverse("unread_counts"))
+        self.assertEqual(self.client.get(reverse("unread_counts")).json(), {"notifications": 0, "chats": 0})
+
+
+# 🧮 Batch assignment
+class AssignmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        cls.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+        profile = MechanicProfile(user=cls.mechanic, latitude=12.97, longitude=77.59)
+        profile.mechanic_types = ["automotive"]
+        profile.save()
+
+    def setUp(self):
+        location_index.invalidate()
+
+    def new_request(self):
+        return ServiceRequest.objects.create(
+            user=self.customer, issue_description="Won't start", mechanic_type="automotive",
+            latitude=12.98, longitude=77.60,
+        )
+
+    def run_assignment(self, **options):
+        return apply_assignments(plan_assignments(**options))
+
+    def test_assigned_pending_requests_count_as_load(self):
+        first = self.new_request()
+        self.assertEqual(self.run_assignment(max_load=1), 1)
+        first.refresh_from_db()
+        self.assertEqual((first.mechanic, first.status), (self.mechanic, "pending"))
+
+        # The mechanic still holds the first request: a second run must not pile on
+        second = self.new_request()
+        self.assertEqual(self.run_assignment(max_load=1), 0)
+        second.refresh_from_db()
+        self.assertIsNone(second.mechanic)
+        self.assertEqual(self.run_assignment(max_load=2), 1)
+
+    def test_broadcast_requests_are_left_to_dispatch(self):
+        request = self.new_request()
+        broadcast_request(request, [(self.mechanic.id, 1.4)])
+        self.assertEqual(plan_assignments(), [])
+        self.assertEqual(self.run_assignment(), 0)
+
+        DispatchOffer.objects.filter(service_request=request).update(status="declined")
+        self.assertEqual(self.run_assignment(), 1)
+        request.refresh_from_db()
+        self.assertEqual(request.mechanic, self.mechanic)
+
+
+# 📣 Broadcast dispatch: first accept wins, the other offers are withdrawn
+class DispatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        cls.first = CustomUser.objects.create_user("first", password="x", role="mechanic")
+        cls.second = CustomUser.objects.create_user("second", password="x", role="mechanic")
+
+    def setUp(self):
+        self.request = ServiceRequest.objects.create(
+            user=self.customer, issue_description="Flat tyre", latitude=12.97, longitude=77.59
+        )
+        broadcast_request(self.request, [(self.first.id, 1.2), (self.second.id, 2.5)])
+
+    def accept_as(self, mechanic):
+        self.client.force_login(mechanic)
+        return self.client.post(reverse("accept_request", args=[self.request.id]), follow=True)
+
+    def test_offered_requests_page_renders(self):
+        self.client.force_login(self.second)
+        response = self.client.get(reverse("mechanic_requests"))
+        self.assertContains(response, "Flat tyre")
+        self.assertContains(response, "openMapModal(12.970000, 77.590000")
+
+    def test_only_the_first_claim_wins(self):
+        self.assertTrue(claim_request(self.request, self.first))
+        self.assertFalse(claim_request(self.request, self.second))
+        self.request.refresh_from_db()
+        self.assertEqual((self.request.mechanic, self.request.status), (self.first, "accepted"))
+
+    def test_losing_offers_are_withdrawn(self):
+        self.accept_as(self.first)
+        offers = dict(DispatchOffer.objects.filter(service_request=self.request).values_list("mechanic_id", "status"))
+        self.assertEqual(offers, {self.first.id: "accepted", self.second.id: "withdrawn"})
+        self.assertFalse(ServiceRequest.objects.for_mechanic(self.second).filter(id=self.request.id).exists())
+
+    def test_losing_mechanic_is_told_and_redirected(self):
+        self.accept_as(self.first)
+        response = self.accept_as(self.second)
+        self.assertRedirects(response, reverse("mechanic_dashboard"))
+        self.assertContains(response, "already taken")
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.mechanic, self.first)
+
+    def test_request_never_offered_is_not_found(self):
+        outsider = CustomUser.objects.create_user("outsider", password="x", role="mechanic")
+        self.client.force_login(outsider)
+        self.assertEqual(self.client.post(reverse("accept_request", args=[self.request.id])).status_code, 404)
+
+
+# 📬 Outbox: coalesced, delivered once however many drains run
+@override_settings(NOTIFICATION_OUTBOX_EAGER=False)
+class OutboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        cls.other = CustomUser.objects.create_user("other", password="x", role="customer")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_keyed_entries_collapse_into_the_newest(self):
+        enqueue(self.customer, "Request accepted", key="request-1")
+        enqueue(self.customer, "Request completed", key="request-1")
+        enqueue(self.other, "Request accepted", key="request-1")
+        enqueue(self.customer, "New message")
+        self.assertEqual(drain_outbox(), 3)
+        messages = Notification.objects.filter(recipient=self.customer).values_list("message", flat=True)
+        self.assertCountEqual(messages, ["Request completed", "New message"])
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_each_entry_is_delivered_once(self):
+        for i in range(5):
+            enqueue(self.customer, f"Update {i}")
+        self.assertEqual(drain_outbox(batch_size=2), 5)
+        self.assertEqual(drain_outbox(), 0)
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_rows_claimed_by_another_drain_are_left_to_it(self):
+        enqueue(self.customer, "Mine")
+        enqueue(self.customer, "Theirs")
+        NotificationOutbox.objects.filter(message="Theirs").update(claimed_by="another-drain")
+        self.assertEqual(drain_outbox(), 1)
+        self.assertEqual(list(Notification.objects.values_list("message", flat=True)), ["Mine"])
+        self.assertTrue(NotificationOutbox.objects.filter(message="Theirs").exists())
+
+    @override_settings(NOTIFICATION_OUTBOX_EAGER=True)
+    def test_failed_eager_drain_does_not_fail_the_write(self):
+        def broken_drain():
+            raise RuntimeError("mail server down")
+
+        with mock.patch("services.notifications.drain_outbox", broken_drain):
+            with self.assertLogs("django", "ERROR"), self.captureOnCommitCallbacks(execute=True):
+                enqueue(self.customer, "Request accepted")
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+
+# 💬 Messages posted through the form reach open chat sockets too
+class ChatViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        cls.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+        cls.request = ServiceRequest.objects.create(
+            user=cls.customer, mechanic=cls.mechanic, issue_description="Flat tyre", status="accepted"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.customer)
+
+    def test_posted_message_is_published_after_commit(self):
+        with mock.patch("services.views.get_hub") as get_hub:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.post(reverse("chat_view", args=[self.request.id]), {"message": "Where are you?"})
+            get_hub.return_value.publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+        message = ChatMessage.objects.get(service_request=self.request)
+        channel, event = get_hub.return_value.publish.call_args.args
+        self.assertEqual(channel, f"chat-{self.request.id}")
+        self.assertEqual((event["type"], event["id"], event["message"]), ("message", message.id, "Where are you?"))
+
+
+# ⏳ Pending requests expire by the clock; expire_requests only writes it down
+@override_settings(
+    SERVICE_REQUEST_TTL_MINUTES={"default": 5, "heavy_vehicle": 30}, NOTIFICATION_OUTBOX_EAGER=False
+)
+class ExpiryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        cls.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+
+    def make_request(self, minutes_old, **fields):
+        request = ServiceRequest.objects.create(user=self.customer, issue_description="Flat tyre", **fields)
+        ServiceRequest.objects.filter(id=request.id).update(created_at=timezone.now() - timedelta(minutes=minutes_old))
+        return ServiceRequest.objects.get(id=request.id)
+
+    def test_stale_pending_request_reads_as_expired(self):
+        stale, fresh = self.make_request(10), self.make_request(1)
+        self.assertEqual((stale.status, stale.effective_status), ("pending", "expired"))
+        self.assertEqual(fresh.effective_status, "pending")
+        annotated = dict(ServiceRequest.objects.with_effective_status().values_list("id", "effective_status"))
+        self.assertEqual(annotated, {stale.id: "expired", fresh.id: "pending"})
+        self.assertEqual(list(ServiceRequest.objects.live_pending()), [fresh])
+        self.assertEqual(list(ServiceRequest.objects.with_effective("expired")), [stale])
+
+    def test_ttl_follows_the_mechanic_type(self):
+        heavy = self.make_request(10, mechanic_type="heavy_vehicle")
+        self.assertEqual(heavy.effective_status, "pending")
+        self.assertFalse(ServiceRequest.objects.filter(stale_pending_q()).exists())
+
+    def test_compaction_expires_stale_rows_and_queues_one_notification_each(self):
+        stale = [self.make_request(10), self.make_request(20)]
+        fresh = self.make_request(1)
+        accepted = self.make_request(60, mechanic=self.mechanic, status="accepted")
+
+        self.assertEqual(expire_old_requests(), 2)
+        statuses = dict(ServiceRequest.objects.values_list("id", "status"))
+        self.assertEqual(
+            statuses, {stale[0].id: "expired", stale[1].id: "expired", fresh.id: "pending", accepted.id: "accepted"}
+        )
+        queued = NotificationOutbox.objects.values_list("recipient_id", "coalesce_key")
+        self.assertCountEqual(queued, [(self.customer.id, status_key(request.id)) for request in stale])
+
+    def test_second_pass_finds_nothing_to_do(self):
+        self.make_request(10)
+        expire_old_requests()
+        self.assertEqual(expire_old_requests(), 0)
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+
+# 📜 Chat history: keyset cursors, also across the transcript archive
+class ChatHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        cls.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+
+    def setUp(self):
+        cache.clear()
+        self.request = ServiceRequest.objects.create(
+            user=self.customer, mechanic=self.mechanic, issue_description="Flat tyre", status="accepted"
+        )
+        self.start = timezone.now() - timedelta(days=1)
+
+    def add_messages(self, count, first_minute=0):
+        """``count`` messages, two per minute so that pairs share a timestamp (the id breaks the tie)."""
+        messages = []
+        for i in range(count):
+            message = ChatMessage.objects.create(
+                service_request=self.request, sender=self.customer, receiver=self.mechanic, message=f"Message {i}"
+            )
+            message.timestamp = self.start + timedelta(minutes=first_minute + i // 2)
+            ChatMessage.objects.filter(id=message.id).update(timestamp=message.timestamp)
+            messages.append(message)
+        return messages
+
+    def scroll_back(self, limit):
+        """Every message id, reading backwards page by page from the latest one."""
+        page, has_more = conversation_page(self.request, limit=limit)
+        ids = [message.id for message in page]
+        while has_more:
+            page, has_more = conversation_page(self.request, before=encode_cursor(page[0]), limit=limit)
+            ids = [message.id for message in page] + ids
+        return ids
+
+    def test_cursor_round_trip(self):
+        message = self.add_messages(1)[0]
+        self.assertEqual(decode_cursor(encode_cursor(message)), (message.timestamp, message.id))
+
+    def test_malformed_cursors_are_rejected(self):
+        for cursor in ("", "abc", "12", "1.2.3", "x.5", None, "99999999999999999999999.1"):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+    def test_history_view_answers_bad_cursors_with_400(self):
+        self.client.force_login(self.customer)
+        response = self.client.get(reverse("chat_history", args=[self.request.id]), {"before": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_pages_neither_repeat_nor_skip_messages(self):
+        messages = self.add_messages(7)
+        self.assertEqual(self.scroll_back(limit=2), [message.id for message in messages])
+        page, has_more = conversation_page(self.request, after=encode_cursor(messages[2]), limit=3)
+        self.assertEqual([message.id for message in page], [message.id for message in messages[3:6]])
+        self.assertTrue(has_more)
+
+    def test_paging_crosses_the_archive_boundary(self):
+        archived = self.add_messages(5)
+        ServiceRequest.objects.filter(id=self.request.id).update(status="completed")
+        self.assertEqual(archive_closed_chats(older_than=timedelta(0)).messages, 5)
+        self.assertTrue(ChatTranscript.objects.filter(service_request=self.request).exists())
+
+        # Re-opened: new rows follow the transcript until the next archive run
+        ServiceRequest.objects.filter(id=self.request.id).update(status="accepted")
+        live = self.add_messages(4, first_minute=10)
+        expected = [message.id for message in archived + live]
+        for limit in (1, 2, 3, 5):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.scroll_back(limit=limit), expected)
+
+        page, _ = conversation_page(self.request, after=encode_cursor(archived[3]), limit=3)
+        self.assertEqual([message.id for message in page], [archived[4].id, live[0].id, live[1].id])
+
+
+# 🗄️ Closed, quiet chats move into one compressed transcript each
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        cls.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+
+    def setUp(self):
+        cache.clear()
+
+    def make_chat(self, status, days_quiet, count=3):
+        request = ServiceRequest.objects.create(
+            user=self.customer, mechanic=self.mechanic, issue_description="Flat tyre", status=status
+        )
+        for i in range(count):
+            ChatMessage.objects.create(
+                service_request=request, sender=self.mechanic, receiver=self.customer, message=f"Update {i} " * 20
+            )
+        request.messages.update(timestamp=timezone.now() - timedelta(days=days_quiet))
+        return request
+
+    def test_only_closed_quiet_chats_are_archived(self):
+        archived = self.make_chat("completed", days_quiet=40)
+        recent = self.make_chat("completed", days_quiet=2)
+        active = self.make_chat("in_progress", days_quiet=40)
+
+        stats = archive_closed_chats()
+        self.assertEqual((stats.requests, stats.messages), (1, 3))
+        self.assertGreater(stats.reclaimed_bytes, 0)
+        self.assertFalse(archived.messages.exists())
+        self.assertEqual(ChatTranscript.objects.get().service_request_id, archived.id)
+        self.assertEqual(recent.messages.count() + active.messages.count(), 6)
+
+    def test_archived_chat_reads_as_before(self):
+        request = self.make_chat("completed", days_quiet=40)
+        before, _ = conversation_page(request)
+        archive_closed_chats()
+        after, has_more = conversation_page(request)
+        self.assertFalse(has_more)
+        self.assertEqual(
+            [(m.id, m.sender, m.message, m.timestamp, m.is_read) for m in after],
+            [(m.id, m.sender, m.message, m.timestamp, m.is_read) for m in before],
+        )
+        self.client.force_login(self.customer)
+        self.assertContains(self.client.get(reverse("chat_view", args=[request.id])), "Update 2")
+
+    def test_rearchiving_extends_the_transcript(self):
+        request = self.make_chat("completed", days_quiet=40)
+        archive_closed_chats()
+        ChatMessage.objects.create(service_request=request, sender=self.customer, receiver=self.mechanic, message="Thanks")
+        request.messages.update(timestamp=timezone.now() - timedelta(days=35))
+        archive_closed_chats()
+        transcript = ChatTranscript.objects.get(service_request=request)
+        self.assertEqual(transcript.message_count, 4)
+        self.assertEqual(transcript.last_message, "Thanks")
+        self.assertFalse(request.messages.exists())
+
+
+# 📈 Daily rollups: incremental, idempotent, and what the stat cards show
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        cls.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+        profile = MechanicProfile.objects.create(user=cls.mechanic, shop_name="Quick Fix")
+        cls.product = Product.objects.create(mechanic=profile, name="Brake pad", price=250, stock=10)
+
+    def make_request(self, days_ago, **fields):
+        request = ServiceRequest.objects.create(
+            user=self.customer, issue_description="Flat tyre", latitude=12.97, longitude=77.59, **fields
+        )
+        ServiceRequest.objects.filter(id=request.id).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return request
+
+    def make_order(self, days_ago, status, quantity=1):
+        order = Order.objects.create(
+            customer=self.customer, product=self.product, quantity=quantity, total_price=250 * quantity, status=status
+        )
+        Order.objects.filter(id=order.id).update(ordered_at=timezone.now() - timedelta(days=days_ago))
+        return order
+
+    def snapshot(self):
+        return (
+            sorted(RequestDailyStat.objects.values_list("day", "region", "mechanic_type", "status", "requests")),
+            sorted(OrderDailyStat.objects.values_list("day", "status", "orders", "items", "revenue")),
+        )
+
+    def test_counts_match_the_source_tables(self):
+        self.make_request(3, status="completed", mechanic=self.mechanic)
+        self.make_request(3, status="completed", mechanic=self.mechanic)
+        self.make_request(0, mechanic_type="two_wheeler")
+        self.make_order(2, "Delivered", quantity=2)
+        self.make_order(0, "Cancelled")
+        update_rollups()
+
+        day = timezone.localdate()
+        requests, orders = self.snapshot()
+        self.assertEqual(requests, [
+            (day - timedelta(days=3), "12:77", "automotive", "completed", 2),
+            (day, "12:77", "two_wheeler", "pending", 1),
+        ])
+        self.assertEqual(orders, [
+            (day - timedelta(days=2), "Delivered", 1, 2, 500),
+            (day, "Cancelled", 1, 1, 250),
+        ])
+        self.assertEqual(
+            RollupWatermark.objects.get(name="requests").last_id, ServiceRequest.objects.latest("id").id
+        )
+
+    def test_second_run_changes_nothing(self):
+        self.make_request(1, status="completed", mechanic=self.mechanic)
+        self.make_request(0)
+        self.make_order(0, "Paid")
+        update_rollups()
+        first = self.snapshot()
+        update_rollups()
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(update_rollups(rebuild=True), {"requests": 2, "orders": 1})
+        self.assertEqual(self.snapshot(), first)
+
+    def test_open_days_are_recounted_and_new_rows_picked_up(self):
+        open_request = self.make_request(1, mechanic=self.mechanic, status="accepted")
+        self.make_request(5, status="completed", mechanic=self.mechanic)
+        update_rollups()
+
+        ServiceRequest.objects.filter(id=open_request.id).update(status="completed")
+        self.make_request(0)
+        self.assertEqual(update_rollups()["requests"], 2)  # yesterday (was open) and today (new row)
+        statuses = dict(RequestDailyStat.objects.values("status").annotate(n=Sum("requests")).values_list("status", "n"))
+        self.assertEqual(statuses, {"completed": 2, "pending": 1})
+
+    def test_daily_series_is_zero_filled_oldest_first(self):
+        self.make_request(1)
+        self.make_request(1)
+        self.make_order(1, "Delivered")
+        self.make_order(1, "Pending")
+        self.make_order(20, "Delivered")
+        update_rollups()
+
+        series = daily_series(days=3)
+        today = timezone.localdate()
+        self.assertEqual([row["day"] for row in series], [today - timedelta(days=2), today - timedelta(days=1), today])
+        self.assertEqual(
+            [(row["requests"], row["orders"], row["revenue"]) for row in series],
+            [(0, 0, 0), (2, 2, 250), (0, 0, 0)],
+        )
+
+    def test_platform_stats_match_the_rollups_and_the_rows_past_them(self):
+        self.make_request(2)
+        self.make_order(2, "Delivered")
+        self.make_order(2, "Cancelled")
+        update_rollups()
+        self.make_request(0)
+        self.make_order(0, "Paid", quantity=3)
+
+        stats = platform_stats()
+        expected = totals()
+        self.assertEqual(
+            (stats["total_requests"], stats["total_orders"], stats["total_revenue"]),
+            (expected["requests"], expected["orders"], expected["revenue"]),
+        )
+        self.assertEqual((stats["total_requests"], stats["total_orders"]), (2, 3))
+        self.assertEqual(stats["total_revenue"], Decimal("1000.00"))
+
+
+# ✅ Read receipts: one notification, or everything up to an id
+class NotificationReadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        cls.other = CustomUser.objects.create_user("other", password="x", role="customer")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.customer)
+        self.notes = [
+            Notification.objects.create(recipient=self.customer, message=f"Update {i}") for i in range(3)
+        ]
+        self.foreign = Notification.objects.create(recipient=self.other, message="Not yours")
+
+    def mark(self, **data):
+        return self.client.post(reverse("mark_notifications_read"), data)
+
+    def unread_ids(self):
+        return set(Notification.objects.filter(is_read=False).values_list("id", flat=True))
+
+    def test_marking_one_leaves_older_unread_ones_alone(self):
+        response = self.mark(id=self.notes[2].id)
+        self.assertEqual(response.json(), {"updated": 1, "unread": 2})
+        self.assertEqual(self.unread_ids(), {self.notes[0].id, self.notes[1].id, self.foreign.id})
+
+    def test_up_to_marks_everything_older(self):
+        self.assertEqual(self.mark(up_to=self.notes[1].id).json(), {"updated": 2, "unread": 1})
+        self.assertEqual(self.unread_ids(), {self.notes[2].id, self.foreign.id})
+
+    def test_other_users_notifications_are_untouched(self):
+        self.assertEqual(self.mark(id=self.foreign.id).json()["updated"], 0)
+        self.assertIn(self.foreign.id, self.unread_ids())
+
+    def test_bad_ids_are_a_400(self):
+        self.assertEqual(self.mark(id="1; DROP").status_code, 400)
+        self.assertEqual(self.mark(up_to="-1").status_code, 400)
+
+
+# 🔴 Cached unread counters move with every write and agree with a recount
+class UnreadCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        cls.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+        cls.chat = ServiceRequest.objects.create(
+            user=cls.customer, mechanic=cls.mechanic, issue_description="Flat tyre", status="accepted"
+        )
+        cls.closed_chat = ServiceRequest.objects.create(
+            user=cls.customer, mechanic=cls.mechanic, issue_description="Chain", status="completed"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def notify(self, n=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [Notification.objects.create(recipient=self.customer, message="Update") for _ in range(n)]
+
+    def chat_message(self, service_request=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ChatMessage.objects.create(
+                service_request=service_request or self.chat, sender=self.mechanic, receiver=self.customer,
+                message="On my way",
+            )
+
+    def assertCachedCounts(self, notifications, chats):
+        """The counters are served from the cache and match a fresh count."""
+        with self.assertNumQueries(0):
+            counts = unread.get_counts(self.customer.id)
+        self.assertEqual(counts, {"notifications": notifications, "chats": chats})
+        self.assertEqual(notifications, unread._count_from_db(unread.NOTIFICATIONS, self.customer.id))
+        self.assertEqual(chats, unread._count_from_db(unread.CHATS, self.customer.id))
+
+    def test_new_notifications_and_messages_increment(self):
+        self.assertEqual(unread.get_counts(self.customer.id), {"notifications": 0, "chats": 0})
+        self.notify(2)
+        self.chat_message()
+        self.assertCachedCounts(2, 1)
+
+    def test_writes_do_not_create_cold_counters(self):
+        self.notify()
+        self.assertIsNone(cache.get(unread._key(unread.NOTIFICATIONS, self.customer.id)))
+        self.assertEqual(unread.get_counts(self.customer.id)["notifications"], 1)
+
+    def test_marking_notifications_read_decrements(self):
+        notes = self.notify(3)
+        unread.get_counts(self.customer.id)
+        unread.mark_notifications_read(self.customer.id, ids=[notes[0].id])
+        unread.get_counts(self.customer.id)  # a partial read drops the key; this recounts
+        self.assertCachedCounts(2, 0)
+        unread.mark_notifications_read(self.customer.id, up_to=notes[1].id)
+        unread.get_counts(self.customer.id)
+        self.assertCachedCounts(1, 0)
+        unread.mark_notifications_read(self.customer.id)
+        self.assertCachedCounts(0, 0)
+
+    def test_marking_one_chat_read_keeps_the_others(self):
+        other_chat = ServiceRequest.objects.create(
+            user=self.customer, mechanic=self.mechanic, issue_description="Battery", status="accepted"
+        )
+        self.chat_message()
+        self.chat_message(other_chat)
+        unread.get_counts(self.customer.id)
+        unread.mark_chat_read(self.customer.id, self.chat.id)
+        unread.get_counts(self.customer.id)
+        self.assertCachedCounts(0, 1)
+
+    def test_cache_miss_recounts_from_the_database(self):
+        self.notify(2)
+        unread.get_counts(self.customer.id)
+        # .update() bypasses the hooks, like a write from a shell; the miss repairs the drift
+        Notification.objects.filter(recipient=self.customer).update(is_read=True)
+        cache.delete(unread._key(unread.NOTIFICATIONS, self.customer.id))
+        with self.assertNumQueries(1):
+            self.assertEqual(unread.get_counts(self.customer.id), {"notifications": 0, "chats": 0})
+        self.assertCachedCounts(0, 0)
+
+    def test_socket_batches_count_despite_skipping_signals(self):
+        unread.get_counts(self.customer.id)
+        batch = [
+            ChatMessage(service_request=service_request, sender=self.mechanic, receiver=self.customer, message="Hi")
+            for service_request in (self.chat, self.chat, self.closed_chat)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            saved, dropped = chat_socket._save_batch(batch)
+        self.assertEqual((len(saved), len(dropped)), (2, 1))
+        self.assertCachedCounts(0, 2)
+
+
+# 🔌 Live chat socket (TransactionTestCase: the handler closes old connections,
+# which would end a TestCase's wrapping transaction)
+class ChatSocketTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        self.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+        self.request = ServiceRequest.objects.create(
+            user=self.customer, mechanic=self.mechanic, issue_description="Flat tyre", status="accepted"
+        )
+        self.client.force_login(self.customer)
+
+    def scope(self, origin="http://testserver", cookie=True):
+        headers = [(b"host", b"testserver")]
+        if origin:
+            headers.append((b"origin", origin.encode()))
+        if cookie:
+            headers.append((b"cookie", f"sessionid={self.client.cookies['sessionid'].value}".encode()))
+        return {"type": "websocket", "path": f"/ws/chat/{self.request.id}/", "headers": headers}
+
+    async def connect(self, **scope):
+        socket = ApplicationCommunicator(application, self.scope(**scope))
+        await socket.send_input({"type": "websocket.connect"})
+        return socket, await socket.receive_output(timeout=2)
+
+    async def send(self, socket, payload):
+        await socket.send_input({"type": "websocket.receive", "text": json.dumps(payload)})
+
+    async def receive(self, socket):
+        return json.loads((await socket.receive_output(timeout=2))["text"])
+
+    async def disconnect(self, socket):
+        await socket.send_input({"type": "websocket.disconnect", "code": 1000})
+        await socket.wait(timeout=2)
+        writer = chat_socket._writer
+        if writer is not None and writer.task is not None:
+            writer.task.cancel()
+        chat_socket._writer = None
+
+    async def test_foreign_origin_or_no_session_is_refused(self):
+        for scope in ({"origin": "https://evil.example"}, {"cookie": False}):
+            with self.subTest(**scope):
+                socket, reply = await self.connect(**scope)
+                self.assertEqual(reply, {"type": "websocket.close", "code": 4403})
+
+    async def test_closed_chat_is_refused(self):
+        await sync_to_async(ServiceRequest.objects.filter(id=self.request.id).update)(status="completed")
+        _, reply = await self.connect()
+        self.assertEqual(reply["code"], 4403)
+
+    async def test_messages_are_saved_in_one_batch_and_broadcast(self):
+        socket, reply = await self.connect()
+        self.assertEqual(reply["type"], "websocket.accept")
+        with mock.patch("services.chat_socket._save_batch", wraps=chat_socket._save_batch) as save_batch:
+            await self.send(socket, {"type": "message", "message": "Where are you?"})
+            await self.send(socket, {"type": "message", "message": "Still waiting"})
+            events = [await self.receive(socket), await self.receive(socket)]
+        await self.disconnect(socket)
+
+        self.assertEqual(save_batch.call_count, 1)
+        self.assertEqual([event["message"] for event in events], ["Where are you?", "Still waiting"])
+        saved = await sync_to_async(list)(ChatMessage.objects.order_by("id").values_list("id", "receiver_id"))
+        self.assertEqual(saved, [(events[0]["id"], self.mechanic.id), (events[1]["id"], self.mechanic.id)])
+
+    async def test_message_for_a_chat_closed_meanwhile_comes_back_as_an_error(self):
+        socket, _ = await self.connect()
+        await sync_to_async(ServiceRequest.objects.filter(id=self.request.id).update)(status="completed")
+        await self.send(socket, {"type": "message", "message": "Thanks!"})
+        event = await self.receive(socket)
+        await self.disconnect(socket)
+        self.assertEqual((event["type"], event["message"]), ("error", "Thanks!"))
+        self.assertFalse(await sync_to_async(ChatMessage.objects.exists)())
+
+    async def test_failed_batch_comes_back_as_an_error(self):
+        socket, _ = await self.connect()
+        with mock.patch("services.chat_socket._save_batch", side_effect=RuntimeError("database is locked")):
+            with self.assertLogs("services.chat_socket", "ERROR"):
+                await self.send(socket, {"type": "message", "message": "Hello"})
+                event = await self.receive(socket)
+        await self.disconnect(socket)
+        self.assertEqual((event["type"], event["message"]), ("error", "Hello"))
+
+    async def test_read_event_marks_messages_read_and_is_published(self):
+        message = await sync_to_async(ChatMessage.objects.create)(
+            service_request=self.request, sender=self.mechanic, receiver=self.customer, message="On my way"
+        )
+        socket, _ = await self.connect()
+        await self.send(socket, {"type": "read", "up_to": encode_cursor(message)})
+        event = await self.receive(socket)
+        await self.disconnect(socket)
+        self.assertEqual(event, {"type": "read", "reader_id": self.customer.id})
+        await sync_to_async(message.refresh_from_db)()
+        self.assertTrue(message.is_read)
@@ -0,0 +1,97 @@
+# services/unread.py
+"""
+🔴 Per-user unread counters for the navbar badges.
+
+Counts live in the cache under one key per (user, kind) so rendering a page
+costs no COUNT(*) once the cache is warm. A missing key falls back to the
+database and is cached again. Writers only increment keys that already
+exist (see ``services.signals``) and the mark-as-read helpers below reset
+or drop them. Keys expire after ``UNREAD_COUNTER_TIMEOUT`` seconds, which
+bounds any drift from races or from writes that bypass these hooks.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ChatMessage, Notification
+
+NOTIFICATIONS = "notifications"
+CHATS = "chats"
+
+
+def _key(kind, user_id):
+    return f"unread:{kind}:{user_id}"
+
+
+def _timeout():
+    return getattr(settings, "UNREAD_COUNTER_TIMEOUT", 300)
+
+
+def _count_from_db(kind, user_id):
+    if kind == NOTIFICATIONS:
+        return Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+    return ChatMessage.objects.filter(receiver_id=user_id, is_read=False).count()
+
+
+def get_counts(user_id):
+    """``{"notifications": n, "chats": n}`` for one user; one cache round trip when warm."""
+    keys = {kind: _key(kind, user_id) for kind in (NOTIFICATIONS, CHATS)}
+    cached = cache.get_many(keys.values())
+    counts = {}
+    missing = {}
+    for kind, key in keys.items():
+        if key in cached:
+            counts[kind] = cached[key]
+        else:
+            counts[kind] = missing[key] = _count_from_db(kind, user_id)
+    if missing:
+        cache.set_many(missing, _timeout())
+    return counts
+
+
+def add(kind, user_ids):
+    """Count one new unread item for every id in ``user_ids`` (repeats allowed)."""
+    for user_id in user_ids:
+        try:
+            cache.incr(_key(kind, user_id))
+        except ValueError:
+            pass  # not cached: the next read recounts from the database
+
+
+def reset(kind, user_id):
+    cache.set(_key(kind, user_id), 0, _timeout())
+
+
+def forget(kind, user_id):
+    cache.delete(_key(kind, user_id))
+
+
+# ✅ Bulk mark-as-read: one UPDATE over the partial unread indexes.
+# ``up_to`` is the newest id the user has seen; rows that arrived after it stay unread.
+def mark_notifications_read(user_id, up_to=None, ids=None):
+    """
+    Mark the user's unread notifications as read: exactly ``ids`` when given,
+    else everything with id <= ``up_to`` (all of them when both are None).
+    Returns how many changed.
+    """
+    rows = Notification.objects.filter(recipient_id=user_id, is_read=False)
+    if ids is not None:
+        rows = rows.filter(id__in=ids)
+    elif up_to is not None:
+        rows = rows.filter(id__lte=up_to)
+    updated = rows.update(is_read=True)
+    if ids is None and up_to is None:
+        reset(NOTIFICATIONS, user_id)
+    elif updated:
+        forget(NOTIFICATIONS, user_id)
+    return updated
+
+
+def mark_chat_read(user_id, service_request_id, up_to=None):
+    """Mark what the user received in one conversation (with id <= ``up_to``) as read; returns how many changed."""
+    rows = ChatMessage.objects.filter(receiver_id=user_id, service_request_id=service_request_id, is_read=False)
+    if up_to is not None:
+        rows = rows.filter(id__lte=up_to)
+    updated = rows.update(is_read=True)
+    if updated:
+        forget(CHATS, user_id)  # other conversations may still be unread: recount
+    return updated
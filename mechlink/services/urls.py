@@ -14,6 +14,8 @@ urlpatterns = [
     # 💬 Chat system
     path("chat/<int:request_id>/", views.chat_view, name="chat_view"),
     path("chats/", views.chat_list, name="chat_list"),
+    path("chat/<int:request_id>/history/", views.chat_history, name="chat_history"),
+    path("chat/<int:request_id>/read/", views.mark_chat_read_view, name="mark_chat_read"),
 
     # ⭐ Rating
     path("rate/<int:request_id>/", views.rate_mechanic, name="rate_mechanic"),
@@ -22,4 +24,12 @@ urlpatterns = [
     path("mechanic-requests/", views.mechanic_requests, name="mechanic_requests"),
     path("re-raise/<int:request_id>/", views.re_raise_request, name="re_raise_request"),
 
+    # 🔔 Notifications
+    path("notifications/", views.notifications_view, name="notifications"),
+    path("notifications/read/", views.mark_notifications_read_view, name="mark_notifications_read"),
+    path("notifications/unread/", views.unread_counts_view, name="unread_counts"),
+
+    # 📡 Live notifications (SSE)
+    path("notifications/stream/", views.notification_stream, name="notification_stream"),
+
 ]
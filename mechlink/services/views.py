@@ -1,13 +1,48 @@
 # services/views.py
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q,Avg
-from .models import ServiceRequest, Notification, ChatMessage, MechanicRating
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from users.models import CustomUser
 from mechanics.models import MechanicProfile  # ✅ if you need mechanic info
-from django.urls import reverse
-from math import radians, sin, cos, sqrt, atan2
+from mechanics.location_index import get_index as get_location_index
+from .models import ServiceRequest, Notification, ChatMessage, MechanicRating, DispatchOffer
+from . import unread
+from .archive import CLOSED_STATUSES, conversation_page
+from .chat_history import (
+    MAX_PAGE_SIZE as CHAT_MAX_PAGE_SIZE, PAGE_SIZE as CHAT_PAGE_SIZE,
+    InvalidCursor, decode_cursor, encode_cursor, message_payload,
+)
+from .chat_socket import chat_channel
+from .dispatch import BROADCAST_N, broadcast_request, claim_request, decline_offer
+from .notifications import enqueue, status_key
+from .realtime import get_hub, notification_payload, user_channel
+from .unread import mark_chat_read
+
+
+# 📏 Mechanic search limits
+NEARBY_DISTANCE_KM = 10          # "radius" mode: everyone within this distance
+NEAREST_K = 10                   # "nearest" mode: this many mechanics…
+NEAREST_MAX_DISTANCE_KM = 50     # …searching no further than this
+
+# 📡 Live notification stream
+SSE_HEARTBEAT_SECONDS = 15       # keeps proxies from closing idle streams
+SSE_CATCH_UP_LIMIT = 50          # missed notifications replayed on reconnect
+SSE_WSGI_RETRY_MS = 30000        # reconnect delay when the stream cannot be held open
+
+NOTIFICATION_PAGE_SIZE = 100     # newest notifications shown on the notification page
+CHAT_LIST_PAGE_SIZE = 20         # conversations per inbox page
+
 
 # 🧰 CUSTOMER: Raise a Service Request
 @login_required
@@ -18,6 +53,7 @@ def raise_request(request):
 
     mechanics = None
     issue = location = pincode = mechanic_type = ""
+    search_mode = "radius"
     latitude = longitude = None
     old_req = None
 
@@ -40,6 +76,7 @@ def raise_request(request):
         location = request.POST.get("location", "").strip()
         pincode = request.POST.get("pincode", "").strip()
         mechanic_type = request.POST.get("mechanic_type", "")
+        search_mode = request.POST.get("search_mode", "radius")
         latitude = request.POST.get("latitude")
         longitude = request.POST.get("longitude")
 
@@ -51,70 +88,86 @@ def raise_request(request):
                 "location": location,
                 "pincode": pincode,
                 "mechanic_type": mechanic_type,
+                "search_mode": search_mode,
                 "latitude": latitude,
                 "longitude": longitude,
                 "mechanics": mechanics,
             })
 
+        # 📣 Broadcast → offer the request to the nearest mechanics at once;
+        # the first one to accept claims it (see services.dispatch)
+        if request.POST.get("dispatch") == "broadcast":
+            max_km = NEAREST_MAX_DISTANCE_KM if search_mode == "nearest" else NEARBY_DISTANCE_KM
+            nearby = get_location_index().nearest(float(latitude), float(longitude), mechanic_type, BROADCAST_N, max_km)
+            if not nearby:
+                messages.warning(request, f"⚠️ No mechanics found within {max_km} km of your location.")
+                return redirect("raise_request")
+
+            with transaction.atomic():
+                new_request = ServiceRequest.objects.create(
+                    user=request.user,
+                    issue_description=issue,
+                    location=location,
+                    mechanic_type=mechanic_type,
+                    latitude=latitude,
+                    longitude=longitude,
+                    status="pending",
+                )
+                offered = broadcast_request(new_request, nearby, sender=request.user)
+
+            messages.success(request, f"📣 Request sent to {offered} nearby mechanics — the first to accept will be assigned.")
+            return redirect("my_requests")
+
         # ✅ If a mechanic is chosen → create the Service Request
         mechanic_id = request.POST.get("mechanic_id")
         if mechanic_id:
             mechanic = get_object_or_404(CustomUser, id=mechanic_id)
-            new_request = ServiceRequest.objects.create(
-                user=request.user,
-                mechanic=mechanic,
-                issue_description=issue,
-                location=location,
-                mechanic_type=mechanic_type,
-                latitude=latitude,
-                longitude=longitude,
-                status="pending",
-            )
-
-            # Notify the mechanic
-            Notification.objects.create(
-                recipient=mechanic,
-                sender=request.user,
-                message=f"🧰 New {mechanic_type.replace('_', ' ')} service request from {request.user.username}.",
-            )
+            with transaction.atomic():
+                new_request = ServiceRequest.objects.create(
+                    user=request.user,
+                    mechanic=mechanic,
+                    issue_description=issue,
+                    location=location,
+                    mechanic_type=mechanic_type,
+                    latitude=latitude,
+                    longitude=longitude,
+                    status="pending",
+                )
+
+                # Notify the mechanic
+                enqueue(
+                    mechanic,
+                    f"🧰 New {mechanic_type.replace('_', ' ')} service request from {request.user.username}.",
+                    sender=request.user,
+                )
 
             messages.success(request, f"✅ Request sent to {mechanic.username} successfully!")
             return redirect("my_requests")
 
         # 🔍 Otherwise → find nearby mechanics based on coordinates
-        all_mechanics = CustomUser.objects.filter(
-          role="mechanic",
-          mechanic_profile__latitude__isnull=False,
-          mechanic_profile__longitude__isnull=False,
-          mechanic_profile__mechanic_types__icontains=mechanic_type
-         ).select_related("mechanic_profile")
-
-
-        lat1 = radians(float(latitude))
-        lon1 = radians(float(longitude))
-        MAX_DISTANCE_KM = 10
-
-        nearby_mechanics = []
-        for mech in all_mechanics:
-            profile = mech.mechanic_profile
-            if profile.latitude and profile.longitude:
-                lat2 = radians(profile.latitude)
-                lon2 = radians(profile.longitude)
-                dlon = lon2 - lon1
-                dlat = lat2 - lat1
-                a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-                c = 2 * atan2(sqrt(a), sqrt(1 - a))
-                distance = 6371 * c
-                if distance <= MAX_DISTANCE_KM:
-                    mech.distance = round(distance, 2)
-                    nearby_mechanics.append(mech)
-
-        mechanics = sorted(nearby_mechanics, key=lambda m: m.distance)
-
-        # ⭐ Attach ratings + reviews for each mechanic
+        lat, lon = float(latitude), float(longitude)
+
+        # 📍 Candidate scan runs on the in-memory location index (no DB hit);
+        # only the matched mechanics are loaded for display.
+        if search_mode == "nearest":
+            # Widen ring by ring until NEAREST_K mechanics are found
+            MAX_DISTANCE_KM = NEAREST_MAX_DISTANCE_KM
+            nearby = get_location_index().nearest(lat, lon, mechanic_type, NEAREST_K, MAX_DISTANCE_KM)
+        else:
+            MAX_DISTANCE_KM = NEARBY_DISTANCE_KM
+            nearby = get_location_index().search(lat, lon, mechanic_type, MAX_DISTANCE_KM)
+        found = CustomUser.objects.select_related("mechanic_profile").in_bulk([user_id for user_id, _ in nearby])
+        mechanics = []
+        for user_id, distance in nearby:
+            mech = found.get(user_id)
+            if mech is not None:
+                mech.distance = round(distance, 2)
+                mechanics.append(mech)
+
+        # ⭐ Attach ratings + reviews for each mechanic (stored on the profile)
         for m in mechanics:
-            m.avg_rating = MechanicRating.objects.filter(mechanic=m).aggregate(Avg("rating"))["rating__avg"] or 0
-            m.review_count = MechanicRating.objects.filter(mechanic=m).count()
+            m.avg_rating = m.mechanic_profile.average_rating
+            m.review_count = m.mechanic_profile.rating_count
 
         if not mechanics:
             messages.warning(request, f"⚠️ No mechanics found within {MAX_DISTANCE_KM} km of your location.")
@@ -125,6 +178,11 @@ def raise_request(request):
         "location": location,
         "pincode": pincode,
         "mechanic_type": mechanic_type,
+        "search_mode": search_mode,
+        "nearest_k": NEAREST_K,
+        "broadcast_n": BROADCAST_N,
+        "nearby_distance_km": NEARBY_DISTANCE_KM,
+        "nearest_max_distance_km": NEAREST_MAX_DISTANCE_KM,
         "latitude": latitude,
         "longitude": longitude,
         "mechanics": mechanics,
@@ -134,31 +192,52 @@ def raise_request(request):
 # 🧾 CUSTOMER: View Their Requests
 @login_required
 def my_requests(request):
-    # 🔥 Expire old pending requests first
-    expire_old_requests()
-
-    requests = ServiceRequest.objects.filter(user=request.user).order_by("-created_at")
+    requests = ServiceRequest.objects.filter(user=request.user).with_effective_status().order_by("-created_at")
     return render(request, "services/my_requests.html", {"requests": requests})
 
 
 # ⚙️ MECHANIC: Accept / Reject / Complete Requests
+def _request_for_mechanic(request, request_id):
+    """
+    The request as the mechanic sees it, or None after a warning when it was
+    offered to them but has gone since (claimed by someone else, assigned or
+    expired). Requests they never had are a 404.
+    """
+    req = ServiceRequest.objects.for_mechanic(request.user).filter(id=request_id).first()
+    if req is None:
+        if not DispatchOffer.objects.filter(service_request_id=request_id, mechanic=request.user).exists():
+            raise Http404("No such service request.")
+        messages.warning(request, "⚠️ Another mechanic has already taken this request, or it has expired.")
+    return req
+
+
 @login_required
 def accept_request(request, request_id):
-    req = get_object_or_404(ServiceRequest, id=request_id, mechanic=request.user)
-
-    if req.status != "pending":
-        messages.warning(request, "⚠️ This request has already been processed.")
+    req = _request_for_mechanic(request, request_id)
+    if req is None:
         return redirect("mechanic_dashboard")
 
-    req.status = "accepted"
-    req.save()
-
-    # ✅ Notify the customer
-    Notification.objects.create(
-        recipient=req.user,
-        sender=request.user,
-        message=f"✅ Your service request #{req.id} has been accepted by {request.user.username}.",
-    )
+    with transaction.atomic():
+        if req.mechanic_id is None:
+            # 📣 Broadcast request → first accept wins
+            if not claim_request(req, request.user):
+                messages.warning(request, "⚠️ Another mechanic has already taken this request.")
+                return redirect("mechanic_dashboard")
+        else:
+            if req.effective_status != "pending":
+                messages.warning(request, "⚠️ This request has already been processed.")
+                return redirect("mechanic_dashboard")
+
+            req.status = "accepted"
+            req.save()
+
+        # ✅ Notify the customer
+        enqueue(
+            req.user,
+            f"✅ Your service request #{req.id} has been accepted by {request.user.username}.",
+            sender=request.user,
+            key=status_key(req.id),
+        )
 
     messages.success(request, f"Service request #{req.id} accepted successfully.")
     return redirect("mechanic_dashboard")
@@ -166,21 +245,31 @@ def accept_request(request, request_id):
 
 @login_required
 def reject_request(request, request_id):
-    req = get_object_or_404(ServiceRequest, id=request_id, mechanic=request.user)
+    req = _request_for_mechanic(request, request_id)
+    if req is None:
+        return redirect("mechanic_dashboard")
+
+    if req.mechanic_id is None:
+        # 📣 Broadcast request → only this mechanic's offer is declined
+        decline_offer(req, request.user)
+        messages.info(request, f"Request #{req.id} declined.")
+        return redirect("mechanic_dashboard")
 
-    if req.status != "pending":
+    if req.effective_status != "pending":
         messages.warning(request, "⚠️ This request has already been processed.")
         return redirect("mechanic_dashboard")
 
-    req.status = "rejected"
-    req.save()
+    with transaction.atomic():
+        req.status = "rejected"
+        req.save()
 
-    # ✅ Notify customer
-    Notification.objects.create(
-        recipient=req.user,
-        sender=request.user,
-        message=f"❌ Your service request #{req.id} has been rejected by {request.user.username}.",
-    )
+        # ✅ Notify customer
+        enqueue(
+            req.user,
+            f"❌ Your service request #{req.id} has been rejected by {request.user.username}.",
+            sender=request.user,
+            key=status_key(req.id),
+        )
 
     messages.warning(request, f"Request #{req.id} rejected.")
     return redirect("mechanic_dashboard")
@@ -194,15 +283,17 @@ def complete_service(request, request_id):
         messages.warning(request, "⚠️ Only accepted services can be marked as completed.")
         return redirect("mechanic_dashboard")
 
-    req.status = "completed"
-    req.save()
+    with transaction.atomic():
+        req.status = "completed"
+        req.save()
 
-    # ✅ Notify the customer
-    Notification.objects.create(
-        recipient=req.user,
-        sender=request.user,
-        message=f"🎉 Your service request #{req.id} has been completed by {request.user.username}.",
-    )
+        # ✅ Notify the customer
+        enqueue(
+            req.user,
+            f"🎉 Your service request #{req.id} has been completed by {request.user.username}.",
+            sender=request.user,
+            key=status_key(req.id),
+        )
 
     messages.success(request, f"✅ Service request #{req.id} marked as completed.")
     return redirect("mechanic_dashboard")
@@ -218,34 +309,80 @@ def chat_view(request, request_id):
         messages.error(request, "You are not authorized to view this chat.")
         return redirect("home")
 
-    # ✅ Chat is allowed only for accepted/in-progress
-    if service_request.status not in ["accepted", "in_progress"]:
+    # ✅ Chat is open for accepted/in-progress, read-only once the request is closed
+    active = service_request.status in ["accepted", "in_progress"]
+    if not active and service_request.status not in CLOSED_STATUSES:
         messages.warning(request, "Chat is only available for active service requests.")
         return redirect("user_dashboard" if request.user.role == "customer" else "mechanic_dashboard")
 
-    chat_messages = ChatMessage.objects.filter(service_request=service_request).order_by("timestamp")
     receiver = service_request.mechanic if request.user == service_request.user else service_request.user
 
-    if request.method == "POST":
+    if request.method == "POST" and active:
         msg_text = request.POST.get("message", "").strip()
         if msg_text and receiver:
-            ChatMessage.objects.create(
+            msg = ChatMessage.objects.create(
                 service_request=service_request,
                 sender=request.user,
                 receiver=receiver,
                 message=msg_text,
             )
+            # 📡 Same event the socket writer sends, so open chats show it live
+            transaction.on_commit(lambda: get_hub().publish(
+                chat_channel(service_request.id), {"type": "message", **message_payload(msg)}
+            ))
             return redirect("chat_view", request_id=request_id)
 
+    # 👀 Opening the chat reads everything sent to this user
+    mark_chat_read(request.user.id, service_request.id)
+
+    # 📜 Only the latest page; older messages load on scroll-back (chat_history).
+    # Archived chats read from their transcript the same way.
+    chat_messages, has_older = conversation_page(service_request)
+
     context = {
         "service_request": service_request,
         "chat_messages": chat_messages,
+        "has_older": has_older,
+        "before_cursor": encode_cursor(chat_messages[0]) if chat_messages else "",
+        "after_cursor": encode_cursor(chat_messages[-1]) if chat_messages else "",
         "receiver": receiver,
-        "chat_disabled": service_request.status == "completed",
+        "chat_disabled": not active,
     }
     return render(request, "services/chat.html", context)
 
 
+@login_required
+def chat_history(request, request_id):
+    """
+    JSON page of a conversation, oldest first. ``?before=<cursor>`` scrolls
+    back, ``?after=<cursor>`` fetches only what is new, neither gives the
+    latest page; ``?limit=`` caps the page size.
+    """
+    service_request = get_object_or_404(ServiceRequest, id=request_id)
+    if request.user.id not in (service_request.user_id, service_request.mechanic_id):
+        return JsonResponse({"error": "You are not authorized to view this chat."}, status=403)
+    if service_request.status not in ["accepted", "in_progress", *CLOSED_STATUSES]:
+        return JsonResponse({"error": "Chat is only available for active service requests."}, status=403)
+
+    try:
+        limit = min(max(int(request.GET.get("limit", CHAT_PAGE_SIZE)), 1), CHAT_MAX_PAGE_SIZE)
+        page, has_more = conversation_page(
+            service_request,
+            before=request.GET.get("before"),
+            after=request.GET.get("after"),
+            limit=limit,
+        )
+    except (ValueError, InvalidCursor):
+        return JsonResponse({"error": "Invalid cursor or limit."}, status=400)
+
+    return JsonResponse({
+        "messages": [message_payload(message) for message in page],
+        "has_more": has_more,
+        "before": encode_cursor(page[0]) if page else request.GET.get("before"),
+        "after": encode_cursor(page[-1]) if page else request.GET.get("after"),
+    })
+
+
 # 💬 OPTIONAL CHAT LIST
 @login_required
 def chat_list(request):
@@ -254,7 +391,41 @@ def chat_list(request):
     else:
         service_requests = ServiceRequest.objects.filter(user=request.user)
 
-    return render(request, "services/chat_list.html", {"service_requests": service_requests})
+    # 📥 One query per page: last message, unread count and both users come
+    # with the rows (see ServiceRequestQuerySet.with_chat_summary)
+    inbox = (
+        service_requests.with_effective_status()
+        .with_chat_summary(request.user)
+        .order_by("-last_activity", "-id")
+    )
+    page = Paginator(inbox, CHAT_LIST_PAGE_SIZE).get_page(request.GET.get("page"))
+    for req in page:
+        req.counterpart = req.user if req.mechanic_id == request.user.id else req.mechanic
+
+    return render(request, "services/chat_list.html", {
+        "service_requests": page,
+        "page_obj": page,
+    })
+
+
+@login_required
+@require_POST
+def mark_chat_read_view(request, request_id):
+    """Mark the conversation read up to the ``up_to`` cursor (everything when omitted)."""
+    service_request = get_object_or_404(ServiceRequest, id=request_id)
+    if request.user.id not in (service_request.user_id, service_request.mechanic_id):
+        return JsonResponse({"error": "You are not authorized to view this chat."}, status=403)
+
+    up_to = request.POST.get("up_to")
+    try:
+        up_to_id = decode_cursor(up_to)[1] if up_to else None
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor."}, status=400)
+
+    updated = mark_chat_read(request.user.id, service_request.id, up_to=up_to_id)
+    if updated:
+        get_hub().publish(chat_channel(service_request.id), {"type": "read", "reader_id": request.user.id})
+    return JsonResponse({"updated": updated, "unread": unread.get_counts(request.user.id)[unread.CHATS]})
 
 
 # ⭐ CUSTOMER: Rate Mechanic
@@ -270,26 +441,36 @@ def rate_mechanic(request, request_id):
         rating_value = int(request.POST.get("rating", 0))
         feedback_text = request.POST.get("feedback", "").strip()
 
-        MechanicRating.objects.update_or_create(
-            service_request=service_request,
-            defaults={
-                "mechanic": service_request.mechanic,
-                "customer": request.user,
-                "rating": rating_value,
-                "feedback": feedback_text,
-            },
-        )
+        with transaction.atomic():
+            previous = (
+                MechanicRating.objects.select_for_update()
+                .filter(service_request=service_request)
+                .values_list("rating", flat=True)
+                .first()
+            )
+            MechanicRating.objects.update_or_create(
+                service_request=service_request,
+                defaults={
+                    "mechanic": service_request.mechanic,
+                    "customer": request.user,
+                    "rating": rating_value,
+                    "feedback": feedback_text,
+                },
+            )
+            # ⭐ Keep the mechanic's running rating totals in step
+            MechanicProfile.record_rating(service_request.mechanic, rating_value, previous=previous)
 
-        service_request.rating = rating_value
-        service_request.feedback = feedback_text
-        service_request.save()
+            service_request.rating = rating_value
+            service_request.feedback = feedback_text
+            service_request.save()
 
-        # ✅ Notify the mechanic
-        Notification.objects.create(
-            recipient=service_request.mechanic,
-            sender=request.user,
-            message=f"⭐ You received a new {rating_value}-star rating from {request.user.username}.",
-        )
+            # ✅ Notify the mechanic (a quick re-rating replaces the queued message)
+            enqueue(
+                service_request.mechanic,
+                f"⭐ You received a new {rating_value}-star rating from {request.user.username}.",
+                sender=request.user,
+                key=f"rating-{service_request.id}",
+            )
 
         messages.success(request, "✅ Your feedback has been submitted successfully!")
         return redirect("my_requests")
@@ -309,18 +490,15 @@ def mechanic_requests(request):
     if not request.user.is_mechanic():
         return redirect("home")
 
-    # 🔥 Expire old pending requests first
-    expire_old_requests()
-
     # Optional: filter by status from dropdown
     status_filter = request.GET.get("status", "")
-    service_requests = ServiceRequest.objects.filter(mechanic=request.user)
+    service_requests = ServiceRequest.objects.for_mechanic(request.user).with_effective_status()
 
     if status_filter:
-        service_requests = service_requests.filter(status=status_filter)
+        service_requests = service_requests.with_effective(status_filter)
 
     # ✅ Dashboard counts for the summary cards
-    pending_count = ServiceRequest.objects.filter(mechanic=request.user, status="pending").count()
+    pending_count = ServiceRequest.objects.for_mechanic(request.user).live_pending().count()
     accepted_count = ServiceRequest.objects.filter(mechanic=request.user, status="accepted").count()
     completed_count = ServiceRequest.objects.filter(mechanic=request.user, status="completed").count()
     rejected_count = ServiceRequest.objects.filter(mechanic=request.user, status="rejected").count()
@@ -340,28 +518,6 @@ def mechanic_requests(request):
     })
 
 
-from django.utils import timezone
-from datetime import timedelta
-from .models import ServiceRequest, Notification
-
-def expire_old_requests():
-    """
-    Automatically expire old pending requests (older than 5 minutes)
-    when someone opens a page like 'my_requests' or 'mechanic_requests'.
-    """
-    expiry_time = timezone.now() - timedelta(minutes=5)
-    old_requests = ServiceRequest.objects.filter(status='pending', created_at__lt=expiry_time)
-
-    for req in old_requests:
-        req.status = 'expired'
-        req.save()
-
-        # Notify the customer
-        Notification.objects.create(
-            recipient=req.user,
-            message=f"⚠️ Your service request #{req.id} expired (no mechanic accepted in time)."
-        )
-
 @login_required
 def re_raise_request(request, request_id):
     """
@@ -371,7 +527,7 @@ def re_raise_request(request, request_id):
     old_req = get_object_or_404(ServiceRequest, id=request_id, user=request.user)
 
     # Only allow re-raising expired requests
-    if old_req.status != "expired":
+    if old_req.effective_status != "expired":
         messages.warning(request, "Only expired requests can be re-raised.")
         return redirect("my_requests")
 
@@ -395,3 +551,92 @@ def re_raise_request(request, request_id):
     return redirect(f"{reverse('raise_request')}?re_raise={old_req.id}")
 
 
+# 📡 LIVE NOTIFICATIONS (Server-Sent Events)
+def _sse_event(payload):
+    return f"id: {payload['id']}\nevent: notification\ndata: {json.dumps(payload)}\n\n"
+
+
+@login_required
+async def notification_stream(request):
+    """
+    Push the user's new notifications as they are delivered (see
+    services.realtime). Needs the ASGI server: each open stream is one
+    suspended coroutine waiting on the hub, with a comment line every
+    SSE_HEARTBEAT_SECONDS. EventSource reconnects by itself and sends
+    Last-Event-ID, so anything delivered in between is replayed first.
+    Under WSGI it only replays what was missed and closes (pages served
+    there poll ``unread_counts_view`` instead, see base.html).
+    """
+    user = await request.auser()
+    last_id = request.headers.get("Last-Event-ID", "")
+
+    async def missed_events():
+        if not last_id.isdigit():
+            return []
+        missed = await sync_to_async(list)(
+            Notification.objects.filter(recipient=user, id__gt=int(last_id)).order_by("id")[:SSE_CATCH_UP_LIMIT]
+        )
+        return [_sse_event(notification_payload(notification)) for notification in missed]
+
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the body is read to the end before anything is sent, so an
+        # endless stream would pin a worker thread: answer once and end
+        response = HttpResponse(
+            f"retry: {SSE_WSGI_RETRY_MS}\n\n" + "".join(await missed_events()), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    async def events():
+        async with get_hub().subscribe(user_channel(user.id)) as queue:
+            yield "retry: 5000\n\n"
+            for event in await missed_events():
+                yield event
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield _sse_event(payload)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
+
+
+@login_required
+def unread_counts_view(request):
+    """Navbar badge counts for pages that cannot hold the notification stream open."""
+    return JsonResponse(unread.get_counts(request.user.id))
+
+
+# 🔔 NOTIFICATIONS
+@login_required
+def notifications_view(request):
+    notifications = Notification.objects.filter(recipient=request.user).order_by("-created_at")[:NOTIFICATION_PAGE_SIZE]
+    return render(request, "services/notifications.html", {
+        "notifications": notifications,
+        "unread_count": unread.get_counts(request.user.id)[unread.NOTIFICATIONS],
+    })
+
+
+@login_required
+@require_POST
+def mark_notifications_read_view(request):
+    """
+    Mark notifications read: the ones named by ``id`` (repeatable), else
+    everything up to the ``up_to`` id, else everything.
+    """
+    ids = request.POST.getlist("id")
+    up_to = request.POST.get("up_to")
+    if not all(value.isdigit() for value in ids) or (up_to and not up_to.isdigit()):
+        return JsonResponse({"error": "Invalid id or up_to."}, status=400)
+
+    updated = unread.mark_notifications_read(
+        request.user.id,
+        up_to=int(up_to) if up_to else None,
+        ids=[int(value) for value in ids] or None,
+    )
+    return JsonResponse({"updated": updated, "unread": unread.get_counts(request.user.id)[unread.NOTIFICATIONS]})
@@ -0,0 +1,175 @@
+# users/admin_tables.py
+"""
+🗂️ Tables behind the admin dashboard tabs.
+
+Each tab fetches its rows from ``admin_table`` one page at a time. Pages are
+keyset-paginated on ``(sort column, id)``, so page 500 costs the same as
+page 1, and the sortable columns are an allow-list per table. Cursors are
+opaque url-safe strings holding the last row's sort value and id.
+
+``render_rows`` yields the rendered ``<tr>`` rows in chunks straight off a
+server-side cursor (``QuerySet.iterator``); the view streams them when a
+page is larger than ``STREAM_THRESHOLD`` rows. The last thing in every
+response is a marker row carrying the next cursor (empty at the end).
+
+``platform_stats`` counts everything shown on the stat cards in a single
+``SELECT (SELECT COUNT ...), (SELECT COUNT ...), ...`` round trip. Request
+and order totals read the daily rollups (``services.rollups``) plus a count
+of the rows past their watermark, so they never scan the big tables.
+"""
+import base64
+import json
+from decimal import Decimal
+from dataclasses import dataclass
+from typing import Callable
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Case, F, Func, Q, When
+from django.template.loader import get_template
+from django.utils.html import escape
+
+from mechanics.models import Order, Product
+from services.models import OrderDailyStat, RequestDailyStat, ServiceRequest
+from services.rollups import NOT_REVENUE, not_rolled_up
+from .models import CustomUser
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 5000
+STREAM_THRESHOLD = 200   # pages above this many rows are streamed
+CHUNK_SIZE = 200         # rows fetched and rendered per step
+
+
+class InvalidTableQuery(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class AdminTable:
+    queryset: Callable
+    sort_fields: dict        # ?sort= value -> model field
+    default_sort: str
+    template: str
+
+
+TABLES = {
+    "users": AdminTable(
+        queryset=lambda: CustomUser.objects.all(),
+        sort_fields={"joined": "date_joined", "username": "username", "role": "role"},
+        default_sort="-joined",
+        template="users/admin_rows/users.html",
+    ),
+    "products": AdminTable(
+        queryset=lambda: Product.objects.select_related("mechanic__user"),
+        sort_fields={"created": "created_at", "name": "name", "price": "price", "stock": "stock"},
+        default_sort="-created",
+        template="users/admin_rows/products.html",
+    ),
+    "orders": AdminTable(
+        queryset=lambda: Order.objects.select_related("customer", "product"),
+        sort_fields={"ordered": "ordered_at", "total": "total_price", "status": "status"},
+        default_sort="-ordered",
+        template="users/admin_rows/orders.html",
+    ),
+    "requests": AdminTable(
+        queryset=lambda: ServiceRequest.objects.with_effective_status().select_related("user"),
+        sort_fields={"created": "created_at", "status": "status"},
+        default_sort="-created",
+        template="users/admin_rows/requests.html",
+    ),
+}
+
+
+# 🔖 Cursors
+def encode_cursor(value, row_id):
+    raw = json.dumps([str(value), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, field):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        return field.to_python(value), int(row_id)
+    except (ValueError, TypeError, ValidationError):
+        raise InvalidTableQuery(cursor)
+
+
+# 📄 Pages
+def page_queryset(table, sort=None, after=None):
+    """``(queryset, field name)`` for the page after cursor ``after``, in ``sort`` order."""
+    sort = sort or table.default_sort
+    descending = sort.startswith("-")
+    field_name = table.sort_fields.get(sort.lstrip("-"))
+    if field_name is None:
+        raise InvalidTableQuery(sort)
+
+    queryset = table.queryset()
+    if after:
+        value, row_id = decode_cursor(after, queryset.model._meta.get_field(field_name))
+        op = "lt" if descending else "gt"
+        queryset = queryset.filter(
+            Q(**{f"{field_name}__{op}": value}) | Q(**{field_name: value, f"id__{op}": row_id})
+        )
+    prefix = "-" if descending else ""
+    return queryset.order_by(f"{prefix}{field_name}", f"{prefix}id"), field_name
+
+
+def render_rows(table, queryset, field_name, limit, first_page):
+    """Rendered rows of one page, ``CHUNK_SIZE`` at a time, then the next-page marker."""
+    template = get_template(table.template)
+    chunk, seen, last = [], 0, None
+    next_cursor = ""
+    for row in queryset[:limit + 1].iterator(chunk_size=CHUNK_SIZE):
+        if seen == limit:
+            next_cursor = encode_cursor(getattr(last, field_name), last.id)
+            break
+        chunk.append(row)
+        seen, last = seen + 1, row
+        if len(chunk) == CHUNK_SIZE:
+            yield template.render({"rows": chunk})
+            chunk = []
+    if chunk or (first_page and not seen):
+        yield template.render({"rows": chunk, "empty": not seen})
+    yield f'<tr class="page-end" hidden data-next="{escape(next_cursor)}"></tr>'
+
+
+# 📊 Stat cards
+def _count():
+    return Func(F("id"), function="COUNT")
+
+
+def _sum(field, exclude_statuses=()):
+    # A plain Func, not Sum(): an aggregate in .values() would add a GROUP BY
+    if exclude_statuses:
+        field = Case(When(~Q(status__in=exclude_statuses), then=F(field)))
+    return Func(field, function="SUM")
+
+
+def platform_stats():
+    """Stat card numbers; request / order totals are the daily rollups plus the rows not rolled up yet."""
+    summed = {
+        "total_users": [(CustomUser.objects.all(), _count())],
+        "total_mechanics": [(CustomUser.objects.filter(role="mechanic"), _count())],
+        "total_customers": [(CustomUser.objects.filter(role="customer"), _count())],
+        "total_products": [(Product.objects.all(), _count())],
+        "total_orders": [(OrderDailyStat.objects.all(), _sum("orders")), (not_rolled_up("orders"), _count())],
+        "total_requests": [(RequestDailyStat.objects.all(), _sum("requests")), (not_rolled_up("requests"), _count())],
+        "total_revenue": [
+            (OrderDailyStat.objects.all(), _sum("revenue", NOT_REVENUE)),
+            (not_rolled_up("orders"), _sum("total_price", NOT_REVENUE)),
+        ],
+    }
+    selects, params = [], []
+    for name, parts in summed.items():
+        terms = []
+        for queryset, expression in parts:
+            sql, sql_params = queryset.order_by().values(n=expression).query.sql_with_params()
+            terms.append(f"COALESCE(({sql}), 0)")
+            params.extend(sql_params)
+        selects.append(f"{' + '.join(terms)} AS {connection.ops.quote_name(name)}")
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT " + ", ".join(selects), params)
+        stats = dict(zip(summed, cursor.fetchone()))
+    stats["total_revenue"] = Decimal(str(stats["total_revenue"])).quantize(Decimal("0.01"))
+    return stats
@@ -1,3 +1,163 @@
+import re
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from mechanics.models import CartItem, MechanicProfile, Order, Product
+from mechlink.querycheck import QueryBudgetMixin, query_shape, record_queries
+from services.models import ChatMessage, MechanicRating, ServiceRequest
+from .admin_tables import InvalidTableQuery, decode_cursor, encode_cursor
+from .models import CustomUser, Feedback
+
+# Queries each page may run, whatever the number of rows it lists. Every page
+# pays for the session, the user and (cold cache) the two unread badges.
+QUERY_BUDGETS = {
+    "user_dashboard": 7,     # + recent orders, requests, notifications
+    "user_orders": 5,        # + orders with their products
+    "my_orders": 5,          # + orders
+    "mechanic_detail": 8,    # + mechanic with profile, ratings, feedback
+    "cart": 5,               # + cart items with product, mechanic profile and user
+    "shop": 5,               # + products
+    "chat_list": 6,          # + page count, inbox page
+}
+
+
+# 🔎 Query shapes group statements that differ only in their parameters
+class QueryShapeTests(TestCase):
+    def test_in_lists_of_any_length_share_a_shape(self):
+        self.assertEqual(
+            query_shape('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s)'),
+            query_shape('SELECT * FROM "t" WHERE "id" IN (%s, %s)'),
+        )
+
+    def test_repeated_lookups_are_reported_with_their_origin(self):
+        user = CustomUser.objects.create_user("someone", password="x")
+        with record_queries() as log:
+            for _ in range(3):
+                CustomUser.objects.get(id=user.id)
+        (records,) = log.repeated().values()
+        self.assertEqual(len(records), 3)
+        self.assertIn("users/tests.py", records[0].code_line)
+
+
+# ✅ Every listing stays within its budget, however many rows it shows
+class ViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    ROWS = 4  # above QUERY_CHECK_REPEATS, so a per-row query shows up as repeated
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = CustomUser.objects.create_user("customer", password="x", role="customer")
+        cls.mechanic = CustomUser.objects.create_user("mechanic", password="x", role="mechanic")
+        profile = MechanicProfile.objects.create(user=cls.mechanic, shop_name="Quick Fix")
+        for i in range(cls.ROWS):
+            reviewer = CustomUser.objects.create_user(f"reviewer{i}", password="x", role="customer")
+            product = Product.objects.create(mechanic=profile, name=f"Part {i}", price=100 + i, stock=5)
+            Order.objects.create(customer=cls.customer, product=product, total_price=product.price, status="Paid")
+            CartItem.objects.create(user=cls.customer, product=product, quantity=2)
+            request = ServiceRequest.objects.create(
+                user=cls.customer, mechanic=cls.mechanic, issue_description="Flat tyre", status="accepted"
+            )
+            ChatMessage.objects.create(service_request=request, sender=cls.mechanic, receiver=cls.customer, message="On my way")
+            Feedback.objects.create(mechanic=cls.mechanic, customer=reviewer, rating=5, comment="Great")
+            MechanicRating.objects.create(mechanic=cls.mechanic, customer=reviewer, service_request=request, rating=4)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.customer)
+
+    def assertPageWithinBudget(self, url_name, **kwargs):
+        response = self.assertQueryBudget(url_name, QUERY_BUDGETS[url_name], **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_user_dashboard(self):
+        self.assertPageWithinBudget("user_dashboard")
+
+    def test_user_orders(self):
+        self.assertContains(self.assertPageWithinBudget("user_orders"), "Part 3")
+
+    def test_my_orders(self):
+        self.assertPageWithinBudget("my_orders")
+
+    def test_mechanic_detail(self):
+        response = self.assertPageWithinBudget("mechanic_detail", args=[self.mechanic.id])
+        self.assertContains(response, "reviewer3")
+        self.assertEqual(response.context["total_reviews"], 2 * self.ROWS)
+
+    def test_cart(self):
+        response = self.assertPageWithinBudget("cart")
+        self.assertContains(response, "mechanic")
+        self.assertEqual(response.context["total_price"], 2 * sum(100 + i for i in range(self.ROWS)))
+
+    def test_shop(self):
+        self.assertContains(self.assertPageWithinBudget("shop"), "Part 3")
+
+    def test_chat_list(self):
+        self.assertContains(self.assertPageWithinBudget("chat_list"), "On my way")
+
+
+# 🗂️ Admin tables: keyset pages, streamed when large
+class AdminTableTests(TestCase):
+    USERNAME = re.compile(r'data-label="Username">([^<]+)<')
+    NEXT = re.compile(r'data-next="([^"]*)"')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user("admin", password="x", role="admin")
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f"user{i}", role="customer") for i in range(7)]
+        )
+        # Ties on the sort column: the id decides
+        CustomUser.objects.filter(username__in=["user2", "user3", "user4"]).update(date_joined=timezone.now())
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get_page(self, **params):
+        response = self.client.get(reverse("admin_table", args=["users"]), params)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, body.decode()
+
+    def read_all(self, sort, limit):
+        usernames, after = [], ""
+        while True:
+            _, body = self.get_page(sort=sort, limit=limit, **({"after": after} if after else {}))
+            usernames += self.USERNAME.findall(body)
+            after = self.NEXT.search(body).group(1)
+            if not after:
+                return usernames
+
+    def test_pages_neither_repeat_nor_skip_rows(self):
+        for sort, order_by in (("-joined", ("-date_joined", "-id")), ("username", ("username", "id"))):
+            expected = list(CustomUser.objects.order_by(*order_by).values_list("username", flat=True))
+            for limit in (1, 3, 8):
+                with self.subTest(sort=sort, limit=limit):
+                    self.assertEqual(self.read_all(sort, limit), expected)
+
+    def test_cursor_round_trip(self):
+        field = CustomUser._meta.get_field("date_joined")
+        joined = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(joined, 42), field), (joined, 42))
+        with self.assertRaises(InvalidTableQuery):
+            decode_cursor("not-a-cursor", field)
+
+    def test_bad_sort_or_cursor_is_a_400(self):
+        self.assertEqual(self.get_page(sort="password")[0].status_code, 400)
+        self.assertEqual(self.get_page(after="garbage")[0].status_code, 400)
+
+    def test_only_pages_above_the_threshold_are_streamed(self):
+        with mock.patch("users.views.ADMIN_STREAM_THRESHOLD", 3):
+            small, small_body = self.get_page(limit=3)
+            large, large_body = self.get_page(limit=4)
+        self.assertFalse(small.streaming)
+        self.assertTrue(large.streaming)
+        self.assertEqual(len(self.USERNAME.findall(small_body)), 3)
+        self.assertEqual(len(self.USERNAME.findall(large_body)), 4)
+        self.assertTrue(self.NEXT.search(large_body).group(1))
 
-# Create your tests here.
+    def test_admins_only(self):
+        self.client.force_login(CustomUser.objects.get(username="user0"))
+        self.assertEqual(self.get_page()[0].status_code, 403)
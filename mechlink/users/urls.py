@@ -12,6 +12,8 @@ urlpatterns = [
     # Dashboards
     path('user-dashboard/', views.user_dashboard, name='user_dashboard'),
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/trends/', views.admin_trends, name='admin_trends'),
+    path('admin-dashboard/<str:table>/', views.admin_table, name='admin_table'),
 
     # Customer
     
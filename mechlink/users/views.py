@@ -3,15 +3,23 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
-from .models import Feedback
+from .models import CustomUser, Feedback
 from django.contrib.auth.decorators import login_required
-from django.db import models
+from django.db import models, transaction
 
-from users.models import CustomUser
-from mechanics.models import MechanicProfile, Product, Order
-from services.models import ServiceRequest, Notification
-from services.models import MechanicRating
-from django.db.models import Avg
+from mechanics.models import Order
+from services.models import ServiceRequest, Notification, MechanicRating
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from .admin_tables import (
+    MAX_PAGE_SIZE as ADMIN_MAX_PAGE_SIZE, PAGE_SIZE as ADMIN_PAGE_SIZE, STREAM_THRESHOLD as ADMIN_STREAM_THRESHOLD,
+    TABLES as ADMIN_TABLES, InvalidTableQuery, page_queryset, platform_stats, render_rows,
+)
+from services.rollups import daily_series, request_breakdown
+
+TREND_DAYS = 14
+MAX_TREND_DAYS = 366
 
 
 # 🏠 HOME PAGE
@@ -93,7 +101,7 @@ def user_dashboard(request):
         return redirect('home')
 
     recent_orders = Order.objects.filter(customer=request.user).order_by('-ordered_at')[:5]
-    service_requests = ServiceRequest.objects.filter(user=request.user).order_by('-created_at')
+    service_requests = ServiceRequest.objects.filter(user=request.user).with_effective_status().order_by('-created_at')
     notifications = Notification.objects.filter(recipient=request.user).order_by('-created_at')[:5]
 
     return render(request, 'users/user_dashboard.html', {
@@ -103,37 +111,10 @@ def user_dashboard(request):
     })
 
 
-# 🧰 RAISE REQUEST (Find Nearby Mechanics)
-from math import radians, sin, cos, sqrt, atan2
-
-
-from django.shortcuts import render, redirect
-from django.contrib.auth.decorators import login_required
-from django.contrib import messages
-from django.db.models import Q, Avg
-from math import radians, sin, cos, sqrt, atan2
-
-from services.models import ServiceRequest, Notification, MechanicRating
-from users.models import CustomUser, Feedback
-from mechanics.models import MechanicProfile
-
-
-from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
-from django.contrib import messages
-from django.db.models import Avg
-from math import radians, sin, cos, sqrt, atan2
-
-from users.models import CustomUser, Feedback
-from services.models import ServiceRequest, Notification, MechanicRating
-
-
-
-
 # 🧾 MY ORDERS
 @login_required
 def my_orders(request):
-    orders = Order.objects.filter(customer=request.user).order_by('-ordered_at')
+    orders = Order.objects.filter(customer=request.user).select_related('product').order_by('-ordered_at')
     return render(request, "users/my_orders.html", {"orders": orders})
 
 
@@ -146,7 +127,7 @@ def my_requests(request):
     if not request.user.is_customer():
         return redirect('home')
 
-    requests = ServiceRequest.objects.filter(user=request.user).order_by('-created_at')
+    requests = ServiceRequest.objects.filter(user=request.user).with_effective_status().order_by('-created_at')
     return render(request, 'services/my_requests.html', {'requests': requests})
 
 
@@ -157,29 +138,71 @@ def admin_dashboard(request):
     if not request.user.is_admin():
         return redirect('home')
 
-    users = CustomUser.objects.all().order_by('-date_joined')
-    service_requests = ServiceRequest.objects.all().order_by('-created_at')
-    orders = Order.objects.all().order_by('-ordered_at')
-    products = Product.objects.all().order_by('-created_at')
+    # 🗂️ The tables load tab by tab from admin_table; only the counts and trends are built here
+    return render(request, 'users/admin_dashboard.html', {
+        "stats": platform_stats(),
+        "page_size": ADMIN_PAGE_SIZE,
+        "trend_days": TREND_DAYS,
+        "trends": daily_series(TREND_DAYS),
+        "requests_by_type": request_breakdown("mechanic_type", TREND_DAYS),
+    })
 
-    stats = {
-        "total_users": users.count(),
-        "total_mechanics": users.filter(role="mechanic").count(),
-        "total_customers": users.filter(role="customer").count(),
-        "total_orders": orders.count(),
-        "total_requests": service_requests.count(),
-        "total_products": products.count(),
-    }
 
-    return render(request, 'users/admin_dashboard.html', {
-        "users": users,
-        "orders": orders,
-        "products": products,
-        "service_requests": service_requests,
-        "stats": stats,
+# 📈 ADMIN TRENDS (JSON, from the daily rollups)
+@login_required
+def admin_trends(request):
+    if not request.user.is_admin():
+        return HttpResponseForbidden()
+    try:
+        days = min(max(int(request.GET.get("days", TREND_DAYS)), 1), MAX_TREND_DAYS)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid days.")
+    return JsonResponse({
+        "days": [
+            {"day": row["day"].isoformat(), "requests": row["requests"], "orders": row["orders"],
+             "revenue": str(row["revenue"])}
+            for row in daily_series(days)
+        ],
+        **{f"requests_by_{by}": request_breakdown(by, days) for by in ("region", "mechanic_type", "status")},
     })
 
 
+async def _stream_async(chunks):
+    # Under ASGI a plain iterator would be read to the end before sending;
+    # pull one chunk at a time on the thread that owns the DB connection.
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
+
+
+@login_required
+def admin_table(request, table):
+    """
+    One page of an admin tab as ``<tr>`` rows. ``?sort=<column>`` (``-`` for
+    descending), ``?after=<cursor>`` for the next page and ``?limit=``; the
+    final row carries the next cursor. Large pages are streamed.
+    """
+    if not request.user.is_admin():
+        return HttpResponseForbidden()
+    spec = ADMIN_TABLES.get(table)
+    if spec is None:
+        raise Http404
+
+    try:
+        limit = min(max(int(request.GET.get('limit', ADMIN_PAGE_SIZE)), 1), ADMIN_MAX_PAGE_SIZE)
+        after = request.GET.get('after')
+        queryset, field_name = page_queryset(spec, sort=request.GET.get('sort'), after=after)
+    except (ValueError, InvalidTableQuery):
+        return HttpResponseBadRequest("Invalid sort, cursor or limit.")
+
+    rows = render_rows(spec, queryset, field_name, limit, first_page=not after)
+    if limit <= ADMIN_STREAM_THRESHOLD:
+        return HttpResponse("".join(rows))
+    if isinstance(request, ASGIRequest):
+        rows = _stream_async(rows)
+    return StreamingHttpResponse(rows, content_type="text/html; charset=utf-8")
+
+
 # ✅ ADMIN APPROVE / REJECT REQUESTS
 @login_required
 def admin_approve_request(request, request_id):
@@ -256,18 +279,19 @@ def submit_feedback(request, request_id):
         rating = int(request.POST.get("rating"))
         feedback = request.POST.get("comment")
 
-        # Save into ServiceRequest
-        service_request.rating = rating
-        service_request.feedback = feedback
-        service_request.save()
-
-        # Also store into Feedback model (so it shows in mechanic_detail)
-        Feedback.objects.create(
-            customer=request.user,
-            mechanic=service_request.mechanic,
-            rating=rating,
-            comment=feedback,
-        )
+        with transaction.atomic():
+            # Save into ServiceRequest
+            service_request.rating = rating
+            service_request.feedback = feedback
+            service_request.save()
+
+            # Also store into Feedback model (so it shows in mechanic_detail)
+            Feedback.objects.create(
+                customer=request.user,
+                mechanic=service_request.mechanic,
+                rating=rating,
+                comment=feedback,
+            )
 
         messages.success(request, "✅ Thank you for your feedback!")
         return redirect('user_dashboard')
@@ -306,14 +330,15 @@ def mechanic_detail(request, mechanic_id):
     """
     Public view for customers to see mechanic info, ratings & reviews.
     """
-    mechanic = get_object_or_404(CustomUser, id=mechanic_id, role="mechanic")
+    mechanic = get_object_or_404(CustomUser.objects.select_related("mechanic_profile"), id=mechanic_id, role="mechanic")
 
-    # Get all ratings & feedbacks
-    ratings = MechanicRating.objects.filter(mechanic=mechanic)
-    feedbacks = Feedback.objects.filter(mechanic=mechanic).order_by("-created_at")
+    # Get all ratings & feedbacks (with their authors, read below)
+    ratings = MechanicRating.objects.filter(mechanic=mechanic).select_related("customer")
+    feedbacks = Feedback.objects.filter(mechanic=mechanic).select_related("customer").order_by("-created_at")
 
-    # Calculate average rating
-    avg_rating = ratings.aggregate(Avg("rating"))["rating__avg"] or 0
+    # Average rating is kept up to date on the mechanic's profile
+    profile = getattr(mechanic, "mechanic_profile", None)
+    avg_rating = profile.average_rating if profile else 0
 
     # Combine reviews (ratings + feedback)
     combined_reviews = []